@@ -0,0 +1,105 @@
+# --- Built-ins ---
+import copy
+import os
+from pathlib import Path
+import logging
+import time
+
+# --- Internal ---
+from src.integration.coupled_groups_analysis import PropAnalysis
+from examples.example_classes.PROWIM_classes import PROWIM_wingpropinfo, prop_radius
+
+# --- External ---
+import numpy as np
+import pandas as pd
+import openmdao.api as om
+import matplotlib.pyplot as plt
+import niceplots
+
+
+logging.getLogger('matplotlib.font_manager').disabled = True
+
+BASE_DIR = Path(__file__).parents[0]
+
+# Compares the steady BEM propeller model with HELIX and the PROWIM isolated propeller measurements,
+#   thrust and power coefficients over the advance ratio and the wall time of one analysis per fidelity
+
+
+def propeller_coefficients(wingpropinfo, rot_rates: np.array) -> tuple[list, list, float]:
+    # CT and CP of the first propeller for every rotational rate, and the mean wall time of run_model
+    air_density = wingpropinfo.parameters.air_density
+    CT, CP, timings = [], [], []
+
+    for rot_rate in rot_rates:
+        for propeller in wingpropinfo.propeller:
+            propeller.rot_rate = rot_rate
+
+        prob = om.Problem(PropAnalysis(WingPropInfo=wingpropinfo), reports=False)
+        prob.setup()
+        start = time.perf_counter()
+        prob.run_model()
+        timings.append(time.perf_counter()-start)
+
+        n = rot_rate/(2.*np.pi)
+        thrust = prob['HELIX_0.om_helix.rotorcomp_0_thrust'][2, -1]
+        power = prob['HELIX_0.om_helix.rotorcomp_0_power'][0]
+        CT.append(thrust/(air_density * n**2 * (2*prop_radius)**4))
+        CP.append(power/(air_density * n**3 * (2*prop_radius)**5))
+
+    return CT, CP, np.mean(timings)
+
+
+if __name__ == '__main__':
+    # === Load in (experimental) validation data ===
+    path = os.path.join(BASE_DIR, 'data', 'PROWIM_proponly_data.txt')
+
+    file = pd.read_csv(path, header=22,
+                       usecols=['Polar', 'Run', 'AoA', 'J=Vinf/nD', 'CT=T/rho*n2*D4',
+                                'CP=P/rho*n3*D5', 'eta=J*CT/CP'],
+                       sep=',')
+
+    J_experimental = file['J=Vinf/nD'][:36]
+    CT_experimental = file['CT=T/rho*n2*D4'][:36]
+    CP_experimental = file['CP=P/rho*n3*D5'][:36]
+
+    # === Generate numerical data ===
+    J_numerical = np.linspace(np.min(J_experimental), np.max(J_experimental), 10)
+    rot_rates = (PROWIM_wingpropinfo.parameters.vinf /
+                 (J_numerical*2.*prop_radius)) * 2. * np.pi  # in rad/s
+
+    results = {}
+    for fidelity in ('helix', 'bem'):
+        wingpropinfo = copy.deepcopy(PROWIM_wingpropinfo)
+        wingpropinfo.propeller_fidelity = fidelity
+        results[fidelity] = propeller_coefficients(wingpropinfo, rot_rates)
+
+    # === Compare ===
+    CT_helix, CP_helix, time_helix = results['helix']
+    CT_bem, CP_bem, time_bem = results['bem']
+    print(f'Wall time per analysis: HELIX {time_helix:.3g} s, BEM {time_bem:.3g} s '
+          f'({time_helix/time_bem:.0f} times faster)')
+    print(f'Largest difference to HELIX: CT {np.max(np.abs(np.subtract(CT_bem, CT_helix))):.4f}, '
+          f'CP {np.max(np.abs(np.subtract(CP_bem, CP_helix))):.4f}')
+
+    # === Plot results ===
+    plt.style.use(niceplots.get_style())
+    _, ax = plt.subplots(figsize=(10, 7))
+
+    ax.plot(J_numerical, CT_helix, label=r'HELIX, $C_T$', color='b')
+    ax.plot(J_numerical, CP_helix, label=r'HELIX, $C_P$', color='orange')
+    ax.plot(J_numerical, CT_bem, label=r'BEM, $C_T$', color='b', linestyle='--')
+    ax.plot(J_numerical, CP_bem, label=r'BEM, $C_P$', color='orange', linestyle='--')
+
+    ax.scatter(J_experimental, CT_experimental,
+               label=r'Experimental, $C_T$', color='b')
+    ax.scatter(J_experimental, CP_experimental,
+               label=r'Experimental, $C_P$', color='orange')
+
+    ax.set_xlabel(r"Advance Ratio ($J$)", fontweight='ultralight')
+    ax.set_ylabel(r"$C_T$, $C_P$", fontweight='ultralight')
+    ax.legend(fontsize='12')
+
+    niceplots.adjust_spines(ax, outward=True)
+
+    plt.savefig(os.path.join(BASE_DIR, 'figures',
+                'PROWIM_PROPELLER_BEM_VALIDATION.png'))
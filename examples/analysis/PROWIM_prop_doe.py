@@ -0,0 +1,36 @@
+# --- Built-ins ---
+import os
+from pathlib import Path
+
+# --- Internal ---
+from src.doe.doe import DesignOfExperiments
+from src.integration.coupled_groups_analysis import PropAnalysis
+from examples.example_classes.PROWIM_classes import PROWIM_wingpropinfo
+
+# --- External ---
+import numpy as np
+
+BASE_DIR = Path(__file__).parents[0]
+
+
+if __name__ == '__main__':
+    # === Sweep rotational rate and blade twist of the first propeller ===
+    variables = {'DESIGNVARIABLES.rotor_0_rot_rate': {'lb': 200., 'ub': 400.},
+                 'DESIGNVARIABLES.rotor_0_twist': {'lb': -5., 'ub': 5., 'indices': [0, 5, 10]}}
+
+    responses = ['HELIX_0.om_helix.rotorcomp_0_thrust',
+                 'HELIX_0.om_helix.rotorcomp_0_power']
+
+    doe = DesignOfExperiments(wingpropinfo=PROWIM_wingpropinfo,
+                              model=PropAnalysis,
+                              variables=variables,
+                              responses=responses,
+                              method='lhs',
+                              n_samples=64,
+                              seed=0)
+
+    # Re-running the script resumes from the samples already in the results directory
+    results = doe.run(os.path.join(BASE_DIR, 'data', 'PROWIM_prop_doe'), n_workers=4)
+
+    success = results['success'] == 1.
+    print(f'{np.count_nonzero(success)}/{len(success)} samples converged')
@@ -0,0 +1,51 @@
+# --- Built-ins ---
+import subprocess
+import sys
+import os
+from pathlib import Path
+
+# --- Internal ---
+
+# --- External ---
+
+ROOT_DIR = Path(__file__).parents[2]
+
+# Modules whose import should stay light, with the heavy dependencies they must not pull in
+MODULES = {'src.base': ['matplotlib', 'niceplots', 'pandas', 'scipy', 'openaerostruct'],
+           'src.utils.tools': ['matplotlib', 'niceplots', 'pandas', 'scipy'],
+           'src.utils.broadcast': ['matplotlib', 'niceplots', 'pandas', 'scipy', 'openaerostruct'],
+           'src.postprocessing.plots': ['matplotlib', 'niceplots', 'pandas', 'scipy', 'examples'],
+           'src.doe.sampling': ['matplotlib', 'niceplots', 'pandas', 'scipy'],
+           'src.utils.chunked_store': ['matplotlib', 'niceplots', 'pandas', 'scipy', 'openmdao']}
+
+
+def import_time(module: str) -> tuple[float, dict]:
+    # Runs python -X importtime in a fresh interpreter, returns the cumulative import time (s)
+    #   of the module and the cumulative time of every imported top-level package
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT_DIR, env={**os.environ, 'PYTHONPATH': str(ROOT_DIR)},
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f'Importing {module} failed:\n{result.stderr}')
+
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = max(packages.get(package, 0.), int(cumulative)*1e-6)
+
+    return packages[module.split('.')[0]], packages
+
+
+if __name__ == '__main__':
+    failed = False
+    for module, forbidden in MODULES.items():
+        total, packages = import_time(module)
+        loaded = [package for package in forbidden if package in packages]
+        failed |= bool(loaded)
+
+        print(f'{module:<30} {total:7.3f} s', f'  imports {", ".join(loaded)}' if loaded else '')
+
+    sys.exit(1 if failed else 0)
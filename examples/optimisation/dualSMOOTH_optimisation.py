@@ -5,13 +5,13 @@ import logging
 import copy
 
 # --- Internal ---
-from src.utils.tools import print_results
-from src.postprocessing.plots import all_plots, stackedplots_wing, stackedplots_prop
-from src.integration.coupled_groups_optimisation import WingSlipstreamPropOptimisation
+from src.postprocessing.plots import stackedplots_wing, stackedplots_prop
+from src.integration.wingprop_optimisation import MainWingPropOptimisation
+from src.constraints.constraints import KSAggregation
+from src.utils.adaptive_tolerance import ToleranceSchedule
 from examples.example_classes.PROWIM_classes import PROWIM_wingpropinfo
 
 # --- External ---
-import openmdao.api as om
 import numpy as np
 
 
@@ -21,23 +21,11 @@ BASE_DIR = Path(__file__).parents[0]
 if __name__ == '__main__':
     PROWIM_wingpropinfo.wing.empty_weight = 6 # to make T=D
     PROWIM_wingpropinfo.wing.CL0 = 0. # to make T=D
+    PROWIM_wingpropinfo.spanwise_discretisation_wing = PROWIM_wingpropinfo.matched_spanwise_discretisation_wing
     PROWIM_wingpropinfo.spanwise_discretisation_propeller = 21
-
-    PROWIM_wingpropinfo.__post_init__()
-    
-    # === Plotting ===
-    db_name = os.path.join(BASE_DIR, 'results', 'data_wingprop.db')
-    savepath = os.path.join(BASE_DIR, 'results', 'propwing_results')
-    stackedplots_prop(db_name=db_name,
-                    wingpropinfo=PROWIM_wingpropinfo,
-                    savedir=savepath)
-    stackedplots_wing(db_name=db_name,
-                wingpropinfo=PROWIM_wingpropinfo,
-                savedir=savepath)
-    quit()
     
     objective = {
-                'HELIX_COUPLED.power_total':
+                'OBJECTIVE.power_total':
                     {'scaler': 1/433.04277037}
                 }
 
@@ -85,106 +73,29 @@ if __name__ == '__main__':
                         {'equals': 0.}
                     }
     
-    # optimisation_arch = MainWingPropOptimisation(wingpropinfo=PROWIM_wingpropinfo,
-    #                                              objective=objective,
-    #                                              constraints=constraints,
-    #                                              design_variables=design_vars,
-    #                                              database_savefile='.',
-    #                                              result_dir='.')
-    
-    
-    prob = om.Problem()
-    prob.model = WingSlipstreamPropOptimisation(WingPropInfo=PROWIM_wingpropinfo,
-                                                objective=objective,
-                                                constraints=constraints,
-                                                design_vars=design_vars)
-
-    # === Analysis ===
-    prob.setup()
-    prob.run_model()
-                    
-        # Check derivatives  
-    if False:
-        prob.check_totals(  compact_print=True, show_only_incorrect=True,
-                        form='central', step=1e-8, 
-                        rel_err_tol=1e-3)
-        # prob.check_partials(compact_print=True, show_only_incorrect=True, 
-        #                             excludes=['*HELIX_0*', '*HELIX_1*'], 
-        #                             form='central', step=1e-8)
-        
-        quit()
-
-    print_results(design_vars=design_vars, constraints=constraints, objective=objective,
-                  prob=prob, kind="Initial Analysis")
-
     # === Optimisation ===
-    prob.driver = om.pyOptSparseDriver()
-    prob.driver.options['optimizer'] = 'SNOPT'
-    prob.driver.options['debug_print'] = ['desvars', 'nl_cons']
-    prob.driver.opt_settings = {
-        "Major feasibility tolerance": 1.0e-5,
-        "Major optimality tolerance": 1.0e-5,
-        "Minor feasibility tolerance": 1.0e-5,
-        "Verify level": -1,
-        "Function precision": 1.0e-6,
-        # "Major iterations limit": 1,
-        "Nonderivative linesearch": None,
-        "Print file": os.path.join(BASE_DIR, 'results', 'optimisation_print_wingprop.out'),
-        "Summary file": os.path.join(BASE_DIR, 'results', 'optimisation_summary_wingprop.out')
-    }
-    
-    # prob.check_totals(  compact_print=True, show_only_incorrect=True,
-    #                     form='central', step=1e-8, 
-    #                     rel_err_tol=1e-3)
-    
-        # Initialise recorder
-    db_name = os.path.join(BASE_DIR, 'results', 'data_wingprop.db')
-    
-    includes = ["OPENAEROSTRUCT.wing.geometry.twist",
-                "OPENAEROSTRUCT.wing.geometry.chord",
-                "OPENAEROSTRUCT.AS_point_0.wing_perf.Cl",
-                "OPENAEROSTRUCT.AS_point_0.wing_perf.CDi",
-                'OPENAEROSTRUCT.AS_point_0.total_perf.L',
-                'OPENAEROSTRUCT.AS_point_0.total_perf.D',
-                'RETHORST.velocity_distribution',
-                'RETHORST.propeller_velocity',
-                "HELIX_0.om_helix.rotorcomp_0_radii",
-                "HELIX_0.om_helix.rotorcomp_0_velocity_distribution",
-                "HELIX_0.om_helix.geodef_parametric_0_twist",
-                "HELIX_0.om_helix.geodef_parametric_0_rot_rate"]
-    
-    for key in design_vars.keys():
-        includes.extend(key)
-    for key in design_vars.keys():
-        includes.extend(key)
-    for key in design_vars.keys():
-        includes.extend(key)
-    
-    recorder = om.SqliteRecorder(db_name)
-    prob.driver.add_recorder(recorder)
-    prob.driver.add_recorder(recorder)
-    # TODO: write code that checks whether the problem variable exists
-    prob.driver.recording_options['includes'] = includes
-    
-    print('==========================================================')
-    print('====================== Optimisation ======================')
-    print('==========================================================')
-    prob.setup()
-    prob.run_driver()
-    
-    prob.cleanup() # close all recorders
+    #   the thickness intersections of all wing panels are aggregated into one constraint, the total derivatives are
+    #   coloured and computed in the cheaper direction, and the coupled solver tolerance follows the optimiser
+    results_dir = os.path.join(BASE_DIR, 'results')
+    optimisation = MainWingPropOptimisation(wingpropinfo=PROWIM_wingpropinfo,
+                                            objective=objective,
+                                            constraints=constraints,
+                                            design_variables=design_vars,
+                                            result_dir=results_dir,
+                                            database_savefile='data_wingprop.db',
+                                            asynchronous_recording=True,
+                                            total_coloring=True,
+                                            aggregation=KSAggregation(
+                                                constraints=['OPENAEROSTRUCT.AS_point_0.wing_perf.thickness_intersects']),
+                                            derivative_mode='select',
+                                            adaptive_tolerance=ToleranceSchedule())
+    optimisation.run_optimisation()
 
-    print_results(design_vars=design_vars, constraints=constraints, objective=objective,
-                  prob=prob, kind="Results")
-    
     # === Plotting ===
-    savepath = os.path.join(BASE_DIR, 'results', 'propwing_results')
-    all_plots(db_name=db_name,
-              wingpropinfo=PROWIM_wingpropinfo,
-              savedir=savepath)
-    stackedplots_wing(db_name=db_name,
-                wingpropinfo=PROWIM_wingpropinfo,
-                savedir=savepath)
-    stackedplots_prop(db_name=db_name,
-                    wingpropinfo=PROWIM_wingpropinfo,
-                    savedir=savepath)
\ No newline at end of file
+    savepath = os.path.join(results_dir, 'propwing_results')
+    stackedplots_prop(db_name=optimisation.db_name,
+                      wingpropinfo=PROWIM_wingpropinfo,
+                      savedir=savepath)
+    stackedplots_wing(db_name=optimisation.db_name,
+                      wingpropinfo=PROWIM_wingpropinfo,
+                      savedir=savepath)
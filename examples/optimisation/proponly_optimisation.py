@@ -6,7 +6,10 @@ import copy
 
 # --- Internal ---
 from src.utils.tools import print_results
-from src.postprocessing.plots import all_plots, stackedplots_prop
+from src.utils.recording import RecordingSpec
+from src.utils.coloring import enable_total_coloring, store_total_coloring
+from src.utils.derivative_mode import select_derivative_mode
+from src.postprocessing.plots import plot_results
 from src.integration.coupled_groups_optimisation import PropOptimisation
 from examples.example_classes.PROWIM_classes import PROWIM_wingpropinfo, PROWIM_prop_1, PROWIM_parameters
 
@@ -20,7 +23,6 @@ BASE_DIR = Path(__file__).parents[0]
 
 if __name__=='__main__':
     PROWIM_wingpropinfo.propeller = [PROWIM_prop_1]
-    PROWIM_wingpropinfo.nr_props = len(PROWIM_wingpropinfo.propeller)
     PROWIM_wingpropinfo.propeller[0].rot_rate = 249 * 2.0 * np.pi
     PROWIM_wingpropinfo.parameters.vinf = 40
     PROWIM_wingpropinfo.parameters.air_density = 1.2087
@@ -33,7 +35,7 @@ if __name__=='__main__':
     # quit()
     
     objective = {
-                'HELIX_COUPLED.power_total':
+                'OBJECTIVE.power_total':
                     {'scaler': 1/1313.13086606}
                 }
 
@@ -87,28 +89,32 @@ if __name__=='__main__':
         # Initialise recorder
     db_name = os.path.join(BASE_DIR, 'results', 'data_propeller.db')
     
-    recorder = om.SqliteRecorder(db_name)
-    prob.driver.add_recorder(recorder)
-    prob.driver.add_recorder(recorder)
-    prob.driver.recording_options['includes'] = [
-                                                    "HELIX_0.om_helix.rotorcomp_0_radii",
-                                                    "HELIX_0.om_helix.rotorcomp_0_velocity_distribution",
-                                                    "blade_chord_spline_0.y"
-                                                 ]
+    recording = RecordingSpec(objective=objective, constraints=constraints, design_vars=design_vars,
+                              plots=['prop'],
+                              extra=["HELIX_0.om_helix.rotorcomp_0_radii",
+                                     "blade_chord_spline_0.y"],
+                              asynchronous=True)
+    recording.attach(prob, db_name)
     
     print('==========================================================')
     print('====================== Optimisation ======================')
     print('==========================================================')
-    prob.setup(mode='rev')
+    prob.setup()
+    recording.validate(prob)
+    derivative_mode = select_derivative_mode(prob) # twenty chord control points against a few constraints
+    print(derivative_mode)
+    enable_total_coloring(prob, os.path.join(BASE_DIR, 'results', 'coloring'), derivative_mode.mode)
     prob.run_driver()
+    print(store_total_coloring(prob, os.path.join(BASE_DIR, 'results', 'coloring'), derivative_mode.mode))
     
     print_results(design_vars=design_vars, constraints=constraints, objective=objective,
                   prob=prob, kind="Initial Analysis")
     
+    prob.cleanup() # close all recorders
+
     savepath = os.path.join(BASE_DIR, 'results', 'prop_results')
-    stackedplots_prop(db_name=db_name,
-                    wingpropinfo=PROWIM_wingpropinfo,
-                    savedir=savepath)
-    all_plots(db_name=db_name,
-              wingpropinfo=PROWIM_wingpropinfo,
-              savedir=savepath)
\ No newline at end of file
+    plot_results(db_name=db_name,
+                 wingpropinfo=PROWIM_wingpropinfo,
+                 savedir=savepath,
+                 wing=False,
+                 prop=True)
\ No newline at end of file
@@ -6,7 +6,8 @@ import copy
 
 # --- Internal ---
 from src.utils.tools import print_results
-from src.postprocessing.plots import all_plots, stackedplots_wing
+from src.utils.recording import RecordingSpec
+from src.postprocessing.plots import plot_results
 from src.integration.coupled_groups_optimisation_new import WingSlipstreamPropOptimisation
 from examples.example_classes.PROWIM_classes import PROWIM_wingpropinfo
 
@@ -27,6 +28,7 @@ if __name__ == '__main__':
     #             savedir=savepath)
     # quit()
 
+    PROWIM_wingpropinfo.spanwise_discretisation_wing = PROWIM_wingpropinfo.matched_spanwise_discretisation_wing
     PROWIM_wingpropinfo.spanwise_discretisation_propeller = 21 # to make T=D
     PROWIM_wingpropinfo.wing.empty_weight = 5 # to make T=D
     PROWIM_wingpropinfo.wing.CL0 = 0. # to make T=D
@@ -43,11 +45,9 @@ if __name__ == '__main__':
                                                             )
         PROWIM_wingpropinfo.propeller[index].prop_angle = 45
         # PROWIM_wingpropinfo.propeller[index].rotation_direction = 1
-
-    PROWIM_wingpropinfo.__post_init__()
     
     objective = {
-                'HELIX_COUPLED.power_total':
+                'OBJECTIVE.power_total':
                     {'scaler': 1/433.04277037}
                 }
 
@@ -177,32 +177,19 @@ if __name__ == '__main__':
         # Initialise recorder
     db_name = os.path.join(BASE_DIR, 'results', 'data_wingprop.db')
     
-    includes = ["OPENAEROSTRUCT.wing.geometry.twist",
-                "OPENAEROSTRUCT.wing.geometry.chord",
-                "OPENAEROSTRUCT.AS_point_0.wing_perf.Cl",
-                "OPENAEROSTRUCT.AS_point_0.wing_perf.CDi",
-                'OPENAEROSTRUCT.AS_point_0.total_perf.L',
-                'OPENAEROSTRUCT.AS_point_0.total_perf.D',
-                'RETHORST.velocity_distribution',
-                'propeller_velocity']
-    
-    for key in design_vars.keys():
-        includes.extend(key)
-    for key in design_vars.keys():
-        includes.extend(key)
-    for key in design_vars.keys():
-        includes.extend(key)
-    
-    recorder = om.SqliteRecorder(db_name)
-    prob.driver.add_recorder(recorder)
-    prob.driver.add_recorder(recorder)
-    # TODO: write code that checks whether the problem variable exists
-    prob.driver.recording_options['includes'] = includes
+    recording = RecordingSpec(objective=objective, constraints=constraints, design_vars=design_vars,
+                              plots=['wing', 'slipstream'],
+                              extra=["OPENAEROSTRUCT.AS_point_0.wing_perf.CDi",
+                                     'OPENAEROSTRUCT.AS_point_0.total_perf.L',
+                                     'OPENAEROSTRUCT.AS_point_0.total_perf.D'],
+                              asynchronous=True)
+    recording.attach(prob, db_name)
     
     print('==========================================================')
     print('====================== Optimisation ======================')
     print('==========================================================')
     prob.setup()
+    recording.validate(prob)
     prob.run_driver()
     
     prob.cleanup() # close all recorders
@@ -212,9 +199,6 @@ if __name__ == '__main__':
     
     # === Plotting ===
     savepath = os.path.join(BASE_DIR, 'results', 'propwing_results')
-    all_plots(db_name=db_name,
-              wingpropinfo=PROWIM_wingpropinfo,
-              savedir=savepath)
-    stackedplots_wing(db_name=db_name,
-                wingpropinfo=PROWIM_wingpropinfo,
-                savedir=savepath)
+    plot_results(db_name=db_name,
+                 wingpropinfo=PROWIM_wingpropinfo,
+                 savedir=savepath)
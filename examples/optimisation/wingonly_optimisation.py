@@ -6,7 +6,8 @@ import copy
 
 # --- Internal ---
 from src.utils.tools import print_results
-from src.postprocessing.plots import all_plots, stackedplots_wing
+from src.utils.recording import RecordingSpec
+from src.postprocessing.plots import plot_results
 from src.integration.coupled_groups_optimisation import WingOptimisation
 from examples.example_classes.PROWIM_classes import PROWIM_wingpropinfo
 
@@ -31,10 +32,9 @@ if __name__ == '__main__':
     PROWIM_wingpropinfo.wing.CL0 = 0. # to make T=D
     # PROWIM_wingpropinfo.wing.fuel_mass = 0 # to make T=D
     PROWIM_wingpropinfo.wing.span = 0.748*2
+    PROWIM_wingpropinfo.spanwise_discretisation_wing = PROWIM_wingpropinfo.matched_spanwise_discretisation_wing
     # PROWIM_wingpropinfo.linear_mesh = True # smoothness of function is determined by this
     
-    PROWIM_wingpropinfo.__post_init__()
-    
     objective = {
                 'OPENAEROSTRUCT.AS_point_0.total_perf.D':
                     {'scaler': 1/9.81879759}
@@ -99,31 +99,26 @@ if __name__ == '__main__':
         # Initialise recorder
     db_name = os.path.join(BASE_DIR, 'results', 'data_wing.db')
     
-    recorder = om.SqliteRecorder(db_name)
-    prob.driver.add_recorder(recorder)
-    prob.driver.add_recorder(recorder)
-    prob.driver.recording_options['includes'] = [
-                                                    "OPENAEROSTRUCT.wing.mesh",
-                                                    "OPENAEROSTRUCT.wing.geometry.twist",
-                                                    "OPENAEROSTRUCT.wing.geometry.chord",
-                                                    "OPENAEROSTRUCT.AS_point_0.wing_perf.Cl"
-                                                ]
+    recording = RecordingSpec(objective=objective, constraints=constraints, design_vars=design_vars,
+                              plots=['wing'],
+                              extra=["OPENAEROSTRUCT.wing.mesh"],
+                              asynchronous=True)
+    recording.attach(prob, db_name)
     
     print('==========================================================')
     print('====================== Optimisation ======================')
     print('==========================================================')
     prob.setup()
+    recording.validate(prob)
     prob.run_driver()
     
     print_results(design_vars=design_vars, constraints=constraints, objective=objective,
                   prob=prob, kind="Optimisation")
     
+    prob.cleanup() # close all recorders
+
     savepath = os.path.join(BASE_DIR, 'results', 'wing_results')
-    all_plots(db_name=db_name,
-              wingpropinfo=PROWIM_wingpropinfo,
-              savedir=savepath)
-    
-    stackedplots_wing(db_name=db_name,
-                wingpropinfo=PROWIM_wingpropinfo,
-                savedir=savepath,
-                noprop=True)
\ No newline at end of file
+    plot_results(db_name=db_name,
+                 wingpropinfo=PROWIM_wingpropinfo,
+                 savedir=savepath,
+                 noprop=True)
\ No newline at end of file
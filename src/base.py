@@ -1,16 +1,15 @@
 # --- Built-ins ---
-from dataclasses import dataclass
-import json
+from dataclasses import dataclass, field
 
 # --- Internal ---
-from src.utils.meshing import meshing
-from openaerostruct.utils.constants import grav_constant
+from src.utils.meshing import meshing, spanwise_nodes
+from src.utils.caching import cache_key, cached
 
 # --- External ---
 import numpy as np
 
 
-@dataclass
+@dataclass(slots=True)
 class ParamInfo:
     vinf: float
     wing_aoa: float
@@ -20,9 +19,10 @@ class ParamInfo:
     R: float = 0 # we fly electric
     CT: float = 0 # grav_constant * 17.0e-6
     air_density: float = 1.225
+    load_factor: float = None # overrides WingInfo.load_factor for this flight condition
 
 
-@dataclass
+@dataclass(slots=True)
 class AirfoilInfo:
     label: str
     Cl_alpha: float     # Cl alpha lift slope
@@ -31,7 +31,24 @@ class AirfoilInfo:
     M: float = 50.
 
 
-@dataclass
+def airfoil_table(airfoils: list[AirfoilInfo]) -> np.recarray:
+    # Stores the sectional airfoil data as a single structured array (one row per blade node)
+    #   instead of one AirfoilInfo object per section
+    if isinstance(airfoils, np.ndarray):
+        return airfoils.view(np.recarray)
+
+    label_length = max([len(airfoil.label) for airfoil in airfoils], default=1)
+    dtype = np.dtype([('label', f'U{label_length}'),
+                      ('Cl_alpha', 'f8'),
+                      ('alpha_L0', 'f8'),
+                      ('alpha_0', 'f8'),
+                      ('M', 'f8')])
+
+    return np.rec.array([(airfoil.label, airfoil.Cl_alpha, airfoil.alpha_L0, airfoil.alpha_0, airfoil.M)
+                         for airfoil in airfoils], dtype=dtype)
+
+
+@dataclass(slots=True)
 class WingInfo:
     label: str
     span: float
@@ -49,7 +66,7 @@ class WingInfo:
     mrho: float = 3e3
 
 
-@dataclass
+@dataclass(slots=True)
 class PropInfo:
     label: str
     prop_location: float
@@ -59,7 +76,7 @@ class PropInfo:
     chord: np.array
     twist: np.array
     span: np.array
-    airfoils: list[AirfoilInfo]
+    airfoils: np.recarray   # a list of AirfoilInfo is converted with airfoil_table
     prop_angle: float = 0.
     rotation_direction: int = 1 # 1 for cw, -11 for ccw
 
@@ -69,22 +86,34 @@ class PropInfo:
     
     local_refinement: int = 2
 
+    _cache: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+
     def __post_init__(self):
         assert len(self.chord) == len(self.span)+1, ' Chord should be defined for blade nodes, \
                                                         not control points (length of chord and twist should be one larger than span)'
         assert len(self.twist) == len(self.span)+1, ' Twist should be defined for blade nodes, \
                                                         not control points (length of chord and twist should be one larger than span)'
 
-        self.prop_radius = np.zeros(len(self.span)+1)
-        for index, ispan in enumerate(self.span):
-            # TODO: this only works for a linearly spaced propeller
-            self.prop_radius[index+1] = self.ref_point[1]+(index+1)*ispan # TODO: simplification (index 1 shouldn't be hardcoded)
+        self.airfoils = airfoil_table(self.airfoils)
+
+    @property
+    def prop_radius(self) -> np.array:
+        # Derived quantities are built on first access and rebuilt only when span or ref_point change
+        return cached(self._cache, 'prop_radius',
+                      cache_key(self.span, self.ref_point[1]),
+                      self._build_prop_radius)
+
+    def _build_prop_radius(self) -> np.array:
+        # TODO: this only works for a linearly spaced propeller
+        prop_radius = np.zeros(len(self.span)+1)
+        prop_radius[1:] = self.ref_point[1]+np.arange(1, len(self.span)+1)*np.asarray(self.span) # TODO: simplification (index 1 shouldn't be hardcoded)
+        return prop_radius
 
     def __str__(self):
         return f'Propeller {self.label}, with {self.nr_blades} blades'
 
 
-@dataclass
+@dataclass(slots=True)
 class WingPropInfo:
     spanwise_discretisation_wing: int
     spanwise_discretisation_propeller: int
@@ -100,44 +129,65 @@ class WingPropInfo:
     NO_PROPELLER: bool = False # Set this to true to run system without propeller or correction
     
     linear_mesh: bool = False
+    propeller_fidelity: str = 'helix' # 'helix' (unsteady vortex model) or 'bem' (steady blade element momentum)
     
     # Parameters for tube model
     gamma_tangential_dx: float = 0.3 # make sure that this values doesn't place a vortex ring too close to a collocation point: at 75% of chord
     gamma_tangential_x: float = 1.0 # should be a few times larger than the chord length!
     
+    # Derived geometry is computed on first access and cached against the fields it depends on,
+    #   so changing e.g. the wing span or a propeller location rebuilds the mesh, while changing
+    #   the angle of attack or the rotational rate does not
+    _cache: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+    
     if NO_PROPELLER:
         assert (not NO_CORRECTION), 'ERROR: no propeller so no correction'
 
     def __post_init__(self):
-        self.nr_props = len(self.propeller)
-        self.prop_locations = np.zeros((self.nr_props), order='F')
-        self.prop_radii = np.zeros(
-            (self.nr_props, self.spanwise_discretisation_propeller_BEM+1), order='F')
-
+        # Nothing is computed here, kept so that calling it after changing fields stays valid
+        self._cache.clear()
+
+    @property
+    def nr_props(self) -> int:
+        return len(self.propeller)
+
+    @property
+    def prop_locations(self) -> np.array:
+        return cached(self._cache, 'prop_locations',
+                      cache_key([propeller.prop_location for propeller in self.propeller]),
+                      lambda: np.array([propeller.prop_location for propeller in self.propeller],
+                                       dtype=float, order='F'))
+
+    @property
+    def prop_radii(self) -> np.array:
         # Merge the propeller information into a single array
-        for index, _ in enumerate(self.prop_locations):
-            self.prop_locations[index] = self.propeller[index].prop_location
-            self.prop_radii[index] = self.propeller[index].prop_radius
-
-        self.vlm_mesh = meshing(span=self.wing.span,
-                                chord=self.wing.chord[0],
-                                prop_locations=self.prop_locations,
-                                prop_radii=self.prop_radii,
-                                nr_props=self.nr_props,
-                                spanwise_discretisation_wing=self.spanwise_discretisation_wing,
-                                spanwise_panels_propeller=self.spanwise_discretisation_propeller)
-        
-        self.spanwise_discretisation_nodes = np.shape(self.vlm_mesh)[1]
-        
-        prop_spacing = (2*self.prop_radii[0, -1])/self.spanwise_discretisation_propeller
-        self.spanwise_discretisation_wing = int((self.wing.span-self.nr_props*2*self.prop_radii[0, -1])/((self.nr_props+1)*prop_spacing))
-        if self.spanwise_discretisation_wing%2==0: self.spanwise_discretisation_wing+=1
-        
-        self.spanwise_discretisation_wing *= self.nr_props+1
-        
-        print('PROP VERSUS WING SPACING: ', ((self.wing.span-self.nr_props*2*self.prop_radii[0, -1])/(self.spanwise_discretisation_wing))/prop_spacing, ' PLEASE MAKE SURE THIS VLAUE IS CLOSE TO 1.0 FOR BEST RESULTS')
-
-        # TODO: fix this class, it looks pretty terrible rn
+        prop_radius = [propeller.prop_radius for propeller in self.propeller]
+        return cached(self._cache, 'prop_radii',
+                      cache_key(prop_radius, self.spanwise_discretisation_propeller_BEM),
+                      lambda: self._build_prop_radii(prop_radius))
+
+    def _build_prop_radii(self, prop_radius: list) -> np.array:
+        prop_radii = np.zeros(
+            (self.nr_props, self.spanwise_discretisation_propeller_BEM+1), order='F')
+        if self.nr_props:
+            prop_radii[:] = prop_radius
+        return prop_radii
+
+    @property
+    def vlm_mesh(self) -> np.array:
+        prop_locations = self.prop_locations
+        prop_radii = self.prop_radii
+        return cached(self._cache, 'vlm_mesh', self._vlm_mesh_key(),
+                      lambda: self._build_vlm_mesh(prop_locations, prop_radii))
+
+    def _vlm_mesh_key(self) -> tuple:
+        return cache_key(self.wing.span, self.wing.chord[0], len(self.wing.twist),
+                         self.prop_locations, self.prop_radii,
+                         self.spanwise_discretisation_wing,
+                         self.spanwise_discretisation_propeller,
+                         self.linear_mesh)
+
+    def _build_vlm_mesh(self, prop_locations: np.array, prop_radii: np.array) -> np.array:
         if self.linear_mesh:
             from openaerostruct.geometry.utils import generate_mesh
             
@@ -151,15 +201,53 @@ class WingPropInfo:
                 "num_twist_cp": num_cp
                 }
             
-            self.vlm_mesh = generate_mesh(mesh_dict)
-        
-        self.vlm_mesh_control_points = np.zeros(
-            self.spanwise_discretisation_nodes-1, order='F')
-
-        for panel in range(self.spanwise_discretisation_nodes-1):
-            self.vlm_mesh_control_points[panel] = 0.5 * \
-                (self.vlm_mesh[0, panel, 1]+self.vlm_mesh[0, panel+1, 1])
-        
+            return generate_mesh(mesh_dict)
+
+        return meshing(span=self.wing.span,
+                       chord=self.wing.chord[0],
+                       prop_locations=prop_locations,
+                       prop_radii=prop_radii,
+                       nr_props=self.nr_props,
+                       spanwise_discretisation_wing=self.spanwise_discretisation_wing,
+                       spanwise_panels_propeller=self.spanwise_discretisation_propeller)
+
+    def preload_geometry(self, vlm_mesh: np.array, vlm_mesh_control_points: np.array) -> None:
+        # Use geometry that was built elsewhere (e.g. broadcast by a parent process) for the current configuration,
+        #   it is still rebuilt as soon as a field it depends on changes
+        key = self._vlm_mesh_key()
+        self._cache['vlm_mesh'] = (key, vlm_mesh)
+        self._cache['vlm_mesh_control_points'] = (key, vlm_mesh_control_points)
+
+    @property
+    def spanwise_discretisation_nodes(self) -> int:
+        # Known from the discretisation alone, the mesh itself is not needed
+        return spanwise_nodes(nr_props=self.nr_props,
+                              spanwise_discretisation_wing=self.spanwise_discretisation_wing,
+                              spanwise_panels_propeller=self.spanwise_discretisation_propeller)
+
+    @property
+    def vlm_mesh_control_points(self) -> np.array:
+        vlm_mesh = self.vlm_mesh
+        return cached(self._cache, 'vlm_mesh_control_points', self._vlm_mesh_key(),
+                      lambda: np.asfortranarray(0.5*(vlm_mesh[0, :-1, 1]+vlm_mesh[0, 1:, 1])))
+
+    @property
+    def velocity_distribution_nopropeller(self) -> np.array:
         # This velocity distribution will be used in case no propellers are configured
-        self.velocity_distribution_nopropeller = np.ones((self.spanwise_discretisation_nodes-1))*self.parameters.vinf
-        
\ No newline at end of file
+        return np.ones((self.spanwise_discretisation_nodes-1))*self.parameters.vinf
+
+    @property
+    def spacing_ratio(self) -> float:
+        # Ratio of wing to propeller panel spacing, make sure this value is close to 1.0 for best results
+        prop_spacing = (2*self.prop_radii[0, -1])/self.spanwise_discretisation_propeller
+        wing_spacing = (self.wing.span-self.nr_props*2*self.prop_radii[0, -1])/(self.spanwise_discretisation_nodes-1-self.nr_props*self.spanwise_discretisation_propeller)
+        return wing_spacing/prop_spacing
+
+    @property
+    def matched_spanwise_discretisation_wing(self) -> int:
+        # Wing discretisation of which the panel spacing matches the propeller panel spacing,
+        # assign it to spanwise_discretisation_wing explicitly, it is not applied on construction
+        prop_spacing = (2*self.prop_radii[0, -1])/self.spanwise_discretisation_propeller
+        discretisation = int((self.wing.span-self.nr_props*2*self.prop_radii[0, -1])/((self.nr_props+1)*prop_spacing))
+        if discretisation%2==0: discretisation+=1
+        return discretisation*(self.nr_props+1)
@@ -1,8 +1,10 @@
 # --- Built-ins ---
+from dataclasses import dataclass, field
 
 # --- Internal ---
 
 # --- External ---
+import numpy as np
 import openmdao.api as om
 
 
@@ -45,4 +47,125 @@ class ConstraintsThrustDrag(om.ExplicitComponent):
         partials['thrust_equals_drag',
                 'thrust_total'] = -1/drag_total
         partials['thrust_equals_drag',
-                'drag_total'] = thrust_total/drag_total**2
\ No newline at end of file
+                'drag_total'] = thrust_total/drag_total**2
+
+
+# Blade chord constraints of the propeller optimisations: bounds of the chord along the span (root excluded)
+#   and the reference magnitudes of the chord and of its curvature d2y over s in [0, 1], which are ~1e-2 to 1e-1.
+#   The aggregates are normalised by these, so that the KS overestimate of at most log(n)/rho is small
+#   compared with the violations of realistic blades.
+BLADE_CHORD_BOUNDS = (0.001, 0.05)
+BLADE_CHORD_REF = 0.01
+BLADE_CURVATURE_REF = 0.01
+
+
+@dataclass(slots=True)
+class KSAggregation:
+    # Replaces constraint vectors by a single aggregate each, constrained to be <= 0
+    #   constraints:    keys of the constraints dict of the optimisation group to aggregate
+    #   propeller:      also aggregate the blade chord curvature and chord bounds of all rotors
+    method: str = 'ks'      # 'ks' (Kreisselmeier-Steinhauser) or 'ie' (induced exponential)
+    rho: float = 50.
+    constraints: list[str] = field(default_factory=list)
+    propeller: bool = True
+
+
+class ConstraintsKS(om.ExplicitComponent):
+    # Aggregates the violations of all entries of x_0..x_{n_inputs-1} into a single value,
+    #   the bounds are normalised to g = (x-upper)/ref and g = (lower-x)/ref so that feasibility is aggregate <= 0
+    #   KS is a conservative estimate of max(g) (it overestimates by at most log(n)/rho),
+    #   IE is an exponentially weighted mean of g that approaches max(g) from below
+    def initialize(self):
+        self.options.declare('n_inputs', default=1)
+        self.options.declare('lower', default=None)
+        self.options.declare('upper', default=None)
+        self.options.declare('ref', default=1.)
+        self.options.declare('rho', default=50.)
+        self.options.declare('method', default='ks', values=['ks', 'ie'])
+
+    def setup(self):
+        # === Options ===
+        if self.options['lower'] is None and self.options['upper'] is None:
+            raise ValueError('ConstraintsKS needs a lower and/or an upper bound')
+
+        # === Inputs ===
+        for index in range(self.options['n_inputs']):
+            self.add_input(f'x_{index}', shape_by_conn=True)
+
+        # === Outputs ===
+        self.add_output('aggregate', val=0.)
+
+    def setup_partials(self):
+        for index in range(self.options['n_inputs']):
+            self.declare_partials('aggregate', f'x_{index}')
+
+    def _violations(self, inputs) -> tuple:
+        # Normalised violations of all bounds and their derivative with respect to the concatenated inputs
+        x = np.concatenate([inputs[f'x_{index}'].ravel() for index in range(self.options['n_inputs'])])
+        ref = self.options['ref']
+
+        g, dg_dx = [], []
+        if self.options['upper'] is not None:
+            g.append((x-self.options['upper'])/ref)
+            dg_dx.append(np.full(x.size, 1./ref))
+        if self.options['lower'] is not None:
+            g.append((self.options['lower']-x)/ref)
+            dg_dx.append(np.full(x.size, -1./ref))
+
+        return np.concatenate(g), np.concatenate(dg_dx), x.size
+
+    def _aggregate(self, g: np.array) -> tuple:
+        # Aggregate and its derivative with respect to g, shifted by max(g) to avoid overflow
+        rho = self.options['rho']
+        g_max = np.max(g)
+        weights = np.exp(rho*(g-g_max))
+        weights /= np.sum(weights)
+
+        if self.options['method'] == 'ks':
+            aggregate = g_max + np.log(np.sum(np.exp(rho*(g-g_max))))/rho
+            return aggregate, weights
+
+        aggregate = np.sum(weights*g)
+        return aggregate, weights*(1+rho*(g-aggregate))
+
+    def compute(self, inputs, outputs):
+        g, _, _ = self._violations(inputs)
+        outputs['aggregate'], _ = self._aggregate(g)
+
+    def compute_partials(self, inputs, partials):
+        g, dg_dx, size = self._violations(inputs)
+        _, dagg_dg = self._aggregate(g)
+
+        # Both bounds act on the same x, their contributions are summed
+        dagg_dx = np.sum((dagg_dg*dg_dx).reshape(-1, size), axis=0)
+
+        start = 0
+        for index in range(self.options['n_inputs']):
+            width = inputs[f'x_{index}'].size
+            partials['aggregate', f'x_{index}'] = dagg_dx[start:start+width]
+            start += width
+
+
+def aggregate_constraints(group: om.Group, constraints: dict, aggregation: KSAggregation) -> dict:
+    # Call in setup: adds a ConstraintsKS per aggregated constraint of the constraints dict,
+    #   returns constraint name -> aggregate output, to be constrained with upper=0. in configure
+    aggregated = {}
+    if aggregation is None:
+        return aggregated
+
+    for constraints_key in aggregation.constraints:
+        bounds = constraints[constraints_key]
+        if 'equals' in bounds:
+            raise ValueError(f'Equality constraint {constraints_key} cannot be aggregated')
+
+        name = f"KS_{constraints_key.replace('.', '_')}"
+        group.add_subsystem(name,
+                            subsys=ConstraintsKS(lower=bounds.get('lower'),
+                                                 upper=bounds.get('upper'),
+                                                 rho=aggregation.rho,
+                                                 method=aggregation.method))
+        group.connect(constraints_key, f'{name}.x_0')
+        aggregated[constraints_key] = f'{name}.aggregate'
+
+    return aggregated
+
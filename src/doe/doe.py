@@ -0,0 +1,225 @@
+# --- Built-ins ---
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import replace
+import os
+import shutil
+
+# --- Internal ---
+from src.base import WingPropInfo
+from src.doe.sampling import SAMPLING_METHODS
+from src.doe.results import ColumnarWriter, write_schema, read_schema, read_results, COMMIT_COLUMN
+from src.utils.broadcast import ConfigurationBroadcast, attach_configuration
+from src.models.wing_model import SurfaceSpec, wing_surface, preload_surface
+
+# --- External ---
+import numpy as np
+import openmdao.api as om
+
+CONFIGURATION_PREFIX = 'wingpropinfo.'
+
+
+def _expand_variables(variables: dict) -> list[tuple]:
+    # One DOE dimension per (variable, index), vector variables are only sampled at the given indices
+    dimensions = []
+    for name, spec in variables.items():
+        indices = spec.get('indices', [None])
+        lower = np.broadcast_to(spec['lb'], len(indices))
+        upper = np.broadcast_to(spec['ub'], len(indices))
+        for index, lb, ub in zip(indices, lower, upper):
+            dimensions.append((name, index, float(lb), float(ub)))
+
+    return dimensions
+
+
+def _column_name(name: str, index: int) -> str:
+    return name if index is None else f'{name}[{index}]'
+
+
+def _set_configuration(wingpropinfo: WingPropInfo, path: str, index: int, value: float) -> None:
+    # path is an attribute path such as 'parameters.vinf' or 'propeller.0.rot_rate'
+    *parents, attribute = path.split('.')
+    obj = wingpropinfo
+    for parent in parents:
+        obj = obj[int(parent)] if parent.isdigit() else getattr(obj, parent)
+
+    if index is None:
+        setattr(obj, attribute, value)
+    else:
+        array = np.array(getattr(obj, attribute), dtype=float) # copy, the original may be a shared read-only view
+        array[index] = value
+        setattr(obj, attribute, array)
+
+
+class _Evaluator:
+    # Owns one problem and re-uses it for every sample, the problem is only set up again when
+    #   a sampled variable is a WingPropInfo field (those are read during setup)
+    def __init__(self, wingpropinfo: WingPropInfo, model, responses: list[str], dimensions: list[tuple], comm=None):
+        self.wingpropinfo = wingpropinfo
+        self.model = model
+        self.responses = responses
+        self.dimensions = dimensions
+        self.comm = comm
+        self.resetup = any(name.startswith(CONFIGURATION_PREFIX) for name, *_ in dimensions)
+        self.prob = None
+
+    def _setup(self, wingpropinfo: WingPropInfo) -> None:
+        self.prob = om.Problem(comm=self.comm)
+        self.prob.model = self.model(WingPropInfo=wingpropinfo)
+        self.prob.setup()
+
+    def evaluate(self, sample_id: int, sample: np.array) -> tuple[int, dict]:
+        row = {}
+        try:
+            if self.resetup:
+                wingpropinfo = replace(self.wingpropinfo,
+                                       parameters=replace(self.wingpropinfo.parameters),
+                                       wing=replace(self.wingpropinfo.wing),
+                                       propeller=[replace(propeller) for propeller in self.wingpropinfo.propeller])
+                for (name, index, *_), value in zip(self.dimensions, sample):
+                    if name.startswith(CONFIGURATION_PREFIX):
+                        _set_configuration(wingpropinfo, name[len(CONFIGURATION_PREFIX):], index, value)
+                self._setup(wingpropinfo)
+            elif self.prob is None:
+                self._setup(self.wingpropinfo)
+
+            for (name, index, *_), value in zip(self.dimensions, sample):
+                if not name.startswith(CONFIGURATION_PREFIX):
+                    self.prob.set_val(name, value, indices=None if index is None else [index])
+
+            self.prob.run_model()
+
+            for response in self.responses:
+                row[response] = self.prob.get_val(response)
+            row['success'] = 1.
+
+        except Exception as error:
+            print(f'DOE sample {sample_id} failed: {error}')
+            row['success'] = 0.
+
+        return sample_id, row
+
+
+# Per-process evaluator of the pool workers
+_evaluator = None
+
+
+def _initialise_worker(descriptor, model, responses: list[str], dimensions: list[tuple],
+                       surface_spec: SurfaceSpec) -> None:
+    global _evaluator
+    wingpropinfo, surface, _ = attach_configuration(descriptor)
+    preload_surface(wingpropinfo, surface, surface_spec)
+    _evaluator = _Evaluator(wingpropinfo, model, responses, dimensions)
+
+
+def _evaluate_in_worker(sample_id: int, sample: np.array) -> tuple[int, dict]:
+    return _evaluator.evaluate(sample_id, sample)
+
+
+class DesignOfExperiments:
+    """
+    Samples the inputs of a model built from a WingPropInfo and records the requested responses.
+
+    variables:  {'PARAMETERS.alpha': {'lb': -8, 'ub': 10},
+                 'DESIGNVARIABLES.twist': {'lb': -5, 'ub': 5, 'indices': [0, 1]},
+                 'wingpropinfo.parameters.vinf': {'lb': 30, 'ub': 50}}
+                Problem variables (any PARAMETERS/DESIGNVARIABLES output) are set before run_model,
+                names starting with 'wingpropinfo.' are WingPropInfo fields and cause a re-setup per sample.
+    model:      group class (or picklable callable) taking the WingPropInfo option, e.g. PropAnalysis
+    method:     'lhs', 'sobol' or 'fullfactorial' (with levels instead of n_samples)
+    surface_spec: SurfaceSpec of the wing model, its surface is built once and shared with the pool workers
+    """
+    def __init__(self, wingpropinfo: WingPropInfo, model, variables: dict, responses: list[str],
+                 method: str='lhs', n_samples: int=100, levels: int | list[int]=3, seed: int=0,
+                 surface_spec: SurfaceSpec=None):
+        self.wingpropinfo: WingPropInfo = wingpropinfo
+        self.model = model
+        self.variables: dict = variables
+        self.responses: list[str] = list(dict.fromkeys(responses))
+        self.method: str = method
+        self.n_samples: int = n_samples
+        self.levels = levels
+        self.seed: int = seed
+        self.surface_spec: SurfaceSpec = surface_spec or SurfaceSpec()
+
+        self.dimensions = _expand_variables(variables)
+
+    def generate_plan(self) -> np.array:
+        lower = np.array([dimension[2] for dimension in self.dimensions])
+        upper = np.array([dimension[3] for dimension in self.dimensions])
+
+        if self.method == 'fullfactorial':
+            return SAMPLING_METHODS[self.method](lower, upper, self.levels)
+        return SAMPLING_METHODS[self.method](lower, upper, self.n_samples, seed=self.seed)
+
+    def _response_shapes(self, evaluator: _Evaluator) -> dict:
+        if evaluator.prob is None:
+            evaluator._setup(self.wingpropinfo)
+        return {response: np.shape(evaluator.prob.get_val(response)) for response in self.responses}
+
+    def run(self, path: str, n_workers: int=1, parallel: str='pool', resume: bool=True) -> dict:
+        """
+        Runs (the remainder of) the plan and streams every result to the columnar file in path.
+        parallel is 'pool' for a local process pool of n_workers or 'mpi' to split the plan over the
+        ranks of MPI.COMM_WORLD (each rank writes its own shard). Returns the results read back from path.
+        """
+        comm, comm_self = None, None
+        if parallel == 'mpi':
+            from mpi4py import MPI
+            comm, comm_self = MPI.COMM_WORLD, MPI.COMM_SELF # every rank runs its own serial problem
+
+        if resume and os.path.isfile(os.path.join(path, 'schema.json')):
+            columns, plan, _ = read_schema(path)
+            done = set(read_results(path, columns=[])[COMMIT_COLUMN].tolist())
+        else:
+            evaluator = _Evaluator(self.wingpropinfo, self.model, self.responses, self.dimensions, comm=comm_self)
+            columns = {_column_name(name, index): () for name, index, *_ in self.dimensions}
+            columns.update(self._response_shapes(evaluator))
+            columns['success'] = ()
+            plan = self.generate_plan()
+            done = set()
+            if comm is None or comm.rank == 0:
+                if os.path.isdir(path):
+                    for shard in os.listdir(path):
+                        if shard.startswith('shard_'):
+                            shutil.rmtree(os.path.join(path, shard))
+                write_schema(path, columns, plan, metadata={'method': self.method,
+                                                            'seed': self.seed,
+                                                            'responses': self.responses})
+            if comm is not None:
+                comm.barrier()
+
+        todo = [sample_id for sample_id in range(len(plan)) if sample_id not in done]
+        input_columns = [_column_name(name, index) for name, index, *_ in self.dimensions]
+
+        def write(writer, sample_id, row):
+            row.update(zip(input_columns, plan[sample_id]))
+            writer.write(sample_id, row)
+
+        if comm is not None:
+            shard = comm.rank
+            with ColumnarWriter(path, shard, columns) as writer:
+                evaluator = _Evaluator(self.wingpropinfo, self.model, self.responses, self.dimensions, comm=comm_self)
+                for sample_id in todo[comm.rank::comm.size]:
+                    write(writer, *evaluator.evaluate(sample_id, plan[sample_id]))
+            comm.barrier()
+
+        elif n_workers == 1:
+            with ColumnarWriter(path, 0, columns) as writer:
+                evaluator = _Evaluator(self.wingpropinfo, self.model, self.responses, self.dimensions)
+                for sample_id in todo:
+                    write(writer, *evaluator.evaluate(sample_id, plan[sample_id]))
+
+        else:
+            surface = wing_surface(self.wingpropinfo, self.surface_spec)
+            with ConfigurationBroadcast(self.wingpropinfo, surface=surface) as broadcast, \
+                 ColumnarWriter(path, 0, columns) as writer, \
+                 ProcessPoolExecutor(max_workers=n_workers,
+                                     initializer=_initialise_worker,
+                                     initargs=(broadcast.descriptor, self.model, self.responses,
+                                               self.dimensions, self.surface_spec)) as executor:
+                futures = [executor.submit(_evaluate_in_worker, sample_id, plan[sample_id])
+                           for sample_id in todo]
+                for future in as_completed(futures):
+                    write(writer, *future.result())
+
+        return read_results(path)
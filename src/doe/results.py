@@ -0,0 +1,108 @@
+# --- Built-ins ---
+import json
+import os
+
+# --- Internal ---
+
+# --- External ---
+import numpy as np
+
+SCHEMA_FILE = 'schema.json'
+PLAN_FILE = 'plan.npy'
+COMMIT_COLUMN = 'sample_id'
+
+
+class ColumnarWriter:
+    """
+    Append-only columnar result file: one raw binary file per column in a shard directory.
+    Each row is committed by writing its sample_id last, so after a crash the committed rows are
+    exactly those with a sample_id; trailing partial rows are cut off when the shard is reopened.
+    """
+    def __init__(self, path: str, shard: int, columns: dict[str, tuple]):
+        self.columns = columns  # name -> shape of a single entry
+        self.directory = os.path.join(path, f'shard_{shard}')
+        os.makedirs(self.directory, exist_ok=True)
+
+        row_bytes = {name: 8*int(np.prod(shape)) for name, shape in columns.items()}
+        committed = _committed_rows(self.directory)
+
+        self._files = {}
+        for index, name in enumerate([*columns.keys(), COMMIT_COLUMN]):
+            file = open(os.path.join(self.directory, f'{index}.bin'), 'ab')
+            file.truncate(committed*row_bytes.get(name, 8))
+            self._files[name] = file
+
+    def write(self, sample_id: int, row: dict) -> None:
+        for name, shape in self.columns.items():
+            value = np.broadcast_to(np.asarray(row.get(name, np.nan), dtype='f8'), shape)
+            self._files[name].write(np.ascontiguousarray(value).tobytes())
+            self._files[name].flush()
+
+        self._files[COMMIT_COLUMN].write(np.int64(sample_id).tobytes())
+        self._files[COMMIT_COLUMN].flush()
+        os.fsync(self._files[COMMIT_COLUMN].fileno())
+
+    def close(self) -> None:
+        for file in self._files.values():
+            file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _committed_rows(directory: str) -> int:
+    # The commit column is always the last one
+    files = [name for name in os.listdir(directory) if name.endswith('.bin')]
+    if not files:
+        return 0
+    commit_file = os.path.join(directory, f'{len(files)-1}.bin')
+    return os.path.getsize(commit_file)//8
+
+
+def write_schema(path: str, columns: dict[str, tuple], plan: np.array, metadata: dict) -> None:
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, PLAN_FILE), plan)
+    with open(os.path.join(path, SCHEMA_FILE), 'w') as file:
+        json.dump({'columns': {name: list(shape) for name, shape in columns.items()},
+                   **metadata}, file, indent=4)
+
+
+def read_schema(path: str) -> tuple[dict, np.array, dict]:
+    with open(os.path.join(path, SCHEMA_FILE), 'r') as file:
+        metadata = json.load(file)
+    columns = {name: tuple(shape) for name, shape in metadata.pop('columns').items()}
+    return columns, np.load(os.path.join(path, PLAN_FILE)), metadata
+
+
+def read_results(path: str, columns: list[str]=None) -> dict[str, np.array]:
+    # Reads the committed rows of all shards, sorted by sample_id. Pass columns to read only those.
+    schema, _, _ = read_schema(path)
+    names = list(schema.keys())
+    wanted = names if columns is None else columns
+
+    results = {name: [] for name in [COMMIT_COLUMN, *wanted]}
+    for shard in sorted(os.listdir(path)):
+        directory = os.path.join(path, shard)
+        if not (shard.startswith('shard_') and os.path.isdir(directory)):
+            continue
+
+        n_rows = _committed_rows(directory)
+        results[COMMIT_COLUMN].append(np.fromfile(os.path.join(directory, f'{len(names)}.bin'),
+                                                  dtype='i8', count=n_rows))
+        for name in wanted:
+            shape = schema[name]
+            data = np.fromfile(os.path.join(directory, f'{names.index(name)}.bin'),
+                               dtype='f8', count=n_rows*int(np.prod(shape)))
+            results[name].append(data.reshape((n_rows, *shape)))
+
+    sample_id = np.concatenate(results[COMMIT_COLUMN]) if results[COMMIT_COLUMN] else np.zeros(0, dtype='i8')
+    order = np.argsort(sample_id, kind='stable')
+
+    merged = {COMMIT_COLUMN: sample_id[order]}
+    for name in wanted:
+        merged[name] = np.concatenate(results[name])[order] if results[name] else np.zeros((0, *schema[name]))
+
+    return merged
@@ -0,0 +1,32 @@
+# --- Built-ins ---
+import itertools
+
+# --- Internal ---
+from src.utils.lazy import lazy_import
+
+# --- External ---
+import numpy as np
+
+qmc = lazy_import('scipy.stats.qmc')
+
+
+def latin_hypercube(lower: np.array, upper: np.array, n_samples: int, seed: int=None) -> np.array:
+    sampler = qmc.LatinHypercube(d=len(lower), seed=seed)
+    return qmc.scale(sampler.random(n_samples), lower, upper)
+
+
+def sobol(lower: np.array, upper: np.array, n_samples: int, seed: int=None) -> np.array:
+    # Scrambled Sobol sequence, n_samples should be a power of two to keep the balance properties
+    sampler = qmc.Sobol(d=len(lower), scramble=True, seed=seed)
+    return qmc.scale(sampler.random(n_samples), lower, upper)
+
+
+def full_factorial(lower: np.array, upper: np.array, levels: int | list[int]) -> np.array:
+    levels = np.broadcast_to(levels, len(lower))
+    axes = [np.linspace(lb, ub, level) for lb, ub, level in zip(lower, upper, levels)]
+    return np.array(list(itertools.product(*axes)), dtype=float).reshape(-1, len(lower))
+
+
+SAMPLING_METHODS = {'lhs': latin_hypercube,
+                    'sobol': sobol,
+                    'fullfactorial': full_factorial}
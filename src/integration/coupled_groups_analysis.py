@@ -1,9 +1,8 @@
 # --- Built-ins ---
-import unittest
 
 # --- Internal ---
 from src.base import WingPropInfo, PropInfo, ParamInfo
-from src.models.propeller_model import PropellerModel, PropellerCoupled
+from src.models.propeller_model import PropellerCoupled, propeller_model, HELIX_CONNECTED
 from src.models.wing_model import WingModel
 from src.models.slipstream_model import SlipStreamModel
 from src.models.parameters import Parameters
@@ -18,6 +17,7 @@ import openmdao.api as om
 class WingSlipstreamPropAnalysis(om.Group):
     def initialize(self):
         self.options.declare('WingPropInfo', default=WingPropInfo)
+        self.options.declare('correction_table', default=None) # CorrectionTableSpec, tabulated slipstream correction
 
     def setup(self):
         # === Options ===
@@ -32,11 +32,11 @@ class WingSlipstreamPropAnalysis(om.Group):
 
         for propeller_nr in range(wingpropinfo.nr_props):
             self.add_subsystem(f'HELIX_{propeller_nr}',
-                               subsys=PropellerModel(ParamInfo=wingpropinfo.parameters,
-                                                     PropInfo=wingpropinfo.propeller[propeller_nr]))
+                               subsys=propeller_model(wingpropinfo, propeller_nr, helix_outputs=HELIX_CONNECTED))
 
         self.add_subsystem('RETHORST',
-                           subsys=SlipStreamModel(WingPropInfo=wingpropinfo))
+                           subsys=SlipStreamModel(WingPropInfo=wingpropinfo,
+                                                  correction_table=self.options['correction_table']))
 
         self.add_subsystem('OPENAEROSTRUCT',
                            subsys=WingModel(WingPropInfo=wingpropinfo))
@@ -191,8 +191,7 @@ class PropAnalysis(om.Group):
 
         for propeller_nr in range(wingpropinfo.nr_props):
             self.add_subsystem(f'HELIX_{propeller_nr}',
-                               subsys=PropellerModel(ParamInfo=wingpropinfo.parameters,
-                                                     PropInfo=wingpropinfo.propeller[propeller_nr]))
+                               subsys=propeller_model(wingpropinfo, propeller_nr, helix_outputs=HELIX_CONNECTED))
         
         self.add_subsystem('HELIX_COUPLED', 
                            subsys=PropellerCoupled(WingPropInfo=wingpropinfo))
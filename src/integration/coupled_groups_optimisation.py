@@ -2,12 +2,14 @@
 
 # --- Internal ---
 from src.base import WingPropInfo, PropInfo, ParamInfo
-from src.models.propeller_model import PropellerModel, PropellerCoupled
-from src.models.wing_model import WingModelTube, WingModelWingBox
+from src.models.propeller_model import PropellerCoupled, propeller_model, HELIX_CONNECTED
+from src.models.wing_model import WingModelTube, WingModelWingBox, point_names
 from src.models.slipstream_model import SlipStreamModel
 from src.models.parameters import Parameters
 from src.models.design_variables import DesignVariables
-from src.constraints.constraints import ConstraintsThrustDrag
+from src.constraints.constraints import ConstraintsThrustDrag, ConstraintsKS, aggregate_constraints, \
+    BLADE_CHORD_BOUNDS, BLADE_CHORD_REF, BLADE_CURVATURE_REF
+from src.objectives.objectives import ObjectivePower
 from src.utils.optUtils import bspline_interpolant
 
 # --- External ---
@@ -21,6 +23,8 @@ class WingSlipstreamPropOptimisation(om.Group):
         self.options.declare('objective', default=dict)
         self.options.declare('constraints', default=dict)
         self.options.declare('design_vars', default=dict)
+        self.options.declare('aggregation', default=None) # KSAggregation, replaces constraint vectors by aggregates
+        self.options.declare('correction_table', default=None) # CorrectionTableSpec, tabulated slipstream correction
 
     def setup(self):
         # === Options ===
@@ -45,8 +49,7 @@ class WingSlipstreamPropOptimisation(om.Group):
             )
 
             self.add_subsystem(f'HELIX_{propeller_nr}',
-                               subsys=PropellerModel(ParamInfo=wingpropinfo.parameters,
-                                                     PropInfo=wingpropinfo.propeller[propeller_nr]))
+                               subsys=propeller_model(wingpropinfo, propeller_nr, helix_outputs=HELIX_CONNECTED))
 
             # Connections are given here for readability
             self.connect(f"DESIGNVARIABLES.rotor_{propeller_nr}_chord",
@@ -55,7 +58,8 @@ class WingSlipstreamPropOptimisation(om.Group):
                          f"HELIX_{propeller_nr}.om_helix.geodef_parametric_0_chord")
 
         self.add_subsystem('RETHORST',
-                           subsys=SlipStreamModel(WingPropInfo=wingpropinfo))
+                           subsys=SlipStreamModel(WingPropInfo=wingpropinfo,
+                                                  correction_table=self.options['correction_table']))
 
         self.add_subsystem('OPENAEROSTRUCT',
                            subsys=WingModelTube(WingPropInfo=wingpropinfo))
@@ -67,6 +71,11 @@ class WingSlipstreamPropOptimisation(om.Group):
         self.add_subsystem('CONSTRAINTS',
                            subsys=ConstraintsThrustDrag())
 
+        self.add_subsystem('OBJECTIVE',
+                           subsys=ObjectivePower(nr_props=wingpropinfo.nr_props,
+                                                 with_drag=True,
+                                                 vinf=wingpropinfo.parameters.vinf))
+
         # === Explicit connections ===
         # PARAMS to HELIX
         for index, _ in enumerate(wingpropinfo.propeller):
@@ -156,6 +165,19 @@ class WingSlipstreamPropOptimisation(om.Group):
         self.connect('HELIX_COUPLED.thrust_total',
                      'CONSTRAINTS.thrust_total')
 
+        # To OBJECTIVE
+        self.connect('HELIX_COUPLED.power_prop',
+                     'OBJECTIVE.power')
+        self.connect('HELIX_COUPLED.thrust_prop',
+                     'OBJECTIVE.thrust')
+        self.connect('OPENAEROSTRUCT.AS_point_0.total_perf.D',
+                     'OBJECTIVE.drag')
+        self.connect('PARAMETERS.vinf',
+                     'OBJECTIVE.vinf')
+
+        # Aggregated constraints
+        self.aggregated = aggregate_constraints(self, self.options['constraints'], self.options['aggregation'])
+
     def configure(self):
         # === Options ===
         objective = self.options['objective']
@@ -171,6 +193,9 @@ class WingSlipstreamPropOptimisation(om.Group):
 
         # === Add constraints ===
         for constraints_key in constraints.keys():
+            if constraints_key in self.aggregated:
+                continue
+
             for subkey in constraints[constraints_key].keys():
                 if len(constraints[constraints_key].keys()) == 1:
                     if subkey == 'equals':
@@ -189,6 +214,9 @@ class WingSlipstreamPropOptimisation(om.Group):
                                         upper=constraints[constraints_key]['upper'])
                     break  # TODO: there's a better way to solve this issue
 
+        for aggregate in self.aggregated.values():
+            self.add_constraint(aggregate, upper=0.)
+
         # === Add objective ===
         for objective_key in objective.keys():
             self.add_objective(objective_key,
@@ -201,20 +229,28 @@ class WingOptimisation(om.Group):
         self.options.declare('objective', default=dict)
         self.options.declare('constraints', default=dict)
         self.options.declare('design_vars', default=dict)
+        self.options.declare('aggregation', default=None) # KSAggregation, replaces constraint vectors by aggregates
+        self.options.declare('flight_conditions', default=None) # list of ParamInfo for a multipoint problem
+        self.options.declare('parallel', default=False)
 
     def setup(self):
         # === Options ===
         wingpropinfo = self.options['WingPropInfo']
+        flight_conditions = self.options['flight_conditions']
+        parallel = self.options['parallel']
 
         # === Add subsystems ===
         self.add_subsystem('DESIGNVARIABLES', subsys=DesignVariables(
             WingPropInfo=wingpropinfo))
 
         self.add_subsystem('PARAMETERS', subsys=Parameters(
-            WingPropInfo=wingpropinfo))
+            WingPropInfo=wingpropinfo,
+            flight_conditions=flight_conditions))
 
         self.add_subsystem('OPENAEROSTRUCT',
-                           subsys=WingModelTube(WingPropInfo=wingpropinfo))
+                           subsys=WingModelTube(WingPropInfo=wingpropinfo,
+                                                flight_conditions=flight_conditions,
+                                                parallel=parallel))
 
         # === Connections ===
         # DVs to OPENAEROSTRUCT
@@ -226,8 +262,6 @@ class WingOptimisation(om.Group):
         # PARAMETERS to OPENAEROSTRUCT
         self.connect('PARAMETERS.vinf',
                      'OPENAEROSTRUCT.v')
-        self.connect('PARAMETERS.velocity_distribution',
-                     'OPENAEROSTRUCT.AS_point_0.coupled.aero_states.velocity_distribution')
         self.connect('PARAMETERS.alpha',
                      'OPENAEROSTRUCT.alpha')
         self.connect('PARAMETERS.Mach_number',
@@ -248,10 +282,19 @@ class WingOptimisation(om.Group):
                      'OPENAEROSTRUCT.load_factor')
         self.connect('PARAMETERS.empty_cg',
                      'OPENAEROSTRUCT.empty_cg')
-        self.connect('PARAMETERS.fuel_mass',
-                     'OPENAEROSTRUCT.AS_point_0.total_perf.L_equals_W.fuelburn')
-        self.connect('PARAMETERS.fuel_mass',
-                     'OPENAEROSTRUCT.AS_point_0.total_perf.CG.fuelburn')
+
+        # PARAMETERS to every AS_point, the velocity distribution has one row per flight condition
+        for index, point_name in enumerate(point_names(flight_conditions, parallel)):
+            self.connect('PARAMETERS.velocity_distribution',
+                         f'OPENAEROSTRUCT.{point_name}.coupled.aero_states.velocity_distribution',
+                         src_indices=None if flight_conditions is None else om.slicer[index, :])
+            self.connect('PARAMETERS.fuel_mass',
+                         f'OPENAEROSTRUCT.{point_name}.total_perf.L_equals_W.fuelburn')
+            self.connect('PARAMETERS.fuel_mass',
+                         f'OPENAEROSTRUCT.{point_name}.total_perf.CG.fuelburn')
+
+        # Aggregated constraints
+        self.aggregated = aggregate_constraints(self, self.options['constraints'], self.options['aggregation'])
 
     def configure(self):
         # === Options ===
@@ -268,6 +311,9 @@ class WingOptimisation(om.Group):
 
         # === Add constraints ===
         for constraints_key in constraints.keys():
+            if constraints_key in self.aggregated:
+                continue
+
             for subkey in constraints[constraints_key].keys():
                 if len(constraints[constraints_key].keys()) == 1:
                     if subkey == 'equals':
@@ -287,6 +333,9 @@ class WingOptimisation(om.Group):
                     break  # We break because otherwise it will loop over the subkey
                     # TODO: horrendous coding convention, there's a better way to solve this issue
 
+        for aggregate in self.aggregated.values():
+            self.add_constraint(aggregate, upper=0.)
+
         # === Add objective ===
         for objective_key in objective.keys():
             self.add_objective(objective_key,
@@ -301,6 +350,7 @@ class PropOptimisation(om.Group):
         self.options.declare('objective', default=dict)
         self.options.declare('constraints', default=dict)
         self.options.declare('design_vars', default=dict)
+        self.options.declare('aggregation', default=None) # KSAggregation, replaces constraint vectors by aggregates
 
     def setup(self):
         # === Options ===
@@ -324,8 +374,7 @@ class PropOptimisation(om.Group):
             )
 
             self.add_subsystem(f'HELIX_{propeller_nr}',
-                               subsys=PropellerModel(ParamInfo=wingpropinfo.parameters,
-                                                     PropInfo=wingpropinfo.propeller[propeller_nr]))
+                               subsys=propeller_model(wingpropinfo, propeller_nr, helix_outputs=HELIX_CONNECTED))
 
             # Connections are given here for readability
             self.connect(f"DESIGNVARIABLES.rotor_{propeller_nr}_chord",
@@ -343,6 +392,46 @@ class PropOptimisation(om.Group):
             self.connect(f"HELIX_{propeller_nr}.om_helix.rotorcomp_0_power",
                          f"HELIX_COUPLED.power_prop_{index}")
 
+        # HELIX_COUPLED to OBJECTIVE, vinf keeps the value of the parameters
+        self.add_subsystem('OBJECTIVE',
+                           subsys=ObjectivePower(nr_props=wingpropinfo.nr_props,
+                                                 vinf=wingpropinfo.parameters.vinf))
+        self.connect('HELIX_COUPLED.power_prop',
+                     'OBJECTIVE.power')
+        self.connect('HELIX_COUPLED.thrust_prop',
+                     'OBJECTIVE.thrust')
+
+        # Aggregated constraints
+        aggregation = self.options['aggregation']
+        self.aggregated = aggregate_constraints(self, self.options['constraints'], aggregation)
+
+        # The blade chord constraints of all rotors are aggregated into one value each,
+        #   the root chord is an equality constraint and is kept as it is
+        chord_included = any('chord' in design_var_key for design_var_key in self.options['design_vars'])
+        self.aggregate_propeller = chord_included and aggregation is not None and aggregation.propeller
+        if self.aggregate_propeller:
+            self.add_subsystem('KS_blade_chord_curvature',
+                               subsys=ConstraintsKS(n_inputs=wingpropinfo.nr_props,
+                                                    upper=0., ref=BLADE_CURVATURE_REF,
+                                                    rho=aggregation.rho,
+                                                    method=aggregation.method))
+            self.add_subsystem('KS_blade_chord_span',
+                               subsys=ConstraintsKS(n_inputs=wingpropinfo.nr_props,
+                                                    lower=BLADE_CHORD_BOUNDS[0], upper=BLADE_CHORD_BOUNDS[1],
+                                                    ref=BLADE_CHORD_REF,
+                                                    rho=aggregation.rho,
+                                                    method=aggregation.method))
+
+            for propeller_nr in range(wingpropinfo.nr_props):
+                self.connect(f"blade_chord_spline_{propeller_nr}.d2y",
+                             f"KS_blade_chord_curvature.x_{propeller_nr}")
+                self.connect(f"blade_chord_spline_{propeller_nr}.y",
+                             f"KS_blade_chord_span.x_{propeller_nr}",
+                             src_indices=np.arange(1, self.blade_nDVSec))
+
+            self.aggregated['blade_chord_curvature'] = 'KS_blade_chord_curvature.aggregate'
+            self.aggregated['blade_chord_span'] = 'KS_blade_chord_span.aggregate'
+
     def configure(self):
         # === Options ===
         wingpropinfo = self.options['WingPropInfo']
@@ -362,6 +451,9 @@ class PropOptimisation(om.Group):
 
         # === Add constraints ===
         for constraints_key in constraints.keys():
+            if constraints_key in self.aggregated:
+                continue
+
             for subkey in constraints[constraints_key].keys():
                 if len(constraints[constraints_key].keys()) == 1:
                     if subkey == 'equals':
@@ -383,15 +475,21 @@ class PropOptimisation(om.Group):
         # === Additional non-adjustable constraints ===
         if chord_included:
             for propeller_nr, _ in enumerate(wingpropinfo.propeller):
-                self.add_constraint(
-                    f"blade_chord_spline_{propeller_nr}.d2y", upper=0.0)
                 self.add_constraint(
                     f"blade_chord_spline_{propeller_nr}.y", equals=wingpropinfo.propeller[propeller_nr].chord[0], indices=[0], scaler=100.0, alias="chord_root"
                 )
+                if self.aggregate_propeller:
+                    continue
+
                 self.add_constraint(
-                    f"blade_chord_spline_{propeller_nr}.y", lower=0.001, upper=0.05, scaler=100.0, indices=range(1, 20), alias="chord_span"
+                    f"blade_chord_spline_{propeller_nr}.d2y", upper=0.0)
+                self.add_constraint(
+                    f"blade_chord_spline_{propeller_nr}.y", lower=BLADE_CHORD_BOUNDS[0], upper=BLADE_CHORD_BOUNDS[1], scaler=100.0, indices=range(1, 20), alias="chord_span"
                 )
 
+        for aggregate in self.aggregated.values():
+            self.add_constraint(aggregate, upper=0.)
+
         # === Add objective ===
         for objective_key in objective.keys():
             self.add_objective(objective_key,
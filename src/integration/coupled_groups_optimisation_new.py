@@ -2,12 +2,14 @@
 
 # --- Internal ---
 from src.base import WingPropInfo
-from src.models.propeller_model import PropellerModel, PropellerCoupled
+from src.models.propeller_model import PropellerCoupled, propeller_model, HELIX_CONNECTED
 from src.models.wing_model import WingModelTube
 from src.models.parameters import Parameters
 from src.models.design_variables import DesignVariables
-from src.constraints.constraints import ConstraintsThrustDrag
+from src.constraints.constraints import ConstraintsThrustDrag, BLADE_CHORD_BOUNDS
+from src.objectives.objectives import ObjectivePower
 from src.utils.optUtils import bspline_interpolant
+from src.utils.solvers import coupling_solver
 
 from slipstream.slipstream_rethorst import SlipstreamRethorst
 from slipstream.slipstream_tube import SliptreamTube
@@ -23,6 +25,8 @@ class WingSlipstreamPropOptimisation(om.Group):
         self.options.declare('objective', default=dict)
         self.options.declare('constraints', default=dict)
         self.options.declare('design_vars', default=dict)
+        self.options.declare('coupling_solver', default='aitken', values=['aitken', 'anderson'])
+        self.options.declare('coupling_solver_options', default=dict) # e.g. anderson_depth, overrides the defaults below
 
     def setup(self):
         # === Options ===
@@ -47,8 +51,7 @@ class WingSlipstreamPropOptimisation(om.Group):
             )
 
             self.add_subsystem(f'HELIX_{propeller_nr}',
-                               subsys=PropellerModel(ParamInfo=wingpropinfo.parameters,
-                                                     PropInfo=wingpropinfo.propeller[propeller_nr]))
+                               subsys=propeller_model(wingpropinfo, propeller_nr, helix_outputs=HELIX_CONNECTED))
 
             # Connections are given here for readability
             self.connect(f"DESIGNVARIABLES.rotor_{propeller_nr}_chord",
@@ -86,12 +89,14 @@ class WingSlipstreamPropOptimisation(om.Group):
                                                                 propeller_discretisation=wingpropinfo.spanwise_discretisation_propeller,
                                                                 mesh=wingpropinfo.vlm_mesh,))
         
-        coupled_OAS_TUBE.nonlinear_solver = om.NonlinearBlockGS(use_aitken=True)
-        coupled_OAS_TUBE.nonlinear_solver.options["maxiter"] = 100
-        coupled_OAS_TUBE.nonlinear_solver.options["atol"] = 1e-3
-        coupled_OAS_TUBE.nonlinear_solver.options["rtol"] = 1e-30
-        coupled_OAS_TUBE.nonlinear_solver.options["iprint"] = 2
-        coupled_OAS_TUBE.nonlinear_solver.options["err_on_non_converge"] = False
+        # The Anderson solver warns on divergence, stagnation and non-convergence even without err_on_non_converge
+        coupled_OAS_TUBE.nonlinear_solver = coupling_solver(self.options['coupling_solver'],
+                                                            **{'maxiter': 100,
+                                                               'atol': 1e-3,
+                                                               'rtol': 1e-30,
+                                                               'iprint': 2,
+                                                               'err_on_non_converge': False,
+                                                               **self.options['coupling_solver_options']})
 
         coupled_OAS_TUBE.linear_solver = om.NonlinearBlockGS(use_aitken=True)
         coupled_OAS_TUBE.options["assembled_jac_type"] = "csc"
@@ -108,6 +113,11 @@ class WingSlipstreamPropOptimisation(om.Group):
         self.add_subsystem('CONSTRAINTS',
                            subsys=ConstraintsThrustDrag())
 
+        self.add_subsystem('OBJECTIVE',
+                           subsys=ObjectivePower(nr_props=wingpropinfo.nr_props,
+                                                 with_drag=True,
+                                                 vinf=wingpropinfo.parameters.vinf))
+
         # === Explicit connections ===
         # PARAMS to HELIX
         for index, _ in enumerate(wingpropinfo.propeller):
@@ -225,6 +235,15 @@ class WingSlipstreamPropOptimisation(om.Group):
         # HELIX_COUPLED to CONSTRAINTS
         self.connect('HELIX_COUPLED.thrust_total',
                      'CONSTRAINTS.thrust_total')
+        # To OBJECTIVE
+        self.connect('HELIX_COUPLED.power_prop',
+                     'OBJECTIVE.power')
+        self.connect('HELIX_COUPLED.thrust_prop',
+                     'OBJECTIVE.thrust')
+        self.connect('OPENAEROSTRUCT.AS_point_0.total_perf.D',
+                     'OBJECTIVE.drag')
+        self.connect('PARAMETERS.vinf',
+                     'OBJECTIVE.vinf')
 
     def configure(self):
         # === Options ===
@@ -294,8 +313,7 @@ class WingRethorstPropOptimisation(om.Group):
             )
 
             self.add_subsystem(f'HELIX_{propeller_nr}',
-                               subsys=PropellerModel(ParamInfo=wingpropinfo.parameters,
-                                                     PropInfo=wingpropinfo.propeller[propeller_nr]))
+                               subsys=propeller_model(wingpropinfo, propeller_nr, helix_outputs=HELIX_CONNECTED))
 
             # Connections are given here for readability
             self.connect(f"DESIGNVARIABLES.rotor_{propeller_nr}_chord",
@@ -572,8 +590,7 @@ class PropOptimisation(om.Group):
             )
 
             self.add_subsystem(f'HELIX_{propeller_nr}',
-                               subsys=PropellerModel(ParamInfo=wingpropinfo.parameters,
-                                                     PropInfo=wingpropinfo.propeller[propeller_nr]))
+                               subsys=propeller_model(wingpropinfo, propeller_nr, helix_outputs=HELIX_CONNECTED))
 
             # Connections are given here for readability
             self.connect(f"DESIGNVARIABLES.rotor_{propeller_nr}_chord",
@@ -637,7 +654,7 @@ class PropOptimisation(om.Group):
                     f"blade_chord_spline_{propeller_nr}.y", equals=wingpropinfo.propeller[propeller_nr].chord[0], indices=[0], scaler=100.0, alias="chord_root"
                 )
                 self.add_constraint(
-                    f"blade_chord_spline_{propeller_nr}.y", lower=0.001, upper=0.05, scaler=100.0, indices=range(1, 20), alias="chord_span"
+                    f"blade_chord_spline_{propeller_nr}.y", lower=BLADE_CHORD_BOUNDS[0], upper=BLADE_CHORD_BOUNDS[1], scaler=100.0, indices=range(1, 20), alias="chord_span"
                 )
 
         # === Add objective ===
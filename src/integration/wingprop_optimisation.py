@@ -5,7 +5,12 @@ import os
 from src.base import WingPropInfo
 from src.integration.coupled_groups_optimisation import WingSlipstreamPropOptimisation
 from src.utils.tools import print_results
-from src.postprocessing.plots import all_plots
+from src.utils.recording import RecordingSpec
+from src.utils.coloring import enable_total_coloring, store_total_coloring
+from src.utils.derivative_mode import select_derivative_mode
+from src.utils.adaptive_tolerance import AdaptiveTolerance, ToleranceSchedule
+from src.constraints.constraints import KSAggregation
+from src.models.correction_table import CorrectionTableSpec
 
 # --- External ---
 import numpy as np
@@ -16,7 +21,10 @@ class MainWingPropOptimisation:
     def __init__(self, wingpropinfo: WingPropInfo,
                         objective: dict, constraints: dict, design_variables: dict,
                         result_dir: str, database_savefile: str,
-                        optimizer: str='pyoptsparse', algorithm: str='SNOPT'):
+                        optimizer: str='pyoptsparse', algorithm: str='SNOPT',
+                        asynchronous_recording: bool=False, total_coloring: bool=False,
+                        aggregation: KSAggregation=None, derivative_mode: str=None,
+                        adaptive_tolerance: ToleranceSchedule=None, correction_table: CorrectionTableSpec=None):
         self.wingpropinfo: WingPropInfo = wingpropinfo
         self.objective: dict = objective
         self.constraints: dict = constraints
@@ -27,13 +35,23 @@ class MainWingPropOptimisation:
         
         self.optimizer: str = optimizer
         self.algorithm: str = algorithm
+        self.asynchronous_recording: bool = asynchronous_recording
+        self.total_coloring: bool = total_coloring # cached per configuration in results_dir/coloring
+        self.aggregation: KSAggregation = aggregation
+        self.derivative_mode: str = derivative_mode # None (openmdao default), 'fwd', 'rev', 'auto' or 'select'
+        self.adaptive_tolerance: ToleranceSchedule = adaptive_tolerance # coupled aerostructural tolerance follows the optimiser
+        self.correction_table: CorrectionTableSpec = correction_table # tabulated slipstream correction instead of the direct one
+
+        self._build_problem()
     
-    def __post_init__(self):
+    def _build_problem(self):
         self.prob = om.Problem()
         self.prob.model = WingSlipstreamPropOptimisation(WingPropInfo=self.wingpropinfo,
                                                             objective=self.objective,
                                                             constraints=self.constraints,
-                                                            design_vars=self.design_variables)        
+                                                            design_vars=self.design_variables,
+                                                            aggregation=self.aggregation,
+                                                            correction_table=self.correction_table)
        
         if self.optimizer=='pyoptsparse':
             # === Optimisation specific setup ===
@@ -50,20 +68,23 @@ class MainWingPropOptimisation:
                 "Print file": os.path.join(self.results_dir, 'optimisation_print_wingprop.out'),
                 "Summary file": os.path.join(self.results_dir, 'optimisation_summary_wingprop.out')
             }
+        elif self.optimizer=='scipy':
+            self.prob.driver = om.ScipyOptimizeDriver(optimizer=self.algorithm, tol=1e-8)
         
             # Initialise recorder
         self.db_name = os.path.join(self.results_dir, self.database_savefile)
         
-        recorder = om.SqliteRecorder(self.db_name)
-        self.prob.driver.add_recorder(recorder)
-        self.prob.driver.add_recorder(recorder)
-        self.prob.driver.recording_options['includes'] = [  "OPENAEROSTRUCT.wing.geometry.twist",
-                                                            "OPENAEROSTRUCT.AS_point_0.wing_perf.Cl",
-                                                            "OPENAEROSTRUCT.AS_point_0.wing_perf.CDi",
-                                                            'OPENAEROSTRUCT.AS_point_0.total_perf.L',
-                                                            'OPENAEROSTRUCT.AS_point_0.total_perf.D',
-                                                            'OPENAEROSTRUCT.AS_point_0.total_perf.D',
-                                                            'RETHORST.velocity_distribution']
+        self.recording = RecordingSpec(objective=self.objective, constraints=self.constraints,
+                                       design_vars=self.design_variables,
+                                       plots=['wing', 'slipstream'],
+                                       extra=["OPENAEROSTRUCT.AS_point_0.wing_perf.CDi",
+                                              'OPENAEROSTRUCT.AS_point_0.total_perf.L',
+                                              'OPENAEROSTRUCT.AS_point_0.total_perf.D'],
+                                       asynchronous=self.asynchronous_recording)
+        self.recording.attach(self.prob, self.db_name)
+
+        if self.adaptive_tolerance is not None:
+            AdaptiveTolerance(['OPENAEROSTRUCT.AS_point_0.coupled'], self.adaptive_tolerance).attach(self.prob)
         
     def run_optimisation(self):
         var = "Optimisation"
@@ -71,10 +92,24 @@ class MainWingPropOptimisation:
         print(f'{var:=^60}')
         print('==========================================================')
         
-        self.prob.setup()
+        # The derivative mode is an argument of setup, 'select' sets the problem up again in the selected mode
+        mode = 'auto' if self.derivative_mode in (None, 'select') else self.derivative_mode
+        self.prob.setup(mode=mode)
+        self.recording.validate(self.prob)
+        coloring = None
+        if self.derivative_mode == 'select':
+            report = select_derivative_mode(self.prob, coloured=self.total_coloring)
+            print(report)
+            mode, coloring = report.mode, report.coloring
+        coloring_dir = os.path.join(self.results_dir, 'coloring')
+        if self.total_coloring:
+            # The colouring of a selected 'auto' mode is cached, the driver does not compute it again
+            enable_total_coloring(self.prob, coloring_dir, mode, coloring=coloring)
         self.prob.run_driver()
+        if self.total_coloring:
+            print(store_total_coloring(self.prob, coloring_dir, mode))
         
-        print_results(design_vars=self.design_vars, constraints=self.constraints, objective=self.objective,
+        print_results(design_vars=self.design_variables, constraints=self.constraints, objective=self.objective,
                   prob=self.prob, kind="Optimisation")
         
         self.prob.cleanup() # close all recorders
@@ -86,14 +121,17 @@ class MainWingPropOptimisation:
         print('==========================================================')
         
         self.prob.setup()
+        self.recording.validate(self.prob)
         self.prob.run_model()
         
-        print_results(design_vars=self.design_vars, constraints=self.constraints, objective=self.objective,
+        print_results(design_vars=self.design_variables, constraints=self.constraints, objective=self.objective,
                   prob=self.prob, kind="Analysis")
         
         self.prob.cleanup() # close all recorders
         
     def visualise_results(self):
+        from src.postprocessing.plots import all_plots # plotting dependencies are only needed here
+
         all_plots(db_name=self.db_name,
                     wingpropinfo=self.wingpropinfo,
                     savedir=self.results_dir)
\ No newline at end of file
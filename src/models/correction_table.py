@@ -0,0 +1,328 @@
+# --- Built-ins ---
+from dataclasses import dataclass, field
+import hashlib
+import os
+
+# --- Internal ---
+from src.base import WingPropInfo
+from rethorst.openmdao.om_rethorst_correctionmatrix import RETHORST_correction
+
+# --- External ---
+import numpy as np
+import openmdao.api as om
+from openmdao.utils.om_warnings import issue_warning
+
+# Tabulated Rethorst correction, for sweeps over vinf, rot_rate and the propeller locations:
+#       SlipStreamModel(WingPropInfo=wingpropinfo, correction_table=CorrectionTableSpec())
+#   the integration groups and MainWingPropOptimisation pass their correction_table option on to SlipStreamModel.
+#   For a propeller layout (mesh, propeller locations and radii) the correction matrix and velocity distribution
+#   are evaluated once with RETHORST_correction per jet over a grid of jet-to-freestream velocity ratios
+#       mu_j = mean(propeller_velocity_j)/vinf
+#   with the other jets at the neutral ratio, and stored in a cache file per layout. Evaluations in between
+#   interpolate linearly in mu_j and superpose the jets:
+#       A = A_0 + sum_j (A_j(mu_j) - A_0),      V/vinf = V_0 + sum_j (V_j(mu_j) - V_0)
+#   The radial shape of every jet is frozen to the one the table is built with. Tables are keyed on the layout and
+#   on the shapes quantised to spec.profile_tolerance, so the points of a sweep share a table as long as their shapes
+#   stay within that tolerance. When the shape of a jet drifts further away, the table of the new shape is loaded or
+#   built. Check the tabulation error of a configuration with validate_correction_table before relying on it.
+
+TABLE_VERSION = 1
+
+
+@dataclass(slots=True)
+class CorrectionTableSpec:
+    velocity_ratios: np.array = field(default_factory=lambda: np.linspace(1., 2., 21))
+    neutral_ratio: float = 1.   # velocity ratio of a jet without effect, propeller_velocity is the total jet velocity
+    profile_tolerance: float = 0.05 # largest deviation of the radial jet shapes from the tabulated ones
+    cache_dir: str = os.path.join(os.path.expanduser('~'), '.cache', 'wingprop', 'rethorst')
+
+
+@dataclass(slots=True)
+class CorrectionTable:
+    velocity_ratios: np.array       # (n_ratios,)
+    profiles: np.array              # (nr_props, n_radial) radial shape of every jet, mean(profile - neutral) = 1
+    neutral_ratio: float
+    matrix: np.array                # (size, size) correction matrix without jets
+    distribution: np.array          # velocity distribution without jets over vinf
+    matrix_increments: np.array     # (nr_props, n_ratios, size, size)
+    distribution_increments: np.array # (nr_props, n_ratios, *distribution.shape)
+
+    def ratios(self, propeller_velocity: np.array, vinf: float) -> np.array:
+        return np.mean(propeller_velocity.reshape(len(self.profiles), -1), axis=1)/vinf
+
+    def profile_drift(self, propeller_velocity: np.array, vinf: float) -> float:
+        # Largest deviation of the radial jet shapes from the tabulated ones, jets without excess have no shape
+        excess = propeller_velocity.reshape(len(self.profiles), -1)/vinf - self.neutral_ratio
+        shaped = np.abs(np.mean(excess, axis=1)) >= 1e-8
+        if not np.any(shaped):
+            return 0.
+        profiles = jet_profiles(propeller_velocity, vinf, len(self.profiles), self.neutral_ratio)
+        return float(np.max(np.abs(profiles[shaped] - self.profiles[shaped])))
+
+    def _weights(self, ratios: np.array) -> tuple[np.array, np.array, np.array]:
+        # Interval and linear weight per jet, ratios outside the grid are extrapolated from the outer intervals
+        grid = self.velocity_ratios
+        lower = np.clip(np.searchsorted(grid, ratios.real) - 1, 0, len(grid)-2)
+        width = grid[lower+1] - grid[lower]
+        return lower, (ratios - grid[lower])/width, 1./width
+
+    def evaluate(self, propeller_velocity: np.array, vinf: float) -> tuple[np.array, np.array]:
+        lower, weight, _ = self._weights(self.ratios(propeller_velocity, vinf))
+        jets = np.arange(len(self.profiles))
+
+        matrix = self.matrix + np.tensordot(1.-weight, self.matrix_increments[jets, lower], axes=1) \
+                             + np.tensordot(weight, self.matrix_increments[jets, lower+1], axes=1)
+        distribution = self.distribution + np.tensordot(1.-weight, self.distribution_increments[jets, lower], axes=1) \
+                                         + np.tensordot(weight, self.distribution_increments[jets, lower+1], axes=1)
+
+        return matrix, vinf*distribution
+
+    def slopes(self, propeller_velocity: np.array, vinf: float) -> tuple[np.array, np.array]:
+        # Derivatives of the matrix and the distribution over vinf to every mu_j, (nr_props, ...)
+        lower, _, inverse_width = self._weights(self.ratios(propeller_velocity, vinf))
+        jets = np.arange(len(self.profiles))
+        scale = inverse_width.reshape(-1, *[1]*(self.matrix.ndim))
+        matrix = (self.matrix_increments[jets, lower+1] - self.matrix_increments[jets, lower])*scale
+        scale = inverse_width.reshape(-1, *[1]*(self.distribution.ndim))
+        distribution = (self.distribution_increments[jets, lower+1] - self.distribution_increments[jets, lower])*scale
+
+        return matrix, distribution
+
+    def save(self, filename: str) -> None:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        temporary = f'{filename}.{os.getpid()}.npz'
+        np.savez_compressed(temporary, version=TABLE_VERSION,
+                            **{name: getattr(self, name) for name in self.__dataclass_fields__})
+        os.replace(temporary, filename) # parallel runs never read a partially written table
+
+    @classmethod
+    def load(cls, filename: str) -> 'CorrectionTable':
+        with np.load(filename) as data:
+            if int(data['version']) != TABLE_VERSION:
+                raise ValueError(f'Correction table {filename} has version {int(data["version"])}, expected {TABLE_VERSION}')
+            values = {name: data[name] for name in cls.__dataclass_fields__}
+        values['neutral_ratio'] = float(values['neutral_ratio'])
+        return cls(**values)
+
+
+def direct_correction(wingpropinfo: WingPropInfo) -> RETHORST_correction:
+    # The correction component as used in SlipStreamModel
+    return RETHORST_correction(propeller_quantity=wingpropinfo.nr_props,
+                               propeller_discretisation=wingpropinfo.spanwise_discretisation_propeller,
+                               mesh=wingpropinfo.vlm_mesh,
+                               NO_CORRECTION=wingpropinfo.NO_CORRECTION,
+                               NO_PROPELLER=wingpropinfo.NO_PROPELLER)
+
+
+def direct_problem(wingpropinfo: WingPropInfo, layout: dict[str, np.array]) -> om.Problem:
+    # Standalone RETHORST_correction with the layout inputs set
+    prob = om.Problem(reports=False)
+    prob.model.add_subsystem('correction', direct_correction(wingpropinfo), promotes=['*'])
+    prob.setup()
+    for name, value in layout.items():
+        prob.set_val(name, value)
+
+    return prob
+
+
+def jet_profiles(propeller_velocity: np.array, vinf: float, nr_props: int, neutral_ratio: float) -> np.array:
+    # Radial shape of the velocity excess of every jet, uniform for a jet without excess
+    excess = propeller_velocity.reshape(nr_props, -1)/vinf - neutral_ratio
+    mean = np.mean(excess, axis=1, keepdims=True)
+    uniform = np.abs(mean) < 1e-8
+    return np.where(uniform, 1., excess/np.where(uniform, 1., mean))
+
+
+def jet_velocity(profiles: np.array, ratios: np.array, vinf: float, neutral_ratio: float) -> np.array:
+    # Jet velocities with the tabulated radial shapes and the given mean velocity ratios
+    return vinf*(neutral_ratio + (ratios[:, np.newaxis]-neutral_ratio)*profiles)
+
+
+def table_key(layout: dict[str, np.array], profiles: np.array, spec: CorrectionTableSpec,
+              wingpropinfo: WingPropInfo) -> str:
+    # The exact layout and grid, but the jet shapes only to profile_tolerance
+    digest = hashlib.sha1(f'{TABLE_VERSION}/{wingpropinfo.NO_CORRECTION}/{wingpropinfo.NO_PROPELLER}/'
+                          f'{spec.neutral_ratio!r}/{spec.profile_tolerance!r}'.encode())
+    for name in sorted(layout):
+        value = np.ascontiguousarray(layout[name], dtype=float)
+        digest.update(name.encode() + str(value.shape).encode() + value.tobytes())
+    digest.update(np.ascontiguousarray(np.round(np.asarray(spec.velocity_ratios, dtype=float), 10)).tobytes())
+    digest.update(np.rint(profiles/spec.profile_tolerance).astype(np.int64).tobytes())
+
+    return digest.hexdigest()[:16]
+
+
+def build_correction_table(wingpropinfo: WingPropInfo, layout: dict[str, np.array], profiles: np.array,
+                           spec: CorrectionTableSpec) -> CorrectionTable:
+    # nr_props*n_ratios+1 evaluations of RETHORST_correction, at vinf = 1 (the correction only depends on the ratios)
+    prob = direct_problem(wingpropinfo, layout)
+    nr_props = wingpropinfo.nr_props
+    ratios = np.asarray(spec.velocity_ratios, dtype=float)
+    neutral = np.full(nr_props, spec.neutral_ratio)
+
+    def run(jet_ratios: np.array) -> tuple[np.array, np.array]:
+        prob.set_val('vinf', 1.)
+        prob.set_val('propeller_velocity',
+                     jet_velocity(profiles, jet_ratios, 1., spec.neutral_ratio).reshape(prob.get_val('propeller_velocity').shape))
+        prob.run_model()
+        return prob.get_val('correction_matrix').copy(), prob.get_val('velocity_distribution').copy()
+
+    matrix, distribution = run(neutral)
+    matrix_increments = np.zeros((nr_props, len(ratios), *matrix.shape))
+    distribution_increments = np.zeros((nr_props, len(ratios), *distribution.shape))
+    for jet in range(nr_props):
+        for index, ratio in enumerate(ratios):
+            jet_ratios = neutral.copy()
+            jet_ratios[jet] = ratio
+            jet_matrix, jet_distribution = run(jet_ratios)
+            matrix_increments[jet, index] = jet_matrix - matrix
+            distribution_increments[jet, index] = jet_distribution - distribution
+
+    return CorrectionTable(velocity_ratios=ratios,
+                           profiles=profiles,
+                           neutral_ratio=spec.neutral_ratio,
+                           matrix=matrix,
+                           distribution=distribution,
+                           matrix_increments=matrix_increments,
+                           distribution_increments=distribution_increments)
+
+
+def correction_table(wingpropinfo: WingPropInfo, layout: dict[str, np.array], profiles: np.array,
+                     spec: CorrectionTableSpec) -> CorrectionTable:
+    # Loads the table of this layout from the cache, builds and stores it on a miss
+    filename = os.path.join(spec.cache_dir, f'rethorst_table_{table_key(layout, profiles, spec, wingpropinfo)}.npz')
+    if os.path.isfile(filename):
+        return CorrectionTable.load(filename)
+
+    table = build_correction_table(wingpropinfo, layout, profiles, spec)
+    table.save(filename)
+    return table
+
+
+LAYOUT_INPUTS = ('propeller_locations', 'propeller_radii', 'wing_mesh', 'wing_mesh_control_points')
+
+
+class RethorstCorrectionTable(om.ExplicitComponent):
+    """
+    Drop-in replacement of RETHORST_correction that interpolates a CorrectionTable. The table is selected by the
+    layout inputs and is loaded or built when these change, so a sweep over the propeller locations builds one table
+    per location and a sweep over vinf or rot_rate none, unless the radial jet shapes drift by more than
+    spec.profile_tolerance from the tabulated ones. Partials are available to vinf and propeller_velocity only,
+    the layout is not differentiable in tabulation mode.
+    """
+    def initialize(self):
+        self.options.declare('WingPropInfo', default=WingPropInfo)
+        self.options.declare('spec', default=None) # CorrectionTableSpec
+
+    def setup(self):
+        # === Options ===
+        wingpropinfo = self.options['WingPropInfo']
+        nr_panels = (wingpropinfo.vlm_mesh.shape[0]-1)*(wingpropinfo.vlm_mesh.shape[1]-1)
+        self.spec = CorrectionTableSpec() if self.options['spec'] is None else self.options['spec']
+
+        # === Inputs ===
+        self.add_input('vinf', val=1., units='m/s')
+        self.add_input('propeller_locations', val=wingpropinfo.prop_locations, units='m')
+        self.add_input('propeller_radii', shape_by_conn=True, units='m')
+        self.add_input('wing_mesh', val=wingpropinfo.vlm_mesh, units='m')
+        self.add_input('wing_mesh_control_points', val=wingpropinfo.vlm_mesh_control_points, units='m')
+        self.add_input('propeller_velocity', shape_by_conn=True, units='m/s')
+
+        # === Outputs ===
+        self.add_output('correction_matrix', shape=(nr_panels, nr_panels))
+        self.add_output('velocity_distribution', shape=wingpropinfo.velocity_distribution_nopropeller.shape, units='m/s')
+
+        self.table = None
+        self._layout = None
+
+    def _update_table(self, inputs) -> None:
+        layout = {name: inputs[name].real.copy() for name in LAYOUT_INPUTS}
+        propeller_velocity, vinf = inputs['propeller_velocity'].real, inputs['vinf'].real[0]
+        if self._layout is not None and all(np.array_equal(layout[name], self._layout[name]) for name in LAYOUT_INPUTS):
+            drift = self.table.profile_drift(propeller_velocity, vinf)
+            if drift <= self.spec.profile_tolerance:
+                return
+            issue_warning(f'Radial jet shapes differ by {drift:.3g} from the tabulated ones (tolerance '
+                          f'{self.spec.profile_tolerance:.3g}), switching to the correction table of the new shapes',
+                          prefix=self.msginfo)
+
+        wingpropinfo = self.options['WingPropInfo']
+        profiles = jet_profiles(propeller_velocity, vinf, wingpropinfo.nr_props, self.spec.neutral_ratio)
+        self.table = correction_table(wingpropinfo, layout, profiles, self.spec)
+        self._layout = layout
+
+    def compute(self, inputs, outputs):
+        self._update_table(inputs)
+        outputs['correction_matrix'], distribution = self.table.evaluate(inputs['propeller_velocity'], inputs['vinf'][0])
+        outputs['velocity_distribution'] = distribution.reshape(outputs['velocity_distribution'].shape)
+
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+        # Every jet enters through mu_j = mean(v_j)/vinf only, the partials are applied matrix-free (size^2 rows)
+        vinf = inputs['vinf'][0]
+        velocity = inputs['propeller_velocity'].reshape(len(self.table.profiles), -1)
+        d_matrix, d_distribution = self.table.slopes(inputs['propeller_velocity'], vinf)
+        d_distribution = d_distribution.reshape(len(d_distribution), -1)
+        _, distribution = self.table.evaluate(inputs['propeller_velocity'], vinf)
+
+        d_ratio_velocity = 1./(velocity.shape[1]*vinf)  # d mu_j / d v_jk
+        d_ratio_vinf = -np.mean(velocity, axis=1)/vinf**2
+
+        if mode == 'fwd':
+            d_ratios = np.zeros(len(velocity))
+            if 'propeller_velocity' in d_inputs:
+                d_ratios += d_ratio_velocity*np.sum(d_inputs['propeller_velocity'].reshape(velocity.shape), axis=1)
+            if 'vinf' in d_inputs:
+                d_ratios += d_ratio_vinf*d_inputs['vinf'][0]
+            if 'correction_matrix' in d_outputs:
+                d_outputs['correction_matrix'] += np.tensordot(d_ratios, d_matrix, axes=1)
+            if 'velocity_distribution' in d_outputs:
+                d_velocity = vinf*(d_ratios @ d_distribution)
+                if 'vinf' in d_inputs:
+                    d_velocity += distribution.ravel()/vinf*d_inputs['vinf'][0]
+                d_outputs['velocity_distribution'] += d_velocity.reshape(d_outputs['velocity_distribution'].shape)
+        else:
+            d_ratios = np.zeros(len(velocity))
+            if 'correction_matrix' in d_outputs:
+                d_ratios += np.tensordot(d_matrix, d_outputs['correction_matrix'], axes=d_outputs['correction_matrix'].ndim)
+            if 'velocity_distribution' in d_outputs:
+                d_velocity = d_outputs['velocity_distribution'].ravel()
+                d_ratios += vinf*(d_distribution @ d_velocity)
+                if 'vinf' in d_inputs:
+                    d_inputs['vinf'] += distribution.ravel() @ d_velocity/vinf
+            if 'propeller_velocity' in d_inputs:
+                d_inputs['propeller_velocity'] += np.repeat(d_ratio_velocity*d_ratios, velocity.shape[1]).reshape(
+                    d_inputs['propeller_velocity'].shape)
+            if 'vinf' in d_inputs:
+                d_inputs['vinf'] += d_ratio_vinf @ d_ratios
+
+
+@dataclass(slots=True)
+class TableValidation:
+    velocity_ratios: np.array   # mu_j of the sample
+    matrix_error: float         # relative Frobenius error of the correction matrix
+    distribution_error: float   # largest error of the velocity distribution relative to vinf
+
+    def __str__(self) -> str:
+        ratios = ', '.join(f'{ratio:.3f}' for ratio in self.velocity_ratios)
+        return f'mu = [{ratios}]: matrix error {self.matrix_error:.2e}, velocity error {self.distribution_error:.2e}'
+
+
+def validate_correction_table(wingpropinfo: WingPropInfo, table: CorrectionTable, layout: dict[str, np.array],
+                              samples: list[tuple[np.array, float]]) -> list[TableValidation]:
+    # Compares the table with the direct RETHORST_correction for (propeller_velocity, vinf) samples of one layout,
+    #   this measures the interpolation, superposition and frozen radial shape errors together
+    prob = direct_problem(wingpropinfo, layout)
+    results = []
+    for propeller_velocity, vinf in samples:
+        prob.set_val('vinf', vinf)
+        prob.set_val('propeller_velocity', np.reshape(propeller_velocity, prob.get_val('propeller_velocity').shape))
+        prob.run_model()
+        matrix, distribution = prob.get_val('correction_matrix'), prob.get_val('velocity_distribution')
+        table_matrix, table_distribution = table.evaluate(np.asarray(propeller_velocity), vinf)
+
+        norm = np.linalg.norm(matrix)
+        results.append(TableValidation(velocity_ratios=table.ratios(np.asarray(propeller_velocity), vinf),
+                                       matrix_error=np.linalg.norm(table_matrix-matrix)/(norm if norm > 0. else 1.),
+                                       distribution_error=np.max(np.abs(table_distribution.ravel()-distribution.ravel()))/vinf))
+
+    return results
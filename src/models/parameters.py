@@ -1,38 +1,59 @@
 # --- Built-ins ---
 
 # --- Internal ---
-from src.base import WingPropInfo
+from src.base import WingPropInfo, ParamInfo
 
 # --- External ---
 import openmdao.api as om
 import numpy as np
 
 
+def _stack_conditions(flight_conditions: list[ParamInfo], load_factor: float) -> ParamInfo:
+    # Turns a list of flight conditions into a single ParamInfo of arrays,
+    #   conditions without their own load factor get the given (wing) load factor
+    stacked = {name: np.array([getattr(condition, name) for condition in flight_conditions], dtype=float)
+               for name in ParamInfo.__dataclass_fields__ if name != 'load_factor'}
+    stacked['load_factor'] = np.array([load_factor if condition.load_factor is None else condition.load_factor
+                                       for condition in flight_conditions], dtype=float)
+
+    return ParamInfo(**stacked)
+
+
 class Parameters(om.IndepVarComp):
     def initialize(self):
         self.options.declare('WingPropInfo', default=WingPropInfo)
+        self.options.declare('flight_conditions', default=None) # list of ParamInfo, vectorises the freestream outputs
 
     def setup(self):
         # === Options ===
         wingpropinfo = self.options['WingPropInfo']
 
         # === Outputs ===
-        # Freestream Parameters
+        # Freestream Parameters, one entry per flight condition if these are given
+        flight_conditions = self.options['flight_conditions']
+        if flight_conditions is None:
+            conditions = wingpropinfo.parameters
+            velocity_distribution = wingpropinfo.velocity_distribution_nopropeller
+        else:
+            conditions = _stack_conditions(flight_conditions, wingpropinfo.wing.load_factor)
+            velocity_distribution = np.outer(conditions.vinf, np.ones_like(wingpropinfo.velocity_distribution_nopropeller))
+
+        load_factor = wingpropinfo.wing.load_factor if conditions.load_factor is None else conditions.load_factor
 
-        self.add_output("vinf", val=wingpropinfo.parameters.vinf, units="m/s")
-        self.add_output("velocity_distribution", val=wingpropinfo.velocity_distribution_nopropeller, units="m/s")
-        self.add_output("alpha", val=wingpropinfo.parameters.wing_aoa, units="deg")
-        self.add_output("Mach_number", val=wingpropinfo.parameters.mach_number)
+        self.add_output("vinf", val=conditions.vinf, units="m/s")
+        self.add_output("velocity_distribution", val=velocity_distribution, units="m/s")
+        self.add_output("alpha", val=conditions.wing_aoa, units="deg")
+        self.add_output("Mach_number", val=conditions.mach_number)
         self.add_output(
-            "re", val=wingpropinfo.parameters.reynolds_number, units="1/m")
+            "re", val=conditions.reynolds_number, units="1/m")
         self.add_output(
-            "rho", val=wingpropinfo.parameters.air_density, units="kg/m**3")
-        self.add_output("CT", val=wingpropinfo.parameters.CT, units="1/s")
-        self.add_output("R", val=wingpropinfo.parameters.R, units="m")
+            "rho", val=conditions.air_density, units="kg/m**3")
+        self.add_output("CT", val=conditions.CT, units="1/s")
+        self.add_output("R", val=conditions.R, units="m")
         self.add_output("W0", val=wingpropinfo.wing.empty_weight, units="kg")
         self.add_output("speed_of_sound",
-                        val=wingpropinfo.parameters.speed_of_sound, units="m/s")
-        self.add_output("load_factor", val=wingpropinfo.wing.load_factor)
+                        val=conditions.speed_of_sound, units="m/s")
+        self.add_output("load_factor", val=load_factor)
         self.add_output("empty_cg", val=wingpropinfo.wing.empty_cg, units="m")
         self.add_output("fuel_mass", val=wingpropinfo.wing.fuel_mass, units="kg")
         
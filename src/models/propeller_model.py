@@ -2,11 +2,15 @@
 
 # --- Internal ---
 from src.base import ParamInfo, PropInfo, WingPropInfo
-import helix.parameters.simparam_def as py_simparam_def
-import helix.references.references_def as py_ref_def
-import helix.geometry.geometry_def as py_geo_def
-import helix.geometry.geometry_def_parametric as py_geo_def_parametric
-import helix.openmdao.om_helix as om_helix
+from src.models.propeller_model_bem import PropellerModelBEM
+from src.utils.lazy import lazy_import
+
+# HELIX is only imported when a HELIX propeller is set up, BEM models run without it
+py_simparam_def = lazy_import('helix.parameters.simparam_def')
+py_ref_def = lazy_import('helix.references.references_def')
+py_geo_def = lazy_import('helix.geometry.geometry_def')
+py_geo_def_parametric = lazy_import('helix.geometry.geometry_def_parametric')
+om_helix = lazy_import('helix.openmdao.om_helix')
 
 # --- External ---
 import openmdao.api as om
@@ -14,6 +18,20 @@ import numpy as np
 
 TIME_STEPS_HELIX = 5 # timesteps taken by helix
 
+# HELIX output stages (the <stage>_calc flags of HELIX_Group) and the outputs they add to om_helix
+HELIX_STAGES = {'thrust': 'rotorcomp_0_thrust',
+                'torque': 'rotorcomp_0_torque',
+                'moment': 'rotorcomp_0_moment',
+                'power': 'rotorcomp_0_power',
+                'loads': 'rotorcomp_0_loads',
+                'velocity_distribution': 'rotorcomp_0_velocity_distribution',
+                'force_distribution': 'rotorcomp_0_f_a'}
+
+# Stages used by the integration groups: thrust and power for the objectives and constraints,
+#   the velocity distribution for the slipstream model and the recorded propeller plots
+HELIX_CONNECTED = ('thrust', 'power', 'velocity_distribution')
+
+
 class PropellerCoupled(om.ExplicitComponent):
     def initialize(self):
         self.options.declare('WingPropInfo', default=WingPropInfo)
@@ -31,6 +49,8 @@ class PropellerCoupled(om.ExplicitComponent):
         # === Outputs ===
         self.add_output('thrust_total', shape=1)
         self.add_output('power_total', shape=1)
+        self.add_output('thrust_prop', shape=self.wingpropinfo.nr_props) # per rotor, e.g. for ObjectivePower
+        self.add_output('power_prop', shape=self.wingpropinfo.nr_props)
         
         # === Partials ===
         for propeller_nr in range(self.wingpropinfo.nr_props):
@@ -38,6 +58,10 @@ class PropellerCoupled(om.ExplicitComponent):
                                     rows=[0], cols=[3*TIME_STEPS_HELIX-1], val=1)
             self.declare_partials('power_total', f'power_prop_{propeller_nr}', 
                                     rows=[0], cols=[0], val=1)
+            self.declare_partials('thrust_prop', f'thrust_prop_{propeller_nr}', 
+                                    rows=[propeller_nr], cols=[3*TIME_STEPS_HELIX-1], val=1)
+            self.declare_partials('power_prop', f'power_prop_{propeller_nr}', 
+                                    rows=[propeller_nr], cols=[0], val=1)
         
     def compute(self, inputs, outputs):
         thrust, power = [], []
@@ -48,18 +72,33 @@ class PropellerCoupled(om.ExplicitComponent):
             
         outputs['thrust_total'] = np.sum(thrust)
         outputs['power_total'] = np.sum(power)
+        outputs['thrust_prop'] = thrust
+        outputs['power_prop'] = power
 
 
 class PropellerModel(om.Group):
     def initialize(self):
         self.options.declare('ParamInfo', default=ParamInfo)
         self.options.declare('PropInfo', default=PropInfo)
+        # Output stages of HELIX: 'all' or a list of HELIX_STAGES, e.g. HELIX_CONNECTED
+        self.options.declare('helix_outputs', default='all')
         
     def setup(self):
         # === Options ===
         self.paraminfo = self.options["ParamInfo"]
         self.propellerinfo = self.options["PropInfo"]
 
+        # Every stage adds its computation and partials to every evaluation, unused ones are left out
+        helix_outputs = self.options['helix_outputs']
+        if helix_outputs == 'all':
+            self.helix_stages = set(HELIX_STAGES)
+        else:
+            self.helix_stages = set(helix_outputs)
+
+        unknown = self.helix_stages - set(HELIX_STAGES)
+        if unknown:
+            raise ValueError(f'Unknown HELIX output stages {sorted(unknown)}, expected some of {list(HELIX_STAGES)}')
+
         # === Components ===
         simparam_def = self._simparam_definition()
         references_def = self._references_definition()
@@ -71,13 +110,7 @@ class PropellerModel(om.Group):
                 simparam_def=simparam_def,
                 references_def=references_def,
                 geometry_def=geometry_def,
-                thrust_calc=True,
-                torque_calc=True,
-                moment_calc=True,
-                power_calc=True,
-                loads_calc=True,
-                velocity_distribution_calc=True,
-                force_distribution_calc=True,
+                **{f'{stage}_calc': stage in self.helix_stages for stage in HELIX_STAGES},
             ),
         )
     
@@ -164,14 +197,15 @@ class PropellerModel(om.Group):
         }
 
         # ------------------------ Blade Section Definition ---------------------- #
+        airfoils = self.propellerinfo.airfoils
         for iSection in range(N_span+1):
             # This defines the properties at mesh nodes
             rotor.sec[iSection].chord = self.propellerinfo.chord[iSection]
             rotor.sec[iSection].twist = self.propellerinfo.twist[iSection]
-            rotor.sec[iSection].alpha_0 = self.propellerinfo.airfoils[iSection].alpha_0
-            rotor.sec[iSection].alpha_L0 = self.propellerinfo.airfoils[iSection].alpha_L0
-            rotor.sec[iSection].Cl_alpha = self.propellerinfo.airfoils[iSection].Cl_alpha
-            rotor.sec[iSection].M = self.propellerinfo.airfoils[iSection].M # this determine how steep the stall curve is
+            rotor.sec[iSection].alpha_0 = airfoils.alpha_0[iSection]
+            rotor.sec[iSection].alpha_L0 = airfoils.alpha_L0[iSection]
+            rotor.sec[iSection].Cl_alpha = airfoils.Cl_alpha[iSection]
+            rotor.sec[iSection].M = airfoils.M[iSection] # this determine how steep the stall curve is
 
         # Span Sections
         for iSpan in range(N_span):
@@ -186,3 +220,15 @@ class PropellerModel(om.Group):
         geometry_def.append_component(rotor)
 
         return geometry_def
+
+
+def propeller_model(wingpropinfo: WingPropInfo, propeller_nr: int, helix_outputs='all') -> om.Group:
+    # Propeller model of the fidelity set in WingPropInfo, both have the om_helix inputs and outputs.
+    #   helix_outputs only applies to HELIX, the BEM model always computes its (cheap) outputs
+    propellerinfo = wingpropinfo.propeller[propeller_nr]
+    if wingpropinfo.propeller_fidelity == 'helix':
+        return PropellerModel(ParamInfo=wingpropinfo.parameters, PropInfo=propellerinfo, helix_outputs=helix_outputs)
+    if wingpropinfo.propeller_fidelity == 'bem':
+        return PropellerModelBEM(ParamInfo=wingpropinfo.parameters, PropInfo=propellerinfo)
+
+    raise ValueError(f"Unknown propeller fidelity {wingpropinfo.propeller_fidelity}, expected 'helix' or 'bem'")
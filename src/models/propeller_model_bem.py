@@ -0,0 +1,388 @@
+# --- Built-ins ---
+
+# --- Internal ---
+from src.base import ParamInfo, PropInfo
+
+# --- External ---
+import numpy as np
+import openmdao.api as om
+
+TIME_STEPS = 5 # the outputs have the shapes of the HELIX outputs, see propeller_model.TIME_STEPS_HELIX
+
+# Steady blade element momentum model of a rotor in axial flow, a drop-in for the HELIX PropellerModel:
+#   the same om_helix.geodef_parametric_0_<span, chord, twist, rot_rate> inputs and
+#   om_helix.rotorcomp_0_<thrust, power, radii, velocity_distribution> outputs.
+#   Every blade element solves for its inflow angle phi (Ning's single residual, with Prandtl tip and hub losses)
+#       R(phi) = sin(phi) - lambda*cos(phi) - sigma*(cn + lambda*ct)/(F*sin(phi)),   lambda = V/(Omega*r)
+#   Twist is in degrees, the airfoil angles alpha_L0 and alpha_0 in radians and Cl_alpha per radian.
+#   Above alpha_0 the linear lift blends into flat plate lift and drag with steepness M.
+
+# Element quantities the inflow residual and the loads depend on, in the order of the gradients
+ELEMENT_ARGS = ('phi', 'twist', 'chord', 'radius', 'tip_radius', 'rot_rate', 'vinf')
+
+
+# === Chain rule on (value, gradient) pairs, the gradient holds one row per ELEMENT_ARGS ===
+def _mul(a: tuple, b: tuple) -> tuple:
+    return a[0]*b[0], a[0]*b[1] + b[0]*a[1]
+
+
+def _div(a: tuple, b: tuple) -> tuple:
+    return a[0]/b[0], (a[1]*b[0] - a[0]*b[1])/b[0]**2
+
+
+def _add(a: tuple, b: tuple) -> tuple:
+    return a[0]+b[0], a[1]+b[1]
+
+
+def _sub(a: tuple, b: tuple) -> tuple:
+    return a[0]-b[0], a[1]-b[1]
+
+
+def _scale(a: tuple, factor) -> tuple:
+    return factor*a[0], factor*a[1]
+
+
+def _apply(a: tuple, function, derivative) -> tuple:
+    return function(a[0]), derivative(a[0])*a[1]
+
+
+def _prandtl(f: tuple) -> tuple:
+    # F = 2/pi acos(exp(-f))
+    return _apply(f, lambda value: 2./np.pi*np.arccos(np.exp(-value)),
+                  lambda value: 2./np.pi*np.exp(-value)/np.sqrt(1.-np.exp(-2.*value)))
+
+
+def element_state(values: dict, airfoils: dict, nr_blades: int, hub_radius: float, cd0: float) -> dict:
+    # Inflow residual, normal and tangential load coefficients and induction factors of every element,
+    #   as (value, gradient) pairs with respect to ELEMENT_ARGS
+    size = np.size(values['phi'])
+    x = {}
+    for index, name in enumerate(ELEMENT_ARGS):
+        gradient = np.zeros((len(ELEMENT_ARGS), size), dtype=np.result_type(*values.values()))
+        gradient[index] = 1.
+        x[name] = (np.broadcast_to(values[name], size), gradient)
+
+    sin, cos = _apply(x['phi'], np.sin, np.cos), _apply(x['phi'], np.cos, lambda phi: -np.sin(phi))
+
+    # Airfoil: linear lift blended into flat plate lift and drag above the stall angle
+    alpha = _sub(x['twist'], x['phi'])
+    stall = _apply(alpha, lambda value: 1./(1.+np.exp(-airfoils['M']*(value-airfoils['alpha_0']))),
+                   lambda value: airfoils['M']*np.exp(-airfoils['M']*(value-airfoils['alpha_0'])) /
+                                 (1.+np.exp(-airfoils['M']*(value-airfoils['alpha_0'])))**2)
+    cl_linear = _scale(_sub(alpha, (airfoils['alpha_L0'], 0.)), airfoils['Cl_alpha'])
+    cl_plate = _apply(alpha, lambda value: np.sin(2.*value), lambda value: 2.*np.cos(2.*value))
+    cl = _add(cl_linear, _mul(stall, _sub(cl_plate, cl_linear)))
+    cd = _add((cd0, 0.), _mul(stall, _apply(alpha, lambda value: 1.-np.cos(2.*value), lambda value: 2.*np.sin(2.*value))))
+
+    cn = _sub(_mul(cl, cos), _mul(cd, sin))
+    ct = _add(_mul(cl, sin), _mul(cd, cos))
+
+    # Prandtl tip and hub losses
+    half_blades = 0.5*nr_blades
+    f_tip = _scale(_div(_sub(x['tip_radius'], x['radius']), _mul(x['radius'], sin)), half_blades)
+    loss = _prandtl(f_tip)
+    if hub_radius > 0.:
+        f_hub = _scale(_div(_sub(x['radius'], (hub_radius, 0.)), sin), half_blades/hub_radius)
+        loss = _mul(loss, _prandtl(f_hub))
+
+    solidity = _scale(_div(x['chord'], x['radius']), nr_blades/(4.*np.pi))
+    speed_ratio = _div(x['vinf'], _mul(x['rot_rate'], x['radius']))
+
+    loss_sin = _mul(loss, sin)
+    residual = _sub(_sub(sin, _mul(speed_ratio, cos)),
+                    _div(_mul(solidity, _add(cn, _mul(speed_ratio, ct))), loss_sin))
+
+    # a/(1+a) = k, a'/(1-a') = k'
+    k = _div(_mul(solidity, cn), _mul(loss_sin, sin))
+    k_prime = _div(_mul(solidity, ct), _mul(loss_sin, cos))
+
+    return {'residual': residual, 'cn': cn, 'ct': ct, 'k': k, 'k_prime': k_prime, 'x': x}
+
+
+def element_loads(state: dict, nr_blades: int, air_density: float) -> dict:
+    # Thrust and torque per unit radius and the far wake axial velocity V(1+2a) of every element
+    x, k, k_prime = state['x'], state['k'], state['k_prime']
+    one = (1., 0.)
+    axial = _div(x['vinf'], _sub(one, k))                                   # V(1+a)
+    tangential = _div(_mul(x['rot_rate'], x['radius']), _add(one, k_prime))   # Omega r(1-a')
+    dynamic_pressure = _scale(_mul(_add(_mul(axial, axial), _mul(tangential, tangential)), x['chord']),
+                              0.5*air_density*nr_blades)
+
+    return {'thrust': _mul(dynamic_pressure, state['cn']),
+            'torque': _mul(_mul(dynamic_pressure, state['ct']), x['radius']),
+            'velocity': _div(_mul(x['vinf'], _add(one, k)), _sub(one, k))}
+
+
+def geometry_interpolation(propellerinfo: PropInfo, section_values: np.array) -> np.array:
+    # Section node values at the element midpoints, as in BEMGeometry
+    refinement = propellerinfo.local_refinement
+    section = np.repeat(np.arange(len(propellerinfo.span)), refinement)
+    midpoint = np.tile(np.arange(refinement), len(propellerinfo.span))/refinement + 0.5/refinement
+    section_values = np.asarray(section_values, dtype=float)
+    return (1.-midpoint)*section_values[section] + midpoint*section_values[section+1]
+
+
+def _element_inputs(component: om.ExplicitComponent) -> None:
+    component.add_input('radius', shape=component.options['nr_elements'])
+    component.add_input('chord', shape=component.options['nr_elements'])
+    component.add_input('twist', shape=component.options['nr_elements']) # rad
+    component.add_input('tip_radius', val=1.)
+    component.add_input('rot_rate', val=1.)
+    component.add_input('vinf', val=1.)
+
+
+def _element_values(inputs, phi: np.array) -> dict:
+    return {'phi': phi, **{name: inputs[name] if np.size(inputs[name]) > 1 else inputs[name][0]
+                           for name in ELEMENT_ARGS[1:]}}
+
+
+class BEMGeometry(om.ExplicitComponent):
+    # Blade elements from the HELIX span sections: every section is split into local_refinement elements, chord and
+    #   twist are interpolated linearly from the section nodes. All outputs are linear in the inputs.
+    def initialize(self):
+        self.options.declare('PropInfo', default=PropInfo)
+
+    def setup(self):
+        # === Options ===
+        propellerinfo = self.options['PropInfo']
+        nr_sections = len(propellerinfo.span)
+        refinement = propellerinfo.local_refinement
+        nr_elements = nr_sections*refinement
+
+        # Node radii r = hub_radius + nodes @ span and element values = interpolation @ section node values
+        section = np.repeat(np.arange(nr_sections), refinement)
+        fraction = np.tile(np.arange(refinement), nr_sections)/refinement
+        nodes = np.zeros((nr_elements+1, nr_sections))
+        nodes[:-1] = (np.arange(nr_sections) < section[:, np.newaxis]) + fraction[:, np.newaxis]*np.eye(nr_sections)[section]
+        nodes[-1] = 1.
+        self.nodes = nodes
+
+        midpoint = fraction + 0.5/refinement
+        interpolation = np.zeros((nr_elements, nr_sections+1))
+        interpolation[np.arange(nr_elements), section] = 1.-midpoint
+        interpolation[np.arange(nr_elements), section+1] = midpoint
+        self.interpolation = interpolation
+
+        # === Inputs ===
+        self.add_input('geodef_parametric_0_span', val=propellerinfo.span)
+        self.add_input('geodef_parametric_0_chord', val=propellerinfo.chord)
+        self.add_input('geodef_parametric_0_twist', val=propellerinfo.twist) # deg
+
+        # === Outputs ===
+        self.add_output('rotorcomp_0_radii', shape=nr_elements+1)
+        self.add_output('radius', shape=nr_elements)
+        self.add_output('width', shape=nr_elements)
+        self.add_output('tip_radius', val=1.)
+        self.add_output('chord', shape=nr_elements)
+        self.add_output('twist', shape=nr_elements) # rad
+
+        # === Partials ===
+        self.declare_partials('rotorcomp_0_radii', 'geodef_parametric_0_span', val=nodes)
+        self.declare_partials('radius', 'geodef_parametric_0_span', val=0.5*(nodes[1:]+nodes[:-1]))
+        self.declare_partials('width', 'geodef_parametric_0_span', val=nodes[1:]-nodes[:-1])
+        self.declare_partials('tip_radius', 'geodef_parametric_0_span', val=nodes[-1:])
+        self.declare_partials('chord', 'geodef_parametric_0_chord', val=interpolation)
+        self.declare_partials('twist', 'geodef_parametric_0_twist', val=np.deg2rad(interpolation))
+
+    def compute(self, inputs, outputs):
+        radii = np.asarray(self.options['PropInfo'].ref_point)[1] + self.nodes @ inputs['geodef_parametric_0_span']
+
+        outputs['rotorcomp_0_radii'] = radii
+        outputs['radius'] = 0.5*(radii[1:]+radii[:-1])
+        outputs['width'] = radii[1:]-radii[:-1]
+        outputs['tip_radius'] = radii[-1]
+        outputs['chord'] = self.interpolation @ inputs['geodef_parametric_0_chord']
+        outputs['twist'] = np.pi/180.*(self.interpolation @ inputs['geodef_parametric_0_twist'])
+
+
+class BEMInflow(om.ImplicitComponent):
+    """
+    Inflow angle of every blade element from the BEM residual, vectorised over the elements. The residuals are
+    uncoupled, solve_nonlinear runs a safeguarded Newton iteration per element inside the bracket (0, pi/2] and
+    solve_linear inverts the diagonal jacobian, so the group needs no Newton or direct solver.
+    """
+    def initialize(self):
+        self.options.declare('nr_elements', types=int)
+        self.options.declare('nr_blades', types=int)
+        self.options.declare('hub_radius', default=0.)
+        self.options.declare('airfoils', types=dict)     # Cl_alpha, alpha_L0, alpha_0 and M per element
+        self.options.declare('cd0', default=0.01)
+        self.options.declare('maxiter', default=50)
+        self.options.declare('atol', default=1e-12)
+
+    def setup(self):
+        nr_elements = self.options['nr_elements']
+        elements = np.arange(nr_elements)
+
+        # === Inputs ===
+        _element_inputs(self)
+
+        # === Outputs ===
+        self.add_output('phi', val=0.3*np.ones(nr_elements))
+
+        # === Partials ===
+        self.declare_partials('phi', ['phi', 'twist', 'chord', 'radius'], rows=elements, cols=elements)
+        self.declare_partials('phi', ['tip_radius', 'rot_rate', 'vinf'], rows=elements, cols=np.zeros(nr_elements, dtype=int))
+
+        self._inverse = None
+
+    def _state(self, inputs, phi: np.array) -> dict:
+        return element_state(_element_values(inputs, phi), self.options['airfoils'], self.options['nr_blades'],
+                             self.options['hub_radius'], self.options['cd0'])
+
+    def apply_nonlinear(self, inputs, outputs, residuals):
+        residuals['phi'] = self._state(inputs, outputs['phi'])['residual'][0]
+
+    def solve_nonlinear(self, inputs, outputs):
+        lower = np.full(self.options['nr_elements'], 1e-6)
+        upper = np.full(self.options['nr_elements'], 0.5*np.pi)
+        lower_residual = self._state(inputs, lower)['residual'][0]
+        upper_residual = self._state(inputs, upper)['residual'][0]
+        if np.any(lower_residual*upper_residual > 0.):
+            raise om.AnalysisError(f'{self.msginfo}: no propeller inflow angle in (0, pi/2] for elements '
+                                   f'{np.flatnonzero(lower_residual*upper_residual > 0.)}')
+
+        # Newton from the geometric inflow angle, not from the previous solution: the residual can have several roots
+        #   and the selected one must only depend on the inputs. Steps that leave the bracket are replaced by bisection.
+        #   The step is also taken once the residual is converged, under complex step it gives the imaginary part of phi.
+        phi = np.arctan(inputs['vinf']/(inputs['rot_rate']*inputs['radius'].real))
+        phi = np.clip(phi.real, lower, upper).astype(phi.dtype)
+        for _ in range(self.options['maxiter']):
+            residual, gradient = self._state(inputs, phi)['residual']
+
+            below = residual.real*lower_residual > 0.
+            lower, lower_residual = np.where(below, phi.real, lower), np.where(below, residual.real, lower_residual)
+            upper = np.where(below, upper, phi.real)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                newton = phi - residual/gradient[0]
+            phi = np.where((newton.real >= lower) & (newton.real <= upper), newton, 0.5*(lower+upper))
+
+            if np.max(np.abs(residual.real)) < self.options['atol']:
+                break
+
+        outputs['phi'] = phi
+
+    def linearize(self, inputs, outputs, partials):
+        _, gradient = self._state(inputs, outputs['phi'])['residual']
+        for index, name in enumerate(ELEMENT_ARGS):
+            partials['phi', name] = gradient[index]
+        self._inverse = 1./gradient[0]
+
+    def solve_linear(self, d_outputs, d_residuals, mode):
+        if mode == 'fwd':
+            d_outputs['phi'] = self._inverse*d_residuals['phi']
+        else:
+            d_residuals['phi'] = self._inverse*d_outputs['phi']
+
+
+class BEMLoads(om.ExplicitComponent):
+    # Rotor thrust and power and the far wake velocity of every element, in the shapes of the HELIX outputs
+    def initialize(self):
+        self.options.declare('nr_elements', types=int)
+        self.options.declare('nr_blades', types=int)
+        self.options.declare('hub_radius', default=0.)
+        self.options.declare('airfoils', types=dict)
+        self.options.declare('cd0', default=0.01)
+        self.options.declare('air_density', default=1.225)
+
+    def setup(self):
+        nr_elements = self.options['nr_elements']
+        elements = np.arange(nr_elements)
+
+        # === Inputs ===
+        _element_inputs(self)
+        self.add_input('phi', shape=nr_elements)
+        self.add_input('width', shape=nr_elements)
+
+        # === Outputs ===
+        self.add_output('rotorcomp_0_thrust', shape=(3, TIME_STEPS)) # thrust along the rotor axis, constant in time
+        self.add_output('rotorcomp_0_power', shape=TIME_STEPS)
+        self.add_output('rotorcomp_0_velocity_distribution', shape=nr_elements)
+
+        # === Partials ===
+        thrust_rows = np.repeat(2*TIME_STEPS + np.arange(TIME_STEPS), nr_elements)
+        power_rows = np.repeat(np.arange(TIME_STEPS), nr_elements)
+        for name in ('phi', 'twist', 'chord', 'radius', 'width'):
+            self.declare_partials('rotorcomp_0_thrust', name, rows=thrust_rows, cols=np.tile(elements, TIME_STEPS))
+            self.declare_partials('rotorcomp_0_power', name, rows=power_rows, cols=np.tile(elements, TIME_STEPS))
+        for name in ('tip_radius', 'rot_rate', 'vinf'):
+            self.declare_partials('rotorcomp_0_thrust', name, rows=2*TIME_STEPS + np.arange(TIME_STEPS),
+                                  cols=np.zeros(TIME_STEPS, dtype=int))
+            self.declare_partials('rotorcomp_0_power', name)
+        self.declare_partials('rotorcomp_0_velocity_distribution', ['phi', 'twist', 'chord', 'radius'],
+                              rows=elements, cols=elements)
+        self.declare_partials('rotorcomp_0_velocity_distribution', ['tip_radius', 'vinf'], # rot_rate only through phi
+                              rows=elements, cols=np.zeros(nr_elements, dtype=int))
+
+    def _loads(self, inputs) -> dict:
+        state = element_state(_element_values(inputs, inputs['phi']), self.options['airfoils'],
+                              self.options['nr_blades'], self.options['hub_radius'], self.options['cd0'])
+        return element_loads(state, self.options['nr_blades'], self.options['air_density'])
+
+    def compute(self, inputs, outputs):
+        loads = self._loads(inputs)
+        width = inputs['width']
+
+        outputs['rotorcomp_0_thrust'] = 0.
+        outputs['rotorcomp_0_thrust'][2] = np.sum(loads['thrust'][0]*width)
+        outputs['rotorcomp_0_power'] = inputs['rot_rate'][0]*np.sum(loads['torque'][0]*width)
+        outputs['rotorcomp_0_velocity_distribution'] = loads['velocity'][0]
+
+    def compute_partials(self, inputs, partials):
+        loads = self._loads(inputs)
+        width, rot_rate = inputs['width'], inputs['rot_rate'][0]
+        thrust, d_thrust = loads['thrust']
+        torque, d_torque = loads['torque']
+
+        for index, name in enumerate(ELEMENT_ARGS):
+            if name in ('tip_radius', 'rot_rate', 'vinf'):
+                partials['rotorcomp_0_thrust', name] = np.sum(d_thrust[index]*width)
+                partials['rotorcomp_0_power', name] = rot_rate*np.sum(d_torque[index]*width)
+            else:
+                partials['rotorcomp_0_thrust', name] = np.tile(d_thrust[index]*width, TIME_STEPS)
+                partials['rotorcomp_0_power', name] = np.tile(rot_rate*d_torque[index]*width, TIME_STEPS)
+            if name != 'rot_rate':
+                partials['rotorcomp_0_velocity_distribution', name] = loads['velocity'][1][index]
+
+        partials['rotorcomp_0_power', 'rot_rate'] += np.sum(torque*width)
+        partials['rotorcomp_0_thrust', 'width'] = np.tile(thrust, TIME_STEPS)
+        partials['rotorcomp_0_power', 'width'] = np.tile(rot_rate*torque, TIME_STEPS)
+
+
+class PropellerModelBEM(om.Group):
+    # Same options, inputs and outputs as PropellerModel, see the top of this file
+    def initialize(self):
+        self.options.declare('ParamInfo', default=ParamInfo)
+        self.options.declare('PropInfo', default=PropInfo)
+        self.options.declare('cd0', default=0.01) # profile drag coefficient of the blade sections
+
+    def setup(self):
+        # === Options ===
+        paraminfo = self.options['ParamInfo']
+        propellerinfo = self.options['PropInfo']
+        nr_elements = len(propellerinfo.span)*propellerinfo.local_refinement
+
+        geometry = BEMGeometry(PropInfo=propellerinfo)
+        airfoils = {name: geometry_interpolation(propellerinfo, propellerinfo.airfoils[name])
+                    for name in ('Cl_alpha', 'alpha_L0', 'alpha_0', 'M')}
+        element_options = dict(nr_elements=nr_elements,
+                               nr_blades=propellerinfo.nr_blades,
+                               hub_radius=float(np.asarray(propellerinfo.ref_point)[1]),
+                               airfoils=airfoils,
+                               cd0=self.options['cd0'])
+
+        # === Components ===
+        # Named like the HELIX group so that the connections of the integration groups apply unchanged
+        om_helix = self.add_subsystem('om_helix', om.Group(), promotes=[])
+        om_helix.add_subsystem('geometry', geometry, promotes=['*'])
+        om_helix.add_subsystem('inflow', BEMInflow(**element_options),
+                               promotes_inputs=['*', ('rot_rate', 'geodef_parametric_0_rot_rate')],
+                               promotes_outputs=['*'])
+        om_helix.add_subsystem('loads', BEMLoads(air_density=paraminfo.air_density, **element_options),
+                               promotes_inputs=['*', ('rot_rate', 'geodef_parametric_0_rot_rate')],
+                               promotes_outputs=['*'])
+
+        om_helix.set_input_defaults('geodef_parametric_0_rot_rate', propellerinfo.rot_rate)
+        om_helix.set_input_defaults('vinf', paraminfo.vinf) # fixed like the HELIX freestream, or connected
+
@@ -5,39 +5,189 @@ from src.base import WingPropInfo
 from rethorst.openmdao.om_rethorst_velocityinterpolation import RETHORST_velocityinterpolation
 from rethorst.openmdao.om_rethorst_correctionmatrix import RETHORST_correction
 from tubemodel.openmdao.om_tubemodel_coupled import TUBEMODEL_coupled
+from src.models.correction_table import RethorstCorrectionTable
 
 # --- External ---
+import numpy as np
 import openmdao.api as om
+import scipy.sparse as sp
 
 
 class SlipStreamModel(om.Group):
     def initialize(self):
         self.options.declare('WingPropInfo', default=WingPropInfo)
+        self.options.declare('correction_table', default=None) # CorrectionTableSpec, interpolate a tabulated correction
+        self.options.declare('sparse_interpolation', default=False) # SparseVelocityInterpolation instead of the rethorst one
 
     def setup(self):
         # === Options ===
         wingpropinfo = self.options["WingPropInfo"]
 
         # === Components ===
+        interpolation = SparseVelocityInterpolation if self.options['sparse_interpolation'] else RETHORST_velocityinterpolation
         self.add_subsystem('interpolation',
-                           subsys=RETHORST_velocityinterpolation(propeller_quantity=wingpropinfo.nr_props,
-                                                                 propeller_discretisation_BEM=wingpropinfo.spanwise_discretisation_propeller_BEM,
-                                                                 propeller_discretisation=wingpropinfo.spanwise_discretisation_propeller,
-                                                                 propeller_tipradii=[wingpropinfo.propeller[index].prop_radius[-1] for index in range(wingpropinfo.nr_props)],
-                                                                 propeller_local_refinement=wingpropinfo.propeller[0].local_refinement), # assuming homogeneous propeller blade refinement across propellers
+                           subsys=interpolation(propeller_quantity=wingpropinfo.nr_props,
+                                                propeller_discretisation_BEM=wingpropinfo.spanwise_discretisation_propeller_BEM,
+                                                propeller_discretisation=wingpropinfo.spanwise_discretisation_propeller,
+                                                propeller_tipradii=[wingpropinfo.propeller[index].prop_radius[-1] for index in range(wingpropinfo.nr_props)],
+                                                propeller_local_refinement=wingpropinfo.propeller[0].local_refinement), # assuming homogeneous propeller blade refinement across propellers
                            promotes_outputs=['propeller_radii',
                                              'propeller_velocity'])
 
+        if self.options['correction_table'] is None:
+            correction = RETHORST_correction(propeller_quantity=wingpropinfo.nr_props,
+                                             propeller_discretisation=wingpropinfo.spanwise_discretisation_propeller,
+                                             mesh=wingpropinfo.vlm_mesh,
+                                             NO_CORRECTION=wingpropinfo.NO_CORRECTION,
+                                             NO_PROPELLER=wingpropinfo.NO_PROPELLER)
+        else:
+            correction = RethorstCorrectionTable(WingPropInfo=wingpropinfo,
+                                                 spec=self.options['correction_table'])
+
         self.add_subsystem('correction',
-                           subsys=RETHORST_correction(propeller_quantity=wingpropinfo.nr_props,
-                                                      propeller_discretisation=wingpropinfo.spanwise_discretisation_propeller,
-                                                      mesh=wingpropinfo.vlm_mesh,
-                                                      NO_CORRECTION=wingpropinfo.NO_CORRECTION,
-                                                      NO_PROPELLER=wingpropinfo.NO_PROPELLER),
+                           subsys=correction,
                            promotes_inputs=['propeller_locations',
                                             'propeller_radii',
                                             'wing_mesh',
                                             'wing_mesh_control_points',
                                             'propeller_velocity'],
                            promotes_outputs=['correction_matrix',
-                                             'velocity_distribution'])
\ No newline at end of file
+                                             'velocity_distribution'])
+
+
+class SparseVelocityInterpolation(om.ExplicitComponent):
+    """
+    RETHORST_velocityinterpolation with precomputed sparse weights. For fixed blade radii the rethorst mapping is
+    affine in the blade element velocities, propeller_velocity = W @ v_BEM + hub*vinf, so W and hub are extracted
+    once from the derivatives of a standalone RETHORST_velocityinterpolation and only extracted again when the
+    blade radii change. All rotors are batched into one block-diagonal sparse W. Values and the partials to the
+    velocities are sparse products, the partials to the blade radii are those of the rethorst component.
+    """
+    def initialize(self):
+        self.options.declare('propeller_quantity', types=int)
+        self.options.declare('propeller_discretisation_BEM', types=int)
+        self.options.declare('propeller_discretisation', types=int)
+        self.options.declare('propeller_tipradii', types=list)
+        self.options.declare('propeller_local_refinement', types=int, default=1)
+
+    def setup(self):
+        # === Options ===
+        nr_props = self.options['propeller_quantity']
+        nr_panels = self.options['propeller_discretisation']
+        nr_elements = self.options['propeller_discretisation_BEM']*self.options['propeller_local_refinement']
+
+        # === Inputs ===
+        self.add_input('vinf', val=1., units='m/s')
+        for index in range(nr_props):
+            self.add_input(f'propeller_radii_BEM_rotor{index}', shape=nr_elements+1, units='m')
+            self.add_input(f'propeller_velocity_BEM_rotor{index}', shape=nr_elements, units='m/s')
+
+        # === Outputs ===
+        self.add_output('propeller_radii', shape=(nr_props, nr_panels+1), units='m')
+        self.add_output('propeller_velocity', shape=(nr_props, nr_panels), units='m/s')
+
+        # The reference mapping, evaluated only when the blade radii change
+        self.rethorst = om.Problem(comm=self.comm, reports=False)
+        self.rethorst.model.add_subsystem('interpolation',
+                                          RETHORST_velocityinterpolation(**{name: self.options[name]
+                                                                            for name in self.options}),
+                                          promotes=['*'])
+        self.rethorst.setup()
+
+        self.weights = None     # sparse W, (nr_props*nr_panels, nr_props*nr_elements)
+        self.hub = None         # d propeller_velocity / d vinf, (nr_props*nr_panels,)
+        self.radii = None       # propeller_radii of the rethorst component
+        self._blade_radii = None
+        self._radii_jacobian = (None, None) # (point, jacobian) of the last linearisation
+
+    def _names(self, name: str) -> list[str]:
+        return [f'{name}_rotor{index}' for index in range(self.options['propeller_quantity'])]
+
+    def _blade(self, inputs, name: str) -> np.array:
+        return np.array([inputs[blade_name] for blade_name in self._names(name)])
+
+    def _set_rethorst(self, inputs, velocity_scale: float=1.) -> None:
+        self.rethorst.set_val('vinf', inputs['vinf'].real*velocity_scale)
+        for name in self._names('propeller_radii_BEM'):
+            self.rethorst.set_val(name, inputs[name].real)
+        for name in self._names('propeller_velocity_BEM'):
+            self.rethorst.set_val(name, inputs[name].real*velocity_scale)
+
+    def _update_weights(self, inputs) -> None:
+        blade_radii = self._blade(inputs, 'propeller_radii_BEM').real
+        if self._blade_radii is not None and np.array_equal(blade_radii, self._blade_radii):
+            return
+
+        # Without velocities the mapping has to vanish, with them W and hub have to reproduce it
+        self._set_rethorst(inputs, velocity_scale=0.)
+        self.rethorst.run_model()
+        offset = np.abs(self.rethorst.get_val('propeller_velocity')).max()
+
+        self._set_rethorst(inputs)
+        self.rethorst.run_model()
+        wrt = self._names('propeller_velocity_BEM') + ['vinf']
+        totals = self.rethorst.compute_totals(of=['propeller_velocity'], wrt=wrt, return_format='array')
+
+        self.weights = sp.csr_matrix(totals[:, :-1])
+        self.weights.eliminate_zeros()
+        self.hub = totals[:, -1].copy()
+        self.radii = self.rethorst.get_val('propeller_radii').copy()
+        self._blade_radii = blade_radii
+
+        reference = self.rethorst.get_val('propeller_velocity').ravel()
+        mapped = self.weights @ self._blade(inputs, 'propeller_velocity_BEM').real.ravel() + self.hub*inputs['vinf'].real[0]
+        scale = max(np.abs(reference).max(), 1.)
+        if offset > 1e-10*scale or np.abs(mapped - reference).max() > 1e-8*scale:
+            raise ValueError(f'{self.msginfo}: the rethorst velocity interpolation is not linear in the velocities, '
+                             f'use SlipStreamModel(sparse_interpolation=False)')
+
+    def compute(self, inputs, outputs):
+        self._update_weights(inputs)
+        velocity = self._blade(inputs, 'propeller_velocity_BEM').ravel()
+
+        outputs['propeller_radii'] = self.radii
+        outputs['propeller_velocity'] = (self.weights @ velocity + self.hub*inputs['vinf'][0]).reshape(
+            outputs['propeller_velocity'].shape)
+
+    def _radii_partials(self, inputs) -> np.array:
+        # d propeller_velocity / d blade radii of the rethorst component at the current point, once per point
+        point = inputs.asarray().real.tobytes()
+        if self._radii_jacobian[0] != point:
+            self._set_rethorst(inputs)
+            self.rethorst.run_model()
+            self._radii_jacobian = (point, self.rethorst.compute_totals(of=['propeller_velocity'],
+                                                                        wrt=self._names('propeller_radii_BEM'),
+                                                                        return_format='array'))
+        return self._radii_jacobian[1]
+
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+        if 'propeller_velocity' not in d_outputs:
+            return
+
+        self._update_weights(inputs)
+        nr_props = self.options['propeller_quantity']
+        shape = d_outputs['propeller_velocity'].shape
+        operators = [('propeller_velocity_BEM', self.weights)]
+        if any(name in d_inputs for name in self._names('propeller_radii_BEM')):
+            operators.append(('propeller_radii_BEM', self._radii_partials(inputs)))
+
+        for name, operator in operators:
+            names = self._names(name)
+            if not any(blade_name in d_inputs for blade_name in names):
+                continue
+
+            if mode == 'fwd':
+                d_blade = np.array([d_inputs[blade_name] if blade_name in d_inputs else
+                                    np.zeros(operator.shape[1]//nr_props) for blade_name in names])
+                d_outputs['propeller_velocity'] += (operator @ d_blade.ravel()).reshape(shape)
+            else:
+                d_blade = (operator.T @ d_outputs['propeller_velocity'].ravel()).reshape(nr_props, -1)
+                for index, blade_name in enumerate(names):
+                    if blade_name in d_inputs:
+                        d_inputs[blade_name] += d_blade[index]
+
+        if 'vinf' in d_inputs:
+            if mode == 'fwd':
+                d_outputs['propeller_velocity'] += (self.hub*d_inputs['vinf'][0]).reshape(shape)
+            else:
+                d_inputs['vinf'] += self.hub @ d_outputs['propeller_velocity'].ravel()
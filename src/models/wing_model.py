@@ -1,8 +1,11 @@
 # --- Built-ins ---
+from dataclasses import dataclass, field
+from functools import lru_cache
 import os
 
 # --- Internal ---
 from src.base import WingPropInfo
+from src.utils.caching import cache_key
 from openaerostruct.integration.aerostruct_groups import AerostructGeometry, AerostructPoint
 
 # --- External ---
@@ -10,234 +13,309 @@ import numpy as np
 import openmdao.api as om
 
 
-class WingModelTube(om.Group):
+def tube_surface(wingpropinfo: WingPropInfo) -> dict:
+    winginfo = wingpropinfo.wing
     
-    def initialize(self):
-        self.options.declare('WingPropInfo', default=WingPropInfo)
-        
-    def setup(self):
-        # === Options ===
-        wingpropinfo = self.options['WingPropInfo']
-        winginfo = wingpropinfo.wing
-        
-        # === Components ===
-        thickness_cp = winginfo.thickness
-        twist_cp = winginfo.twist
-        chord_cp = winginfo.chord
-        
-        mesh = wingpropinfo.vlm_mesh
-
-        # TODO: quite a feww magic numbers here
-        surface = {
-                    # # Constraints
-                    #   # if false, use KS function
-                    "name": "wing",  # name of the surface
-                    "symmetry": False,  # if true, model one half of wing reflected across the plane y = 0
-                    "S_ref_type": "wetted",  # how we compute the wing area,        # can be 'wetted' or 'projected'
-                    "fem_model_type": "tube",
-                    "thickness_cp": thickness_cp, # thickness of material
-                    "twist_cp": np.zeros(len(twist_cp)),
-                    "chord_cp": np.ones(len(chord_cp)),
-                    "mesh": mesh,
-                    "CL0": winginfo.CL0,  # CL of the surface at alpha=0 
-                    # please never ever set this to non-zero unless you want completely erroneous optimization results
-                    # "W0": winginfo.empty_weight,
-                    "CD0": 0.015,  # CD of the surface at alpha=0
-                    "k_lam": 0.05,  # percentage of chord with laminar flow, used for viscous drag
-                    "t_over_c_cp": np.array([0.15]),  # thickness over chord ratio (NACA0015)
-                    "c_max_t": 0.303,  # chordwise location of maximum (NACA0015) thickness
-                    "with_viscous": True,
-                    "with_wave": False,  # if true, compute wave drag
-                    # Structural values are based on aluminum 7075
-                    "E": wingpropinfo.wing.youngsmodulus,  # [Pa] Young's modulus of the spar: divide by 2 for mimicing manoeuvre
-                    "G": wingpropinfo.wing.G,  # [Pa] shear modulus of the spar
-                    "yield": wingpropinfo.wing.yieldstress,# [Pa] yield stress divided by 2.5 for limiting case
-                    "mrho": wingpropinfo.wing.mrho, # [kg/m^3] material density
-                    "fem_origin": 0.35,  # normalized chordwise location of the spar
-                    "wing_weight_ratio": 2.0,
-                    "struct_weight_relief": True,  # True to add the weight of the structure to the loads on the structure
-                    "distributed_fuel_weight": False,
-                    # Constraints
-                    "exact_failure_constraint": False,  # if false, use KS function
-                    "Wf_reserve": 0
-                    }
-
-        aerostruct_group = AerostructGeometry(surface=surface)
+    thickness_cp = winginfo.thickness
+    twist_cp = winginfo.twist
+    chord_cp = winginfo.chord
+    
+    mesh = wingpropinfo.vlm_mesh
 
-        name = "wing"
+    # TODO: quite a feww magic numbers here
+    surface = {
+                # # Constraints
+                #   # if false, use KS function
+                "name": "wing",  # name of the surface
+                "symmetry": False,  # if true, model one half of wing reflected across the plane y = 0
+                "S_ref_type": "wetted",  # how we compute the wing area,        # can be 'wetted' or 'projected'
+                "fem_model_type": "tube",
+                "thickness_cp": thickness_cp, # thickness of material
+                "twist_cp": np.zeros(len(twist_cp)),
+                "chord_cp": np.ones(len(chord_cp)),
+                "mesh": mesh,
+                "CL0": winginfo.CL0,  # CL of the surface at alpha=0 
+                # please never ever set this to non-zero unless you want completely erroneous optimization results
+                # "W0": winginfo.empty_weight,
+                "CD0": 0.015,  # CD of the surface at alpha=0
+                "k_lam": 0.05,  # percentage of chord with laminar flow, used for viscous drag
+                "t_over_c_cp": np.array([0.15]),  # thickness over chord ratio (NACA0015)
+                "c_max_t": 0.303,  # chordwise location of maximum (NACA0015) thickness
+                "with_viscous": True,
+                "with_wave": False,  # if true, compute wave drag
+                # Structural values are based on aluminum 7075
+                "E": wingpropinfo.wing.youngsmodulus,  # [Pa] Young's modulus of the spar: divide by 2 for mimicing manoeuvre
+                "G": wingpropinfo.wing.G,  # [Pa] shear modulus of the spar
+                "yield": wingpropinfo.wing.yieldstress,# [Pa] yield stress divided by 2.5 for limiting case
+                "mrho": wingpropinfo.wing.mrho, # [kg/m^3] material density
+                "fem_origin": 0.35,  # normalized chordwise location of the spar
+                "wing_weight_ratio": 2.0,
+                "struct_weight_relief": True,  # True to add the weight of the structure to the loads on the structure
+                "distributed_fuel_weight": False,
+                # Constraints
+                "exact_failure_constraint": False,  # if false, use KS function
+                "Wf_reserve": 0
+                }
 
-        # Add tmp_group to the problem with the name of the surface.
-        self.add_subsystem(name, aerostruct_group)
-
-        point_name = "AS_point_0"
-
-        # Create the aero point group and add it to the model
-        AS_point = AerostructPoint(surfaces=[surface],
-                                   internally_connect_fuelburn=False) # we don't like fuelburn so explicitly connect it
-
-        self.add_subsystem(
-            point_name,
-            AS_point,
-            promotes_inputs=[
-                "v",
-                "alpha",
-                "Mach_number",
-                "re",
-                "rho",
-                "CT",
-                "R",
-                "W0",
-                "speed_of_sound",
-                "empty_cg",
-                "load_factor",
-            ],
-        )
-        
-        # === Explicit connections ===
-        com_name = point_name + "." + name + "_perf"
-        self.connect(name + ".local_stiff_transformed", point_name + ".coupled." + name + ".local_stiff_transformed")
-        self.connect(name + ".nodes", point_name + ".coupled." + name + ".nodes")
-
-        # Connect aerodyamic mesh to coupled group mesh
-        self.connect(name + ".mesh", point_name + ".coupled." + name + ".mesh")
-
-        # Connect performance calculation variables
-        self.connect(name + ".radius", com_name + ".radius")
-        self.connect(name + ".thickness", com_name + ".thickness")
-        self.connect(name + ".nodes", com_name + ".nodes")
-        self.connect(name + ".cg_location", point_name + "." + "total_perf." + name + "_cg_location")
-        self.connect(name + ".structural_mass", point_name + "." + "total_perf." + name + "_structural_mass")
-        self.connect(name + ".t_over_c", com_name + ".t_over_c")
-        
-class WingModelWingBox(om.Group):
+    return surface
+
+
+WINGBOX_AIRFOIL = os.path.join(os.path.dirname(__file__), 'data', 'wingbox_airfoil_SC2-0612.txt')
+
+
+@dataclass(frozen=True, slots=True)
+class WingboxAirfoil:
+    # Upper and lower skin coordinates between the spars, normalised by the chord
+    x_upper: np.ndarray
+    x_lower: np.ndarray
+    y_upper: np.ndarray
+    y_lower: np.ndarray
+    t_over_c: float
+
+
+@lru_cache(maxsize=None)
+def wingbox_airfoil(filename: str=WINGBOX_AIRFOIL, complex_step: bool=False) -> WingboxAirfoil:
+    # Read once per file and dtype, the arrays are read-only since every surface shares them.
+    #   OAS complex-steps its wingbox partials from the (complex) inputs, so real data suffices
+    #   unless the surface itself is complex-stepped (complex_step=True)
+    t_over_c = None
+    with open(filename, 'r') as file:
+        for line in file:
+            if line.startswith('#') and 't_over_c' in line:
+                t_over_c = float(line.split('=')[-1])
+
+    data = np.loadtxt(filename, comments='#', dtype='complex128' if complex_step else 'float64', ndmin=2)
+    data.setflags(write=False)
+
+    x_upper, y_upper, x_lower, y_lower = data.T
+    return WingboxAirfoil(x_upper=x_upper, x_lower=x_lower, y_upper=y_upper, y_lower=y_lower, t_over_c=t_over_c)
+
+
+def wingbox_surface(wingpropinfo: WingPropInfo, complex_step: bool=False) -> dict:
+    winginfo = wingpropinfo.wing
+    
+    thickness_cp = winginfo.thickness
+    twist_cp = winginfo.twist
+    chord_cp = winginfo.chord
     
+    mesh = wingpropinfo.vlm_mesh
+    
+    airfoil = wingbox_airfoil(complex_step=complex_step)
+
+    surface = {
+        # Wing definition
+        "name": "wing",  # give the surface some name
+        "symmetry": False,  # if True, model only one half of the lifting surface
+        "S_ref_type": "projected",  # how we compute the wing area,
+        # can be 'wetted' or 'projected'
+        "mesh": mesh,
+        "fem_model_type": "wingbox",  # 'wingbox' or 'tube'
+        "data_x_upper": airfoil.x_upper,
+        "data_x_lower": airfoil.x_lower,
+        "data_y_upper": airfoil.y_upper,
+        "data_y_lower": airfoil.y_lower,
+        # docs checkpoint 4
+        "spar_thickness_cp": np.array([0.004, 0.005, 0.008, 0.01]),  # [m]
+        "skin_thickness_cp": np.array([0.005, 0.01, 0.015, 0.025]),  # [m]
+        "twist_cp": twist_cp,
+        "chord_cp": np.ones(len(chord_cp)),
+        "t_over_c_cp": np.array([0.08, 0.08, 0.10, 0.08]),
+        "span": winginfo.span,
+        "original_wingbox_airfoil_t_over_c": airfoil.t_over_c,
+        # docs checkpoint 5
+        # Aerodynamic deltas.
+        # These CL0 and CD0 values are added to the CL and CD
+        # obtained from aerodynamic analysis of the surface to get
+        # the total CL and CD.
+        # These CL0 and CD0 values do not vary wrt alpha.
+        # They can be used to account for things that are not included, such as contributions from the fuselage, camber, etc.
+        "CL0": 0.0,  # CL delta
+        "CD0": 0.0078,  # CD delta
+        "with_viscous": True,  # if true, compute viscous drag
+        "with_wave": False,  # if true, compute wave drag
+        # Airfoil properties for viscous drag calculation
+        "k_lam": 0.05,  # fraction of chord with laminar
+        # flow, used for viscous drag
+        "c_max_t": 0.38,  # chordwise location of maximum thickness
+        # docs checkpoint 6
+        # Structural values are based on aluminum 7075
+        "E": 73.1e9,  # [Pa] Young's modulus
+        "G": (73.1e9 / 2 / 1.33),  # [Pa] shear modulus (calculated using E and the Poisson's ratio here)
+        "yield": (420.0e6 / 1.5),  # [Pa] allowable yield stress
+        "mrho": 2.78e3,  # [kg/m^3] material density
+        "strength_factor_for_upper_skin": 1.0,  # the yield stress is multiplied by this factor for the upper skin
+        "wing_weight_ratio": 1.25,
+        "exact_failure_constraint": False,  # if false, use KS function
+        # docs checkpoint 7
+        "struct_weight_relief": True,
+        "distributed_fuel_weight": False,
+        # "n_point_masses": 1,  # number of point masses in the system; in this case, the engine (omit option if no point masses)
+        # docs checkpoint 8
+        "fuel_density": 803.0,  # [kg/m^3] fuel density (only needed if the fuel-in-wing volume constraint is used)
+        "Wf_reserve": 15000.0,  # [kg] reserve fuel mass
+    }
+
+    return surface
+
+
+# AerostructPoint inputs that differ per flight condition, the remaining ones are shared by all points
+POINT_INPUTS = ["v", "alpha", "Mach_number", "re", "rho", "CT", "R", "speed_of_sound", "load_factor"]
+SHARED_INPUTS = ["W0", "empty_cg"]
+
+
+def point_names(flight_conditions: list=None, parallel: bool=False) -> list[str]:
+    # Paths of the AS_points relative to the wing model
+    prefix = 'points.' if parallel else ''
+    return [f'{prefix}AS_point_{index}' for index in range(len(flight_conditions or [None]))]
+
+
+def add_aerostruct_points(group: om.Group, surface: dict, flight_conditions: list=None,
+                          parallel: bool=False, **point_options) -> list[str]:
+    # One AerostructPoint per flight condition, all points share the single AerostructGeometry of the group.
+    #   Without flight conditions there is one point with scalar inputs, otherwise the
+    #   per-point inputs are vectors with one entry per flight condition.
+    names = point_names(flight_conditions, parallel)
+
+    container = group
+    if parallel:
+        container = group.add_subsystem('points', om.ParallelGroup(),
+                                        promotes_inputs=POINT_INPUTS+SHARED_INPUTS)
+
+    for index, name in enumerate(names):
+        point_name = name.split('.')[-1]
+        container.add_subsystem(point_name,
+                                AerostructPoint(surfaces=[surface], **point_options),
+                                promotes_inputs=SHARED_INPUTS)
+        if flight_conditions is None:
+            container.promotes(point_name, inputs=POINT_INPUTS)
+        else:
+            container.promotes(point_name, inputs=POINT_INPUTS,
+                               src_indices=[index], src_shape=(len(flight_conditions),))
+
+    return names
+
+
+# Surface dictionaries are shared by all wing models built from the same WingPropInfo data in this process,
+#   so re-running prob.setup() (e.g. in sweeps) does not rebuild them. Treat them as read-only.
+SURFACE_CACHE_SIZE = 16
+_SURFACE_CACHE = {}
+
+
+def _memoised(cache: dict, key: tuple, build):
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        if len(cache) >= SURFACE_CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+        cache[key] = value
+    return value
+
+
+@dataclass(slots=True)
+class SurfaceSpec:
+    # What the surface dictionary is built from, on top of the WingPropInfo
+    fem_model_type: str = 'tube'                            # 'tube' or 'wingbox'
+    complex_step: bool = False                              # complex wingbox airfoil data
+    overrides: dict = field(default_factory=dict)           # replaces entries of the default surface
+
+
+def wing_surface(wingpropinfo: WingPropInfo, spec: SurfaceSpec=None) -> dict:
+    spec = spec or SurfaceSpec()
+    if spec.fem_model_type not in ('tube', 'wingbox'):
+        raise ValueError(f'Unknown fem_model_type {spec.fem_model_type}, use tube or wingbox')
+
+    def build() -> dict:
+        if spec.fem_model_type == 'wingbox':
+            surface = wingbox_surface(wingpropinfo, complex_step=spec.complex_step)
+        else:
+            surface = tube_surface(wingpropinfo)
+        surface.update(spec.overrides)
+        return surface
+
+    return _memoised(_SURFACE_CACHE, _surface_key(wingpropinfo, spec), build)
+
+
+def _surface_key(wingpropinfo: WingPropInfo, spec: SurfaceSpec) -> tuple:
+    winginfo = wingpropinfo.wing
+    return cache_key(spec, wingpropinfo.vlm_mesh, winginfo.thickness, winginfo.twist, winginfo.chord, winginfo.span,
+                     winginfo.CL0, winginfo.youngsmodulus, winginfo.G, winginfo.yieldstress, winginfo.mrho)
+
+
+def preload_surface(wingpropinfo: WingPropInfo, surface: dict, spec: SurfaceSpec=None) -> None:
+    # Use a surface that was built elsewhere (e.g. broadcast by a parent process) for the current configuration,
+    #   every wing model of this configuration and spec then gets it from wing_surface
+    _SURFACE_CACHE[_surface_key(wingpropinfo, spec or SurfaceSpec())] = surface
+
+
+class WingModel(om.Group):
+    # OpenAeroStruct wing with a tube or wingbox structure: one AerostructGeometry shared by
+    #   one AerostructPoint per flight condition
+    fem_model_type = 'tube'
+
     def initialize(self):
         self.options.declare('WingPropInfo', default=WingPropInfo)
-        
+        self.options.declare('surface_spec', default=None) # SurfaceSpec, a default one of fem_model_type if not given
+        self.options.declare('surface', default=None) # prebuilt surface dictionary, overrides the surface spec
+        self.options.declare('flight_conditions', default=None) # list of ParamInfo, one AS_point per condition
+        self.options.declare('parallel', default=False) # run the AS_points in a ParallelGroup
+        self.options.declare('complex_step', default=False) # complex airfoil data, only to complex-step the whole model
+
     def setup(self):
         # === Options ===
         wingpropinfo = self.options['WingPropInfo']
-        winginfo = wingpropinfo.wing
-        
+        spec = self.options['surface_spec'] or SurfaceSpec(fem_model_type=self.fem_model_type,
+                                                           complex_step=self.options['complex_step'])
+
         # === Components ===
-        thickness_cp = winginfo.thickness
-        twist_cp = winginfo.twist
-        chord_cp = winginfo.chord
-        
-        mesh = wingpropinfo.vlm_mesh
-        
-        upper_x = np.array([0.1, 0.11, 0.12, 0.13, 0.14, 0.15, 0.16, 0.17, 0.18, 0.19, 0.2, 0.21, 0.22, 0.23, 0.24, 0.25, 0.26, 0.27, 0.28, 0.29, 0.3, 0.31, 0.32, 0.33, 0.34, 0.35, 0.36, 0.37, 0.38, 0.39, 0.4, 0.41, 0.42, 0.43, 0.44, 0.45, 0.46, 0.47, 0.48, 0.49, 0.5, 0.51, 0.52, 0.53, 0.54, 0.55, 0.56, 0.57, 0.58, 0.59, 0.6], dtype="complex128")
-        lower_x = np.array([0.1, 0.11, 0.12, 0.13, 0.14, 0.15, 0.16, 0.17, 0.18, 0.19, 0.2, 0.21, 0.22, 0.23, 0.24, 0.25, 0.26, 0.27, 0.28, 0.29, 0.3, 0.31, 0.32, 0.33, 0.34, 0.35, 0.36, 0.37, 0.38, 0.39, 0.4, 0.41, 0.42, 0.43, 0.44, 0.45, 0.46, 0.47, 0.48, 0.49, 0.5, 0.51, 0.52, 0.53, 0.54, 0.55, 0.56, 0.57, 0.58, 0.59, 0.6], dtype="complex128")
-        upper_y = np.array([ 0.0447,  0.046,  0.0472,  0.0484,  0.0495,  0.0505,  0.0514,  0.0523,  0.0531,  0.0538, 0.0545,  0.0551,  0.0557, 0.0563,  0.0568, 0.0573,  0.0577,  0.0581,  0.0585,  0.0588,  0.0591,  0.0593,  0.0595,  0.0597,  0.0599,  0.06,    0.0601,  0.0602,  0.0602,  0.0602,  0.0602,  0.0602,  0.0601,  0.06,    0.0599,  0.0598,  0.0596,  0.0594,  0.0592,  0.0589,  0.0586,  0.0583,  0.058,   0.0576,  0.0572,  0.0568,  0.0563,  0.0558,  0.0553,  0.0547,  0.0541], dtype="complex128")  # noqa: E201, E241
-        lower_y = np.array([-0.0447, -0.046, -0.0473, -0.0485, -0.0496, -0.0506, -0.0515, -0.0524, -0.0532, -0.054, -0.0547, -0.0554, -0.056, -0.0565, -0.057, -0.0575, -0.0579, -0.0583, -0.0586, -0.0589, -0.0592, -0.0594, -0.0595, -0.0596, -0.0597, -0.0598, -0.0598, -0.0598, -0.0598, -0.0597, -0.0596, -0.0594, -0.0592, -0.0589, -0.0586, -0.0582, -0.0578, -0.0573, -0.0567, -0.0561, -0.0554, -0.0546, -0.0538, -0.0529, -0.0519, -0.0509, -0.0497, -0.0485, -0.0472, -0.0458, -0.0444], dtype="complex128")
-        
-        surface = {
-            # Wing definition
-            "name": "wing",  # give the surface some name
-            "symmetry": False,  # if True, model only one half of the lifting surface
-            "S_ref_type": "projected",  # how we compute the wing area,
-            # can be 'wetted' or 'projected'
-            "mesh": mesh,
-            "fem_model_type": "wingbox",  # 'wingbox' or 'tube'
-            "data_x_upper": upper_x,
-            "data_x_lower": lower_x,
-            "data_y_upper": upper_y,
-            "data_y_lower": lower_y,
-            # docs checkpoint 4
-            "spar_thickness_cp": np.array([0.004, 0.005, 0.008, 0.01]),  # [m]
-            "skin_thickness_cp": np.array([0.005, 0.01, 0.015, 0.025]),  # [m]
-            "twist_cp": twist_cp,
-            "chord_cp": np.ones(len(chord_cp)),
-            "t_over_c_cp": np.array([0.08, 0.08, 0.10, 0.08]),
-            "span": winginfo.span,
-            "original_wingbox_airfoil_t_over_c": 0.12,
-            # docs checkpoint 5
-            # Aerodynamic deltas.
-            # These CL0 and CD0 values are added to the CL and CD
-            # obtained from aerodynamic analysis of the surface to get
-            # the total CL and CD.
-            # These CL0 and CD0 values do not vary wrt alpha.
-            # They can be used to account for things that are not included, such as contributions from the fuselage, camber, etc.
-            "CL0": 0.0,  # CL delta
-            "CD0": 0.0078,  # CD delta
-            "with_viscous": True,  # if true, compute viscous drag
-            "with_wave": False,  # if true, compute wave drag
-            # Airfoil properties for viscous drag calculation
-            "k_lam": 0.05,  # fraction of chord with laminar
-            # flow, used for viscous drag
-            "c_max_t": 0.38,  # chordwise location of maximum thickness
-            # docs checkpoint 6
-            # Structural values are based on aluminum 7075
-            "E": 73.1e9,  # [Pa] Young's modulus
-            "G": (73.1e9 / 2 / 1.33),  # [Pa] shear modulus (calculated using E and the Poisson's ratio here)
-            "yield": (420.0e6 / 1.5),  # [Pa] allowable yield stress
-            "mrho": 2.78e3,  # [kg/m^3] material density
-            "strength_factor_for_upper_skin": 1.0,  # the yield stress is multiplied by this factor for the upper skin
-            "wing_weight_ratio": 1.25,
-            "exact_failure_constraint": False,  # if false, use KS function
-            # docs checkpoint 7
-            "struct_weight_relief": True,
-            "distributed_fuel_weight": False,
-            # "n_point_masses": 1,  # number of point masses in the system; in this case, the engine (omit option if no point masses)
-            # docs checkpoint 8
-            "fuel_density": 803.0,  # [kg/m^3] fuel density (only needed if the fuel-in-wing volume constraint is used)
-            "Wf_reserve": 15000.0,  # [kg] reserve fuel mass
-        }
-
-        aerostruct_group = AerostructGeometry(surface=surface)
+        surface = self.options['surface']
+        if surface is None:
+            surface = wing_surface(wingpropinfo, spec)
+        tube = surface['fem_model_type'] == 'tube'
 
         name = "wing"
+        self.add_subsystem(name, AerostructGeometry(surface=surface))
+
+        # Create the aero point groups and add them to the model
+        point_options = {'internally_connect_fuelburn': False} if tube else {} # we don't like fuelburn so explicitly connect it
+        point_names = add_aerostruct_points(self, surface,
+                                            flight_conditions=self.options['flight_conditions'],
+                                            parallel=self.options['parallel'],
+                                            **point_options)
 
-        # Add tmp_group to the problem with the name of the surface.
-        self.add_subsystem(name, aerostruct_group)
-
-        point_name = "AS_point_0"
-
-        # Create the aero point group and add it to the model
-        AS_point = AerostructPoint(surfaces=[surface])
-
-        self.add_subsystem(
-            point_name,
-            AS_point,
-            promotes_inputs=[
-                "v",
-                "alpha",
-                "Mach_number",
-                "re",
-                "rho",
-                "CT",
-                "R",
-                "W0",
-                "speed_of_sound",
-                "empty_cg",
-                "load_factor",
-            ],
-        )
-        
         # === Explicit connections ===
-        com_name = point_name + "." + name + "_perf."
-        self.connect(name + ".local_stiff_transformed", point_name + ".coupled." + name + ".local_stiff_transformed")
-        self.connect(name + ".nodes", point_name + ".coupled." + name + ".nodes")
-
-        # Connect aerodyamic mesh to coupled group mesh
-        self.connect(name + ".mesh", point_name + ".coupled." + name + ".mesh")
-
-        if surface["struct_weight_relief"]:
-            self.connect(name + ".element_mass", point_name + ".coupled." + name + ".element_mass")
-
-        # Connect performance calculation variables
-        self.connect(name + ".nodes", com_name + "nodes")
-        self.connect(name + ".cg_location", point_name + "." + "total_perf." + name + "_cg_location")
-        self.connect(name + ".structural_mass", point_name + "." + "total_perf." + name + "_structural_mass")
-
-        # Connect wingbox properties to von Mises stress calcs
-        self.connect(name + ".Qz", com_name + "Qz")
-        self.connect(name + ".J", com_name + "J")
-        self.connect(name + ".A_enc", com_name + "A_enc")
-        self.connect(name + ".htop", com_name + "htop")
-        self.connect(name + ".hbottom", com_name + "hbottom")
-        self.connect(name + ".hfront", com_name + "hfront")
-        self.connect(name + ".hrear", com_name + "hrear")
-
-        self.connect(name + ".spar_thickness", com_name + "spar_thickness")
-        self.connect(name + ".t_over_c", com_name + "t_over_c")
\ No newline at end of file
+        for point_name in point_names:
+            coupled_name = point_name + ".coupled." + name + "."
+            com_name = point_name + "." + name + "_perf."
+            total_name = point_name + ".total_perf." + name + "_"
+
+            self.connect(name + ".local_stiff_transformed", coupled_name + "local_stiff_transformed")
+            self.connect(name + ".nodes", coupled_name + "nodes")
+
+            # Connect aerodyamic mesh to coupled group mesh
+            self.connect(name + ".mesh", coupled_name + "mesh")
+
+            # Connect performance calculation variables
+            self.connect(name + ".nodes", com_name + "nodes")
+            self.connect(name + ".cg_location", total_name + "cg_location")
+            self.connect(name + ".structural_mass", total_name + "structural_mass")
+            self.connect(name + ".t_over_c", com_name + "t_over_c")
+
+            if tube:
+                self.connect(name + ".radius", com_name + "radius")
+                self.connect(name + ".thickness", com_name + "thickness")
+                continue
+
+            if surface["struct_weight_relief"]:
+                self.connect(name + ".element_mass", coupled_name + "element_mass")
+
+            # Connect wingbox properties to von Mises stress calcs
+            for variable in ["Qz", "J", "A_enc", "htop", "hbottom", "hfront", "hrear", "spar_thickness"]:
+                self.connect(name + "." + variable, com_name + variable)
+
+
+class WingModelTube(WingModel):
+    fem_model_type = 'tube'
+
+
+class WingModelWingBox(WingModel):
+    fem_model_type = 'wingbox'
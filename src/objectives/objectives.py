@@ -3,18 +3,72 @@
 # --- Internal ---
 
 # --- External ---
+import numpy as np
 import openmdao.api as om
 
 
 class ObjectivePower(om.ExplicitComponent):
+    # Power based objectives of all rotors at once:
+    #   power_total             sum(P)/power_ref
+    #   propulsive_efficiency   V*sum(T)/sum(P), or V*D/sum(P) with drag (the power needed to overcome the drag)
+    #   power_per_thrust        sum(P)/sum(T) * thrust_ref/power_ref
     def initialize(self):
-        ...
+        self.options.declare('nr_props', default=1)
+        self.options.declare('with_drag', default=False)
+        self.options.declare('vinf', default=1.) # default of the vinf input when it is not connected
+        self.options.declare('power_ref', default=1.)
+        self.options.declare('thrust_ref', default=1.)
 
     def setup(self):
-        ...
-        
+        # === Options ===
+        nr_props = self.options['nr_props']
+        power_ref = self.options['power_ref']
+
+        # === Inputs ===
+        self.add_input('power', shape=nr_props)
+        self.add_input('thrust', shape=nr_props)
+        self.add_input('vinf', val=self.options['vinf'])
+        if self.options['with_drag']:
+            self.add_input('drag', val=1.)
+
+        # === Outputs ===
+        self.add_output('power_total', val=1.)
+        self.add_output('propulsive_efficiency', val=1.)
+        self.add_output('power_per_thrust', val=1.)
+
+        # === Partials ===
+        self.declare_partials('power_total', 'power', val=np.ones((1, nr_props))/power_ref)
+        self.declare_partials('propulsive_efficiency', ['power', 'vinf'])
+        self.declare_partials('propulsive_efficiency', 'drag' if self.options['with_drag'] else 'thrust')
+        self.declare_partials('power_per_thrust', ['power', 'thrust'])
+
+    def _totals(self, inputs) -> tuple:
+        power = np.sum(inputs['power'])
+        useful_force = inputs['drag'][0] if self.options['with_drag'] else np.sum(inputs['thrust'])
+        return power, np.sum(inputs['thrust']), useful_force, inputs['vinf'][0]
+
     def compute(self, inputs, outputs):
-        ...
-        
+        # === Options ===
+        scaling = self.options['thrust_ref']/self.options['power_ref']
+
+        # === Inputs ===
+        power, thrust, useful_force, vinf = self._totals(inputs)
+
+        outputs['power_total'] = power/self.options['power_ref']
+        outputs['propulsive_efficiency'] = vinf*useful_force/power
+        outputs['power_per_thrust'] = power/thrust*scaling
+
     def compute_partials(self, inputs, partials):
-        ...
\ No newline at end of file
+        # === Options ===
+        scaling = self.options['thrust_ref']/self.options['power_ref']
+
+        # === Inputs ===
+        power, thrust, useful_force, vinf = self._totals(inputs)
+        force_name = 'drag' if self.options['with_drag'] else 'thrust'
+
+        # Every rotor enters through the totals only, so each row is constant across the rotors
+        partials['propulsive_efficiency', 'power'] = -vinf*useful_force/power**2
+        partials['propulsive_efficiency', force_name] = vinf/power
+        partials['propulsive_efficiency', 'vinf'] = useful_force/power
+        partials['power_per_thrust', 'power'] = scaling/thrust
+        partials['power_per_thrust', 'thrust'] = -power/thrust**2*scaling
@@ -0,0 +1,101 @@
+# --- Built-ins ---
+
+# --- Internal ---
+from src.utils.lazy import lazy_import
+from src.utils.chunked_store import ChunkedCaseReader, is_chunked_store
+
+# --- External ---
+import numpy as np
+
+sqlite_reader = lazy_import('openmdao.recorders.sqlite_reader')
+
+# All functions work on stacks of cases: arrays of shape (n_cases, n_panels) or (n_cases, n_nodes),
+#   a single case (n_panels,) works as well. Spanwise node arrays may be shared by all cases (1D).
+
+
+def open_case_reader(db_name: str):
+    # Sqlite database or chunked array store (directory), see src.utils.recording
+    if is_chunked_store(db_name):
+        return ChunkedCaseReader(db_name)
+    return sqlite_reader.SqliteCaseReader(db_name, pre_load=True)
+
+
+def stack_cases(db_name: str, keys: list[str]) -> dict[str, np.array]:
+    # Reads the given outputs of every recorded case, stacked along the first axis
+    database = open_case_reader(db_name)
+    if isinstance(database, ChunkedCaseReader):
+        return database.read_many(keys)
+
+    cases = database.get_cases()
+
+    return {key: np.stack([np.asarray(case.outputs[key]) for case in cases]) for key in keys}
+
+
+def span_nodes(mesh: np.array) -> np.array:
+    # Spanwise node locations of the leading edge of a (stack of) VLM mesh(es) of shape (..., nx, ny, 3)
+    return mesh[..., 0, :, 1]
+
+
+def normalised_span(nodes: np.array) -> np.array:
+    # Maps the spanwise nodes to [-0.5, 0.5]
+    nodes = np.asarray(nodes)
+    width = nodes[..., -1:] - nodes[..., :1]
+    return nodes/width - (nodes[..., :1]/width + 0.5)
+
+
+def control_points(nodes: np.array) -> np.array:
+    nodes = np.asarray(nodes)
+    return 0.5*(nodes[..., 1:]+nodes[..., :-1])
+
+
+def chord_at_control_points(chord: np.array) -> np.array:
+    # Chord at the panel control points from the chord at the spanwise nodes
+    return control_points(chord)
+
+
+def sectional_lift(Cl: np.array, chord: np.array=None) -> np.array:
+    # Cl*c per panel, chord is given at the nodes; without a chord the wing is taken as unit chord
+    if chord is None:
+        return np.asarray(Cl)*1.
+    return np.asarray(Cl)*chord_at_control_points(chord)
+
+
+def elliptic_reference(clc: np.array, nodes: np.array) -> np.array:
+    # Elliptic distribution with the same lift as clc, at the control points.
+    #   Both the lift integral and the ellipse use the normalised span
+    span = normalised_span(nodes)
+    lift_area = np.sum(clc*np.diff(span, axis=-1), axis=-1, keepdims=True)
+    return 4*lift_area/np.pi*np.sqrt(1 - (2*control_points(span))**2)
+
+
+def span_efficiency(clc: np.array, nodes: np.array, n_modes: int=15) -> np.array:
+    # Oswald-type span efficiency e = 1/(1 + sum_n n*(A_n/A_1)^2) of the lift distribution, from a
+    #   least-squares fit of clc = sum_n A_n sin(n*theta) with y = -b/2*cos(theta). Returns one value per case.
+    clc = np.asarray(clc)
+    theta = np.arccos(np.clip(-2*control_points(normalised_span(nodes)), -1., 1.))
+    modes = np.arange(1, min(n_modes, clc.shape[-1])+1)
+
+    basis = np.sin(theta[..., :, None]*modes)  # (..., n_panels, n_modes), only batched if the nodes are
+    coefficients = (np.linalg.pinv(basis) @ clc[..., :, None])[..., 0]
+
+    ratio = coefficients[..., 1:]/coefficients[..., :1]
+    return 1./(1. + np.sum(modes[1:]*ratio**2, axis=-1))
+
+
+def lift_history(db_name: str, mesh: np.array,
+                 cl_key: str='OPENAEROSTRUCT.AS_point_0.wing_perf.Cl',
+                 chord_key: str='OPENAEROSTRUCT.wing.geometry.chord') -> dict[str, np.array]:
+    # Sectional lift, elliptic reference and span efficiency of every recorded case,
+    #   the chord is only used if it was recorded (pass chord_key=None to skip it)
+    keys = [cl_key] if chord_key is None else [cl_key, chord_key]
+    try:
+        stacked = stack_cases(db_name, keys)
+    except KeyError:
+        stacked = stack_cases(db_name, [cl_key])
+
+    nodes = span_nodes(mesh)
+    clc = sectional_lift(stacked[cl_key], stacked[chord_key][:, 0] if chord_key in stacked else None)
+
+    return {'clc': clc,
+            'elliptic': elliptic_reference(clc, nodes),
+            'span_efficiency': span_efficiency(clc, nodes)}
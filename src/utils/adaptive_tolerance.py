@@ -0,0 +1,152 @@
+# --- Built-ins ---
+from dataclasses import dataclass
+
+# --- Internal ---
+
+# --- External ---
+import numpy as np
+import openmdao.api as om
+from openmdao.core.driver import Driver
+from openmdao.recorders.case_recorder import CaseRecorder
+
+# Inexact coupled solves: the tolerances of the coupled solvers follow the progress of the optimiser.
+#       controller = AdaptiveTolerance(['OPENAEROSTRUCT.AS_point_0.coupled'], ToleranceSchedule())
+#       controller.attach(prob)                 # before setup, adds itself to the driver recorders
+#       prob.setup()
+#       prob.run_driver()
+#   Progress is measured after every driver evaluation that moved the design variables, as the larger of the
+#   relative change of the (scaled) objective and the largest (scaled) constraint violation. Evaluations at the
+#   same design (e.g. the initial point evaluated twice) only differ by the solver error and keep the tolerance.
+#   pyOptSparse does not pass the optimality measure of SNOPT to openmdao, the objective change is its proxy.
+
+
+@dataclass(slots=True)
+class ToleranceSchedule:
+    loose: float = 1e-2         # nonlinear atol of the first evaluations
+    tight: float = 1e-6         # nonlinear atol near convergence, never exceeded
+    safety: float = 0.1         # atol = safety * progress metric, keeps the solver error below the progress
+    linear_ratio: float = 0.1   # linear atol relative to the nonlinear one, for consistent gradients
+    monotone: bool = True       # never loosen again: the line search compares evaluations at equal or better accuracy
+
+    def atol(self, metric: float, current: float) -> float:
+        atol = min(max(self.safety*metric, self.tight), self.loose)
+        return min(atol, current) if self.monotone else atol
+
+
+@dataclass(slots=True)
+class ToleranceStep:
+    evaluation: int
+    objective_change: float
+    infeasibility: float
+    atol: float
+    moved: bool                 # the design variables changed since the previous evaluation
+
+
+class AdaptiveTolerance(CaseRecorder):
+    """
+    Driver recorder that does not record anything, but sets the atol of the nonlinear and iterative linear
+    solvers of the given systems after every driver evaluation according to a ToleranceSchedule.
+    The tolerance of every evaluation is kept in history.
+    """
+    def __init__(self, systems: list[str], schedule: ToleranceSchedule=None):
+        super().__init__(record_viewer_data=False)
+        self.systems = systems
+        self.schedule = ToleranceSchedule() if schedule is None else schedule
+        self.history: list[ToleranceStep] = []
+        self.atol = self.schedule.loose
+
+        self._solvers = []
+        self._objective = None
+        self._design = None
+
+    def attach(self, prob: om.Problem) -> 'AdaptiveTolerance':
+        prob.driver.add_recorder(self)
+        return self
+
+    def startup(self, recording_requester, comm=None):
+        super().startup(recording_requester, comm)
+        if not isinstance(recording_requester, Driver):
+            raise TypeError('AdaptiveTolerance has to be added to the driver')
+
+        # The systems are resolved once the model is set up
+        model = recording_requester._problem().model
+        systems = {system.pathname: system for system in model.system_iter(include_self=True, recurse=True)}
+        missing = [path for path in self.systems if path not in systems]
+        if missing:
+            raise KeyError(f'Systems {missing} for the adaptive tolerance are not in the model')
+
+        self._solvers = [systems[path] for path in self.systems]
+        self.history = []
+        self._objective = None
+        self._design = None
+        self.atol = self.schedule.loose
+        self._apply()
+
+    def _apply(self) -> None:
+        for system in self._solvers:
+            system.nonlinear_solver.options['atol'] = self.atol
+            # Direct linear solvers have no tolerance
+            if system.linear_solver is not None and 'atol' in system.linear_solver.options:
+                system.linear_solver.options['atol'] = self.atol*self.schedule.linear_ratio
+
+    @staticmethod
+    def _infeasibility(driver: Driver) -> float:
+        # Largest violation of the scaled constraint bounds
+        values = driver.get_constraint_values(driver_scaling=True)
+        violation = 0.
+        for name, metadata in driver._cons.items():
+            value = np.atleast_1d(values[name])
+            if metadata['equals'] is not None:
+                violation = max(violation, np.max(np.abs(value-metadata['equals'])))
+                continue
+            if metadata['upper'] is not None:
+                violation = max(violation, np.max(value-metadata['upper']))
+            if metadata['lower'] is not None:
+                violation = max(violation, np.max(metadata['lower']-value))
+        return violation
+
+    def record_iteration_driver(self, recording_requester, data, metadata):
+        objective = np.concatenate([np.atleast_1d(value) for value in
+                                    recording_requester.get_objective_values(driver_scaling=True).values()])
+        design = np.concatenate([np.atleast_1d(value) for value in
+                                 recording_requester.get_design_var_values(driver_scaling=True).values()])
+        moved = self._design is None or not np.array_equal(design, self._design)
+        self._design = design
+
+        # The first evaluation has no reference, it keeps the loose tolerance
+        objective_change = np.inf
+        if self._objective is not None:
+            objective_change = np.max(np.abs(objective-self._objective)/np.maximum(np.abs(objective), 1.))
+        self._objective = objective
+
+        infeasibility = self._infeasibility(recording_requester)
+        if moved:
+            self.atol = self.schedule.atol(max(objective_change, infeasibility), self.atol)
+            self._apply()
+
+        self.history.append(ToleranceStep(evaluation=len(self.history),
+                                          objective_change=objective_change,
+                                          infeasibility=infeasibility,
+                                          atol=self.atol,
+                                          moved=moved))
+
+    def record_iteration_problem(self, recording_requester, data, metadata):
+        pass
+
+    def record_iteration_system(self, recording_requester, data, metadata):
+        pass
+
+    def record_iteration_solver(self, recording_requester, data, metadata):
+        pass
+
+    def record_derivatives_driver(self, recording_requester, data, metadata):
+        pass
+
+    def record_metadata_system(self, system, run_number=None):
+        pass
+
+    def record_metadata_solver(self, solver, run_number=None):
+        pass
+
+    def record_viewer_data(self, model_viewer_data, key='Driver'):
+        pass
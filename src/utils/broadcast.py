@@ -0,0 +1,146 @@
+# --- Built-ins ---
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+import atexit
+import weakref
+
+# --- Internal ---
+from src.base import WingPropInfo
+from src.utils.serialisation import wingpropinfo_to_arrays, wingpropinfo_from_arrays
+
+# --- External ---
+import numpy as np
+
+
+@dataclass(slots=True)
+class SharedArray:
+    # Lightweight, picklable handle to an array living in a shared memory block
+    name: str
+    shape: tuple
+    dtype: object   # numpy descr, also covers structured arrays such as the airfoil tables
+    order: str = 'C'
+
+
+@dataclass(slots=True)
+class SharedConfiguration:
+    header: dict                                                        # scalar WingPropInfo fields
+    configuration: dict[str, SharedArray] = field(default_factory=dict) # WingPropInfo array fields
+    geometry: dict[str, SharedArray] = field(default_factory=dict)      # mesh and RETHORST inputs
+    surface: dict = field(default_factory=dict)                         # scalar OAS surface entries
+    surface_arrays: dict[str, SharedArray] = field(default_factory=dict)
+
+
+def _release(blocks: list) -> None:
+    for block in blocks:
+        block.close()
+        try:
+            block.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class ConfigurationBroadcast:
+    """
+    Builds the read-only configuration arrays once in the parent process and places them in shared memory.
+    Workers receive the (small) descriptor and attach to the blocks with attach_configuration.
+    The blocks are released on close(), when leaving the with-block, or at the latest when the object is collected.
+    """
+    def __init__(self, wingpropinfo: WingPropInfo, surface: dict=None):
+        self._blocks = []
+        self._shared_by_id = {}
+        self._finalizer = weakref.finalize(self, _release, self._blocks)
+
+        header, arrays = wingpropinfo_to_arrays(wingpropinfo)
+        self.descriptor = SharedConfiguration(header=header)
+
+        for key, value in arrays.items():
+            self.descriptor.configuration[key] = self._share(value)
+
+        # Derived geometry, these are also the RETHORST (and PARAMETERS) inputs
+        geometry = {'wing_mesh': wingpropinfo.vlm_mesh,
+                    'wing_mesh_control_points': wingpropinfo.vlm_mesh_control_points,
+                    'propeller_locations': wingpropinfo.prop_locations,
+                    'propeller_radii': wingpropinfo.prop_radii}
+        for key, value in geometry.items():
+            self.descriptor.geometry[key] = self._share(value)
+
+        # OAS surface dictionary, the surface mesh is the same array as the wing mesh so it is shared only once
+        for key, value in (surface or {}).items():
+            if isinstance(value, np.ndarray):
+                self.descriptor.surface_arrays[key] = self._share(value)
+            else:
+                self.descriptor.surface[key] = value
+
+    def _share(self, value: np.ndarray) -> SharedArray:
+        if id(value) in self._shared_by_id:
+            return self._shared_by_id[id(value)][1]
+
+        value = np.asarray(value)
+        order = 'F' if value.flags.f_contiguous and not value.flags.c_contiguous else 'C'
+
+        block = shared_memory.SharedMemory(create=True, size=max(value.nbytes, 1))
+        self._blocks.append(block)
+        np.ndarray(value.shape, dtype=value.dtype, buffer=block.buf, order=order)[...] = value
+
+        shared = SharedArray(name=block.name,
+                             shape=value.shape,
+                             dtype=np.lib.format.dtype_to_descr(value.dtype),
+                             order=order)
+        self._shared_by_id[id(value)] = (value, shared) # keep a reference so the id cannot be reused
+        return shared
+
+    def close(self) -> None:
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# Blocks this process is attached to, kept open so that the array views stay valid.
+#   Pool workers started by multiprocessing share the resource tracker of the parent,
+#   so attaching does not transfer ownership: only the parent unlinks the blocks.
+_attached = {}
+
+
+def _detach_all() -> None:
+    for block in _attached.values():
+        try:
+            block.close()
+        except BufferError:
+            pass # arrays still reference the buffer, the OS reclaims it at exit
+    _attached.clear()
+
+
+atexit.register(_detach_all)
+
+
+def attach_array(shared: SharedArray) -> np.ndarray:
+    if shared.name not in _attached:
+        _attached[shared.name] = shared_memory.SharedMemory(name=shared.name)
+
+    array = np.ndarray(shared.shape,
+                       dtype=np.lib.format.descr_to_dtype(shared.dtype),
+                       buffer=_attached[shared.name].buf,
+                       order=shared.order)
+    array.flags.writeable = False
+    return array
+
+
+def attach_configuration(descriptor: SharedConfiguration) -> tuple[WingPropInfo, dict, dict]:
+    # Returns the configuration, the OAS surface dictionary and the geometry arrays,
+    #   all arrays are read-only views on the shared blocks (nothing is copied or rebuilt)
+    arrays = {key: attach_array(shared) for key, shared in descriptor.configuration.items()}
+    geometry = {key: attach_array(shared) for key, shared in descriptor.geometry.items()}
+
+    wingpropinfo = wingpropinfo_from_arrays(descriptor.header, arrays)
+    wingpropinfo.preload_geometry(vlm_mesh=geometry['wing_mesh'],
+                                  vlm_mesh_control_points=geometry['wing_mesh_control_points'])
+
+    surface = dict(descriptor.surface)
+    for key, shared in descriptor.surface_arrays.items():
+        surface[key] = attach_array(shared)
+
+    return wingpropinfo, surface, geometry
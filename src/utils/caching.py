@@ -0,0 +1,43 @@
+# --- Built-ins ---
+from dataclasses import fields, is_dataclass
+
+# --- Internal ---
+
+# --- External ---
+import numpy as np
+
+
+def cache_key(*values) -> tuple:
+    # Hashable snapshot of the values a derived quantity depends on. Arrays are compared by content, so in-place
+    #   edits are picked up as well, and dicts, lists and dataclasses are keyed by their (nested) contents
+    key = []
+    for value in values:
+        if isinstance(value, dict):
+            key.append(('dict',) + tuple((name, cache_key(value[name])) for name in sorted(value, key=str)))
+        elif is_dataclass(value) and not isinstance(value, type):
+            key.append((type(value).__name__,) + cache_key(*(getattr(value, item.name) for item in fields(value))))
+        elif isinstance(value, (np.ndarray, list, tuple)):
+            try:
+                array = np.asarray(value)
+            except ValueError: # ragged
+                array = None
+            if array is None or array.dtype == object:
+                key.append(('sequence',) + cache_key(*value))
+            else:
+                key.append((array.dtype.str, array.shape, array.tobytes()))
+        else:
+            try:
+                hash(value)
+            except TypeError:
+                value = repr(value)
+            key.append(value)
+    return tuple(key)
+
+
+def cached(cache: dict, name: str, key: tuple, build):
+    # Returns the cached quantity when its dependencies are unchanged, rebuilds it otherwise
+    entry = cache.get(name)
+    if entry is None or entry[0] != key:
+        entry = (key, build())
+        cache[name] = entry
+    return entry[1]
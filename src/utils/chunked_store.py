@@ -0,0 +1,218 @@
+# --- Built-ins ---
+import json
+import os
+import shutil
+import zlib
+
+# --- Internal ---
+
+# --- External ---
+import numpy as np
+
+SCHEMA_FILE = 'variables.json'
+CASES_FILE = 'cases.jsonl'
+
+# On-disk layout of a store, one directory per recording source (driver, problem, derivatives, ...):
+#   <path>/<source>/variables.json      name -> index, shape, dtype, kind, the number of rows per chunk and
+#                                       the number of readable cases, rewritten while recording
+#   <path>/<source>/cases.jsonl         one line per case: counter, iteration coordinate, timestamp, success
+#   <path>/<source>/<index>/<chunk>.z   zlib-compressed block of chunk_size consecutive cases of one variable
+
+
+def is_chunked_store(path: str) -> bool:
+    return os.path.isdir(path) and any(os.path.isfile(os.path.join(path, source, SCHEMA_FILE))
+                                       for source in os.listdir(path))
+
+
+class ChunkedArrayWriter:
+    """
+    Writes every variable of one recording source as a dataset of shape (n_cases, *shape), appended along
+    the case axis. Rows are buffered per variable and written as one compressed chunk every chunk_size
+    cases, so a single variable over a range of cases can be read without touching the rest of the store.
+    The schema is kept up to date while recording, so a running or interrupted store can be read up to
+    its last complete chunk.
+    """
+    def __init__(self, path: str, chunk_size: int=16, level: int=6):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.level = level
+
+        os.makedirs(path, exist_ok=True)
+        self.variables: dict[str, dict] = {}
+        self._buffers: dict[str, list] = {}
+        self._chunks: dict[str, int] = {}
+        self._cases = open(os.path.join(path, CASES_FILE), 'w')
+        self.num_cases = 0
+        self._write_schema(num_cases=0)
+
+    def append(self, values: dict[str, np.array], case: dict, kinds: dict[str, str]=None) -> None:
+        # All cases of one source are expected to record the same variables with the same shapes
+        added = False
+        for name, value in values.items():
+            value = np.array(value)
+            if name not in self.variables:
+                self._add_variable(name, value, (kinds or {}).get(name, 'output'))
+                added = True
+            elif value.shape != tuple(self.variables[name]['shape']):
+                raise ValueError(f'Shape of {name} changed from {self.variables[name]["shape"]} to {value.shape}')
+
+            self._buffers[name].append(value)
+            if len(self._buffers[name]) == self.chunk_size:
+                self._write_chunk(name)
+
+        self._cases.write(json.dumps(case) + '\n')
+        self.num_cases += 1
+
+        # Only the cases of which every chunk is written are readable
+        chunk_complete = self.num_cases % self.chunk_size == 0
+        if added or chunk_complete:
+            self._cases.flush()
+            self._write_schema(num_cases=self.num_cases - self.num_cases % self.chunk_size)
+
+    def _add_variable(self, name: str, value: np.array, kind: str) -> None:
+        index = len(self.variables)
+        os.makedirs(os.path.join(self.path, str(index)), exist_ok=True)
+        self.variables[name] = {'index': index, 'shape': list(value.shape), 'dtype': value.dtype.str, 'kind': kind}
+        self._buffers[name] = []
+        self._chunks[name] = 0
+
+    def _write_chunk(self, name: str) -> None:
+        block = np.ascontiguousarray(np.stack(self._buffers[name]), dtype=self.variables[name]['dtype'])
+        chunk_file = os.path.join(self.path, str(self.variables[name]['index']), f'{self._chunks[name]}.z')
+        with open(chunk_file, 'wb') as file:
+            file.write(zlib.compress(block.tobytes(), self.level))
+
+        self._buffers[name] = []
+        self._chunks[name] += 1
+
+    def _write_schema(self, num_cases: int) -> None:
+        # Replaced in one step, a reader never sees a partially written schema
+        schema_file = os.path.join(self.path, SCHEMA_FILE)
+        with open(schema_file + '.tmp', 'w') as file:
+            json.dump({'chunk_size': self.chunk_size, 'num_cases': num_cases, 'variables': self.variables},
+                      file, indent=4)
+        os.replace(schema_file + '.tmp', schema_file)
+
+    def close(self) -> None:
+        # The last chunk of every variable may hold fewer than chunk_size cases
+        for name, buffer in self._buffers.items():
+            if buffer:
+                self._write_chunk(name)
+
+        self._cases.close()
+        self._write_schema(num_cases=self.num_cases)
+
+
+class ChunkedArrayStore:
+    # Writers of all recording sources of one store, the directory is replaced when reopened
+    def __init__(self, path: str, chunk_size: int=16, level: int=6):
+        if os.path.exists(path):
+            if not is_chunked_store(path) and os.listdir(path):
+                raise FileExistsError(f'{path} exists and is not a chunked array store')
+            shutil.rmtree(path)
+
+        self.path = path
+        self.chunk_size = chunk_size
+        self.level = level
+        self.writers: dict[str, ChunkedArrayWriter] = {}
+
+    def writer(self, source: str) -> ChunkedArrayWriter:
+        if source not in self.writers:
+            self.writers[source] = ChunkedArrayWriter(os.path.join(self.path, source),
+                                                      chunk_size=self.chunk_size, level=self.level)
+        return self.writers[source]
+
+    def close(self) -> None:
+        for writer in self.writers.values():
+            writer.close()
+
+
+class ChunkedCase:
+    # Mimics the parts of an openmdao Case that the postprocessing uses
+    def __init__(self, outputs: dict, kinds: dict, metadata: dict):
+        self.outputs = outputs
+        self.kinds = kinds
+        self.counter = metadata.get('counter')
+        self.iteration_coordinate = metadata.get('iteration_coordinate')
+        self.timestamp = metadata.get('timestamp')
+        self.success = metadata.get('success')
+
+    def _of_kind(self, kind: str) -> dict:
+        return {name: value for name, value in self.outputs.items() if self.kinds[name] == kind}
+
+    def get_design_vars(self) -> dict:
+        return self._of_kind('desvar')
+
+    def get_objectives(self) -> dict:
+        return self._of_kind('objective')
+
+    def get_constraints(self) -> dict:
+        return self._of_kind('constraint')
+
+    def __getitem__(self, name: str) -> np.array:
+        return self.outputs[name]
+
+
+class ChunkedCaseReader:
+    """
+    Reader adapter with the subset of the SqliteCaseReader interface used by src.postprocessing
+    (get_cases, get_case, list_cases), plus partial reads of single variables:
+
+        reader = ChunkedCaseReader(path)
+        lift = reader.read('OPENAEROSTRUCT.AS_point_0.wing_perf.Cl', start=10, stop=20)   # (10, n_panels)
+    """
+    def __init__(self, path: str, source: str='driver'):
+        self.path = os.path.join(path, source)
+        with open(os.path.join(self.path, SCHEMA_FILE), 'r') as file:
+            schema = json.load(file)
+        self.chunk_size: int = schema['chunk_size']
+        self.variables: dict[str, dict] = schema['variables']
+
+        # A store that is still recording has case lines of which the chunks are not written yet
+        with open(os.path.join(self.path, CASES_FILE), 'r') as file:
+            self.cases = [json.loads(line) for line in file if line.strip()][:schema['num_cases']]
+
+    @property
+    def num_cases(self) -> int:
+        return len(self.cases)
+
+    def list_cases(self) -> list[str]:
+        return [case['iteration_coordinate'] for case in self.cases]
+
+    def _case_range(self, start: int, stop: int) -> range:
+        return range(self.num_cases)[slice(start, stop)]
+
+    def read(self, name: str, start: int=0, stop: int=None) -> np.array:
+        # Cases start:stop (python slice semantics) of one variable, only the chunks covering them are read
+        variable = self.variables[name]
+        shape, dtype = tuple(variable['shape']), np.dtype(variable['dtype'])
+        cases = self._case_range(start, stop)
+        if len(cases) == 0:
+            return np.empty((0, *shape), dtype=dtype)
+
+        first_chunk, last_chunk = cases[0]//self.chunk_size, cases[-1]//self.chunk_size
+        blocks = []
+        for chunk in range(first_chunk, last_chunk+1):
+            with open(os.path.join(self.path, str(variable['index']), f'{chunk}.z'), 'rb') as file:
+                blocks.append(np.frombuffer(zlib.decompress(file.read()), dtype=dtype).reshape(-1, *shape))
+
+        offset = first_chunk*self.chunk_size
+        return np.concatenate(blocks)[cases[0]-offset:cases[-1]-offset+1]
+
+    def read_many(self, names: list[str], start: int=0, stop: int=None) -> dict[str, np.array]:
+        return {name: self.read(name, start, stop) for name in names}
+
+    def get_case(self, index: int) -> ChunkedCase:
+        index = self._case_range(index, None)[0] if index < 0 else index
+        outputs = {name: self.read(name, index, index+1)[0] for name in self.variables}
+        return ChunkedCase(outputs, self._kinds(), self.cases[index])
+
+    def get_cases(self) -> list[ChunkedCase]:
+        # Reads every variable once, chunk by chunk, rather than every case separately
+        stacked = self.read_many(list(self.variables))
+        kinds = self._kinds()
+        return [ChunkedCase({name: values[index] for name, values in stacked.items()}, kinds, case)
+                for index, case in enumerate(self.cases)]
+
+    def _kinds(self) -> dict[str, str]:
+        return {name: variable['kind'] for name, variable in self.variables.items()}
@@ -0,0 +1,107 @@
+# --- Built-ins ---
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+import shutil
+
+# --- Internal ---
+
+# --- External ---
+import numpy as np
+import openmdao.api as om
+from openmdao.utils.coloring import Coloring
+
+# Total derivative colouring, cached per problem configuration:
+#       prob.setup(mode=mode)
+#       enable_total_coloring(prob, directory, mode)            # before run_driver
+#       prob.run_driver()
+#       report = store_total_coloring(prob, directory, mode)   # after run_driver
+#   The first run computes the colouring dynamically, later runs of the same configuration load it.
+#   mode is the derivative mode the problem was set up with, part of the configuration.
+
+
+@dataclass(slots=True)
+class ColoringReport:
+    design_variables: int       # size of all design variables
+    responses: int              # size of the objective and all constraints
+    uncoloured_solves: int      # linear solves per total derivative without colouring
+    coloured_solves: int
+    cached: bool                # taken from the cache (an earlier run or the mode selection), not computed by the driver
+
+    @property
+    def saved_solves(self) -> int:
+        return self.uncoloured_solves - self.coloured_solves
+
+    def __str__(self) -> str:
+        source = 'cached' if self.cached else 'computed'
+        return (f'Total colouring ({source}): {self.coloured_solves} instead of {self.uncoloured_solves} '
+                f'linear solves per derivative, {self.saved_solves} saved '
+                f'({self.design_variables} design variables, {self.responses} responses)')
+
+
+def configuration_hash(prob: om.Problem, mode: str='auto') -> str:
+    # The sparsity only depends on the structure of the problem: the variables and their shapes,
+    #   the design variables and responses (with their indices) and the derivative direction.
+    #   Values such as the initial design are left out, so every run of a configuration shares a colouring
+    model = prob.model
+    variables = {name: list(metadata['shape'] or ())
+                 for name, metadata in model.get_io_metadata(metadata_keys=['shape']).items()}
+
+    def driver_variables(variables: dict) -> dict:
+        return {name: {'source': metadata.get('source'),
+                       'type': metadata.get('type'),
+                       'indices': None if metadata.get('indices') is None else str(metadata['indices'])}
+                for name, metadata in variables.items()}
+
+    configuration = {'variables': variables,
+                     'design_vars': driver_variables(model.get_design_vars(recurse=True, get_sizes=False)),
+                     'responses': driver_variables(model.get_responses(recurse=True, get_sizes=False)),
+                     'mode': mode}
+
+    return hashlib.sha1(json.dumps(configuration, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def coloring_file(prob: om.Problem, directory: str, mode: str='auto') -> str:
+    return os.path.join(directory, f'total_coloring_{configuration_hash(prob, mode)}.pkl')
+
+
+def enable_total_coloring(prob: om.Problem, directory: str, mode: str='auto', coloring: Coloring=None,
+                          **coloring_options) -> str:
+    # Call after prob.setup(mode=mode): uses the cached colouring of this configuration if there is one,
+    #   otherwise the driver computes it on the first derivative evaluation. A colouring that is already
+    #   computed for this configuration (e.g. DerivativeModeReport.coloring) is stored in the cache and used.
+    filename = coloring_file(prob, directory, mode)
+    if coloring is not None:
+        coloring.save(filename)
+    if os.path.isfile(filename):
+        prob.driver.use_fixed_coloring(filename)
+    else:
+        prob.driver.declare_coloring(**coloring_options)
+
+    return filename
+
+
+def store_total_coloring(prob: om.Problem, directory: str, mode: str='auto') -> ColoringReport:
+    # Call after prob.run_driver(): copies a newly computed colouring to the cache and reports the savings
+    filename = coloring_file(prob, directory, mode)
+    cached = os.path.isfile(filename)
+
+    if not cached:
+        computed = prob.driver.get_coloring_fname(mode='output')
+        if not os.path.isfile(computed):
+            raise FileNotFoundError(f'No total colouring was computed, expected {computed}')
+        os.makedirs(directory, exist_ok=True)
+        shutil.copyfile(computed, filename)
+
+    design_variables = sum(np.size(value) for value in prob.driver.get_design_var_values().values())
+    responses = sum(np.size(value) for value in prob.driver.get_objective_values().values())
+    responses += sum(np.size(value) for value in prob.driver.get_constraint_values().values())
+
+    report = ColoringReport(design_variables=design_variables,
+                            responses=responses,
+                            uncoloured_solves=min(design_variables, responses),
+                            coloured_solves=Coloring.load(filename).total_solves(),
+                            cached=cached)
+
+    return report
@@ -0,0 +1,118 @@
+# --- Built-ins ---
+from dataclasses import dataclass, field
+import time
+
+# --- Internal ---
+
+# --- External ---
+import numpy as np
+import openmdao.api as om
+from openmdao.utils.coloring import Coloring, ColoringMeta, compute_total_coloring
+
+# Direction of the total derivatives, chosen once per problem configuration:
+#       prob.setup()
+#       report = select_derivative_mode(prob)       # before enable_total_coloring and run_driver
+#       prob.run_driver()
+#   The mode is first chosen from the number of design variables and responses, one total derivative
+#   evaluation is then timed in every candidate mode to confirm the choice. The direction is only passed
+#   to prob.setup(mode=...), so every timed mode is set up once and the problem is set up a last time in
+#   the selected mode (report.mode): values set before select_derivative_mode are reset.
+#   'auto' stands for the coloured bidirectional mode, its colouring is kept in report.coloring.
+
+
+@dataclass(slots=True)
+class DerivativeModeReport:
+    design_variables: int       # size of all design variables, the number of linear solves in fwd mode
+    responses: int              # size of the objective and all constraints, the number of linear solves in rev mode
+    counted_mode: str           # mode chosen from the sizes alone
+    mode: str                   # selected mode
+    timings: dict[str, float] = field(default_factory=dict) # seconds per total derivative evaluation
+    coloured_solves: int = None # linear solves of the bidirectional colouring, if it was a candidate
+    coloring: Coloring = None   # the bidirectional colouring, when it was selected
+
+    def __str__(self) -> str:
+        timings = ', '.join(f'{mode}: {seconds:.3g} s' for mode, seconds in self.timings.items())
+        coloured = '' if self.coloured_solves is None else f', {self.coloured_solves} coloured'
+        return (f'Derivative mode {self.mode} ({self.design_variables} design variables, '
+                f'{self.responses} responses{coloured}; counted {self.counted_mode}'
+                f'{"; " + timings if timings else ""})')
+
+
+def derivative_sizes(prob: om.Problem) -> tuple[int, int]:
+    # Sizes of the design variables and responses (objective and constraints), after final setup
+    prob.final_setup()
+    driver = prob.driver
+    design_variables = sum(np.size(value) for value in driver.get_design_var_values().values())
+    responses = sum(np.size(value) for value in driver.get_objective_values().values())
+    responses += sum(np.size(value) for value in driver.get_constraint_values().values())
+
+    return design_variables, responses
+
+
+def counted_mode(design_variables: int, responses: int) -> str:
+    # Every linear solve gives one column (fwd) or one row (rev) of the total jacobian
+    return 'rev' if responses < design_variables else 'fwd'
+
+
+def setup_mode(prob: om.Problem, mode: str) -> None:
+    # OpenMDAO takes the derivative direction only as an argument of setup(), a new setup resets all values
+    if mode not in ('fwd', 'rev', 'auto'):
+        raise ValueError(f"Unknown derivative mode {mode}, expected 'fwd', 'rev' or 'auto'")
+    prob.setup(mode=mode)
+    prob.final_setup()
+
+
+def _time_totals(prob: om.Problem, coloring_info, repeats: int) -> float:
+    # Fastest of a number of total derivative evaluations
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        prob.compute_totals(coloring_info=coloring_info)
+        timings.append(time.perf_counter()-start)
+
+    return min(timings)
+
+
+def select_derivative_mode(prob: om.Problem, timed: bool=True, coloured: bool=False,
+                           repeats: int=1, run_model: bool=True) -> DerivativeModeReport:
+    # Call after prob.setup(): counts the design variables and responses, optionally times one total derivative
+    #   evaluation per candidate mode and sets the problem up in the fastest one. With coloured=True the
+    #   bidirectional colouring is computed as well (a few full total jacobians) and used by the driver when it
+    #   is the fastest.
+    design_variables, responses = derivative_sizes(prob)
+    counted = counted_mode(design_variables, responses)
+    report = DerivativeModeReport(design_variables=design_variables,
+                                  responses=responses,
+                                  counted_mode=counted,
+                                  mode=counted)
+
+    if timed or coloured:
+        for mode in ('fwd', 'rev'):
+            setup_mode(prob, mode)
+            if run_model:
+                prob.run_model() # derivatives are evaluated at a converged state
+            report.timings[mode] = _time_totals(prob, False, repeats)
+
+        coloring = None
+        if coloured:
+            setup_mode(prob, 'auto')
+            if run_model:
+                prob.run_model()
+            # None when the colouring saves too few solves (min_improve_pct), 'auto' is then no candidate
+            coloring = compute_total_coloring(prob, mode='auto')
+
+        if coloring is not None:
+            report.coloured_solves = coloring.total_solves()
+            coloring_info = ColoringMeta()
+            coloring_info.coloring = coloring
+            report.timings['auto'] = _time_totals(prob, coloring_info, repeats)
+
+        report.mode = min(report.timings, key=report.timings.get)
+        if report.mode == 'auto':
+            report.coloring = coloring
+
+    setup_mode(prob, report.mode)
+    if report.coloring is not None:
+        prob.driver.use_fixed_coloring(report.coloring)
+
+    return report
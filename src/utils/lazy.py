@@ -0,0 +1,31 @@
+# --- Built-ins ---
+import importlib
+
+# --- Internal ---
+
+# --- External ---
+
+
+class LazyModule:
+    # Stand-in for a module that is only imported on first attribute access,
+    #   e.g. plt = lazy_import('matplotlib.pyplot') at module level costs nothing until plt.figure() is called
+    __slots__ = ('_name',)
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def _load(self):
+        return importlib.import_module(self._name) # cached in sys.modules after the first call
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._load(), attribute)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        return f'<lazy module {self._name!r}>'
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
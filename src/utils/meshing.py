@@ -1,16 +1,12 @@
 # --- Built-ins ---
 
 # --- Internal ---
-from RethorstCorrection_pyf90.mod_vlm_mesh import vlm_mesh
 
 # --- External ---
 import numpy as np
 
 
-def meshing(span: float, chord: float, prop_locations: np.array, prop_radii: np.array, nr_props: int, 
-            spanwise_discretisation_wing: int, spanwise_panels_propeller: int):
-    # This function currently assumes that no wing-tip propellers are configured!
-    y_vlm = np.array([-span/2], order='F')
+def _wing_panels_regional(nr_props: int, spanwise_discretisation_wing: int, spanwise_panels_propeller: int) -> int:
     spanwise_nodes_propeller = spanwise_panels_propeller+1
 
     nr_wing_regions = nr_props+1
@@ -25,6 +21,24 @@ def meshing(span: float, chord: float, prop_locations: np.array, prop_radii: np.
     # Update ny
     ny = wing_panels_regional*(nr_props+1)+spanwise_nodes_propeller*nr_props    
     assert(ny%2==1), 'ny should be odd number'
+
+    return wing_panels_regional
+
+
+def spanwise_nodes(nr_props: int, spanwise_discretisation_wing: int, spanwise_panels_propeller: int) -> int:
+    # Number of spanwise nodes of the mesh returned by meshing(), without building it
+    wing_panels_regional = _wing_panels_regional(nr_props, spanwise_discretisation_wing, spanwise_panels_propeller)
+    
+    return nr_props*(wing_panels_regional+spanwise_panels_propeller-1)+wing_panels_regional
+
+
+def meshing(span: float, chord: float, prop_locations: np.array, prop_radii: np.array, nr_props: int, 
+            spanwise_discretisation_wing: int, spanwise_panels_propeller: int):
+    # This function currently assumes that no wing-tip propellers are configured!
+    y_vlm = np.array([-span/2], order='F')
+    spanwise_nodes_propeller = spanwise_panels_propeller+1
+
+    wing_panels_regional = _wing_panels_regional(nr_props, spanwise_discretisation_wing, spanwise_panels_propeller)
     
     for iprop in range(nr_props):
         start = y_vlm[-1]
@@ -5,19 +5,25 @@ __status__ = "Production"
 
 import openmdao.api as om
 import numpy as np
-import pyspline
+
+from src.utils.lazy import lazy_import
+
+pyspline = lazy_import('pyspline')
 
 
 class thrust_drag(om.ExplicitComponent):
     """
-    This class computes the constraint value for a thrust / drag constraint
+    This class computes the constraint value for a thrust / drag constraint.
+    The thrust input holds one row per rotor, the thrust of each rotor is its first entry.
     """
 
     def initialize(self):
         self.options.declare("drag_offset", recordable=False)
+        self.options.declare("n_rotors", default=1, recordable=False)
 
     def setup(self):
         self.drag_offset = self.options["drag_offset"]
+        self.n_rotors = self.options["n_rotors"]
 
         # Thrust Input
         self.add_input("thrust", shape_by_conn=True)
@@ -28,29 +34,21 @@ class thrust_drag(om.ExplicitComponent):
         # Residual Output
         self.add_output("thrust_drag", shape=1)
 
+    def setup_partials(self):
+        # The thrust shape is only known once the connections are resolved
+        thrust_size = self.get_io_metadata(iotypes="input", metadata_keys=["size"], return_rel_names=True)["thrust"]["size"]
+        row_size = thrust_size // self.n_rotors
+
+        self.declare_partials("thrust_drag", "thrust",
+                              rows=np.zeros(self.n_rotors, dtype=int),
+                              cols=np.arange(self.n_rotors) * row_size,
+                              val=-1.0)
+        self.declare_partials("thrust_drag", "drag", val=-1.0)
+
     def compute(self, inputs, outputs):
-        thrust_total = inputs["thrust"][0, 0]
+        thrust_total = np.sum(inputs["thrust"].reshape(self.n_rotors, -1)[:, 0])
         outputs["thrust_drag"] = -thrust_total - (inputs["drag"] + self.drag_offset)
 
-    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
-        # Forward Mode
-        if mode == "fwd":
-            if "thrust" in d_inputs:
-                if "thrust_drag" in d_outputs:
-                    d_outputs["thrust_drag"] += -d_inputs["thrust"][0, 0]
-            if "drag" in d_inputs:
-                if "thrust_drag" in d_outputs:
-                    d_outputs["thrust_drag"] -= d_inputs["drag"]
-
-        # Reverse Mode
-        elif mode == "rev":
-            if "thrust_drag" in d_outputs:
-                if "thrust" in d_inputs:
-                    d_inputs["thrust"][0, 0] += -d_outputs["thrust_drag"]
-            if "thrust_drag" in d_outputs:
-                if "drag" in d_inputs:
-                    d_inputs["drag"] -= d_outputs["thrust_drag"]
-
 
 class bspline_interpolant(om.ExplicitComponent):
     """
@@ -137,35 +135,36 @@ class bspline_interpolant(om.ExplicitComponent):
 
 class radius_span(om.ExplicitComponent):
     """
-    This class computes span sections based on a total radius design variable
+    This class computes span sections based on a total radius design variable,
+    for one or more rotors (one radius per rotor, span of shape (n_rotors, n_sec))
     """
 
     def initialize(self):
         self.options.declare("n_sec", recordable=False)
         self.options.declare("r_hub", recordable=False)
+        self.options.declare("n_rotors", default=1, recordable=False)
 
     def setup(self):
         self.n_sec = self.options["n_sec"]
         self.r_hub = self.options["r_hub"]
+        self.n_rotors = self.options["n_rotors"]
+
+        # A single rotor keeps the flat span vector
+        span_shape = self.n_sec if self.n_rotors == 1 else (self.n_rotors, self.n_sec)
 
         # Radius Input
-        self.add_input("radius", shape=1)
+        self.add_input("radius", shape=self.n_rotors)
 
         # Residual Output
-        self.add_output("span", shape=self.n_sec)
+        self.add_output("span", shape=span_shape)
+
+        # Linear in the radius, every span section depends on the radius of its own rotor only
+        self.declare_partials("span", "radius",
+                              rows=np.arange(self.n_rotors * self.n_sec),
+                              cols=np.repeat(np.arange(self.n_rotors), self.n_sec),
+                              val=1.0 / self.n_sec)
 
     def compute(self, inputs, outputs):
-        outputs["span"] = (inputs["radius"] - self.r_hub) / self.n_sec
-
-    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
-        # Forward Mode
-        if mode == "fwd":
-            if "radius" in d_inputs:
-                if "span" in d_outputs:
-                    d_outputs["span"] += d_inputs["radius"] / self.n_sec
-
-        # Reverse Mode
-        elif mode == "rev":
-            if "span" in d_outputs:
-                if "radius" in d_inputs:
-                    d_inputs["radius"] += np.sum(d_outputs["span"] / self.n_sec)
+        r_hub = np.broadcast_to(self.r_hub, (self.n_rotors,))
+        span = (inputs["radius"] - r_hub) / self.n_sec
+        outputs["span"] = np.repeat(span, self.n_sec).reshape(outputs["span"].shape)
@@ -0,0 +1,328 @@
+# --- Built-ins ---
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+import copy
+import queue
+import sqlite3
+import threading
+
+# --- Internal ---
+from src.utils.chunked_store import ChunkedArrayStore
+
+# --- External ---
+import openmdao.api as om
+from openmdao.core.driver import Driver
+from openmdao.recorders.case_recorder import CaseRecorder
+
+# Outputs read by the plotting functions in src.postprocessing.plots, per kind of plot.
+#   Not every model has all of these (e.g. a wing-only model has no HELIX), missing ones are skipped.
+PLOT_VARIABLES = {'wing': ['OPENAEROSTRUCT.AS_point_0.wing_perf.Cl',
+                           'OPENAEROSTRUCT.wing.geometry.chord',
+                           'OPENAEROSTRUCT.wing.geometry.twist'],
+                  'prop': ['HELIX_0.om_helix.rotorcomp_0_velocity_distribution',
+                           'HELIX_0.om_helix.geodef_parametric_0_twist',
+                           'DESIGNVARIABLES.rotor_0_twist'],
+                  'slipstream': ['RETHORST.velocity_distribution',
+                                 'RETHORST.propeller_velocity']}
+
+
+class _DerivativeThinning:
+    # Recorder mixin that only stores the derivatives of every k-th request
+    def __init__(self, *args, derivatives_every: int=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.derivatives_every = derivatives_every
+        self._derivative_count = 0
+
+    def record_derivatives(self, recording_requester, data, metadata, **kwargs):
+        self._derivative_count += 1
+        if (self._derivative_count-1) % self.derivatives_every == 0:
+            super().record_derivatives(recording_requester, data, metadata, **kwargs)
+
+
+# Sqlite recorder that only stores the derivatives of every k-th request
+class ThinnedSqliteRecorder(_DerivativeThinning, om.SqliteRecorder):
+    pass
+
+
+class _DeferredCommit:
+    # Connection stand-in for the background writer: the base recorder commits on every
+    #   "with connection", the writer commits once per batch instead
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self.connection
+
+    def __exit__(self, *args):
+        return False
+
+
+class AsyncSqliteRecorder(ThinnedSqliteRecorder):
+    """
+    Drop-in replacement for om.SqliteRecorder that moves serialisation and writing of the driver,
+    system and solver cases off the optimisation loop. Cases are copied onto a bounded queue (the
+    optimiser blocks only when max_queue cases are pending) and a background thread writes them in
+    batched transactions. Metadata is still written synchronously. prob.cleanup() flushes the queue.
+    """
+    def __init__(self, filepath, max_queue: int=64, batch_size: int=16, **kwargs):
+        super().__init__(filepath, **kwargs)
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._writer = None
+        self._error = None
+
+    def _initialize_database(self, comm):
+        super()._initialize_database(comm)
+
+        # Reopen the case database so that the background thread may write to it
+        if self.connection is not None:
+            shared_metadata = self.metadata_connection is self.connection
+            filename = self.connection.execute('PRAGMA database_list').fetchone()[2]
+            self.connection.close()
+            self.connection = sqlite3.connect(filename, check_same_thread=False)
+            if shared_metadata:
+                self.metadata_connection = self.connection
+
+    def startup(self, recording_requester, comm=None):
+        self.flush()
+        super().startup(recording_requester, comm)
+
+        # The writer is a shallow copy with its own counter and iteration coordinate,
+        #   the optimisation loop keeps updating those of the recorder itself
+        self._writer = copy.copy(self)
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._write_cases, daemon=True)
+            self._thread.start()
+
+    def _enqueue(self, method, recording_requester, data, metadata) -> None:
+        if self._error is not None:
+            raise RuntimeError('Background case writer failed') from self._error
+
+        self._queue.put((method, self._counter, self._iteration_coordinate,
+                         recording_requester, copy.deepcopy(data), copy.deepcopy(metadata)))
+
+    def _write_cases(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            writer = self._writer
+            connection = writer.connection
+            try:
+                writer.connection = _DeferredCommit(connection)
+                for item in batch:
+                    if item is None:
+                        continue
+                    method, writer._counter, writer._iteration_coordinate, *arguments = item
+                    method(writer, *arguments)
+                connection.commit()
+            except Exception as error:
+                connection.rollback()
+                self._error = error
+            finally:
+                writer.connection = connection
+                for _ in batch:
+                    self._queue.task_done()
+
+            if any(item is None for item in batch):
+                return
+
+    def flush(self) -> None:
+        # Blocks until every queued case is written
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+        if self._error is not None:
+            raise RuntimeError('Background case writer failed') from self._error
+
+    def record_iteration_driver(self, recording_requester, data, metadata):
+        self._enqueue(om.SqliteRecorder.record_iteration_driver, recording_requester, data, metadata)
+
+    def record_iteration_system(self, recording_requester, data, metadata):
+        self._enqueue(om.SqliteRecorder.record_iteration_system, recording_requester, data, metadata)
+
+    def record_iteration_solver(self, recording_requester, data, metadata):
+        self._enqueue(om.SqliteRecorder.record_iteration_solver, recording_requester, data, metadata)
+
+    def record_iteration_problem(self, recording_requester, data, metadata):
+        self._enqueue(om.SqliteRecorder.record_iteration_problem, recording_requester, data, metadata)
+
+    def record_derivatives_driver(self, recording_requester, data, metadata):
+        self._enqueue(om.SqliteRecorder.record_derivatives_driver, recording_requester, data, metadata)
+
+    def record_viewer_data(self, model_viewer_data, key='Driver'):
+        self.flush()
+        super().record_viewer_data(model_viewer_data, key)
+
+    def record_metadata_system(self, system, run_number=None):
+        self.flush()
+        super().record_metadata_system(system, run_number)
+
+    def record_metadata_solver(self, solver, run_number=None):
+        self.flush()
+        super().record_metadata_solver(solver, run_number)
+
+    def shutdown(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._thread = None
+        super().shutdown()
+        if self._error is not None:
+            raise RuntimeError('Background case writer failed') from self._error
+
+
+def _promoted_names(model: om.Group) -> dict[str, str]:
+    return {absolute_name: metadata['prom_name']
+            for absolute_name, metadata in model.get_io_metadata(iotypes='output', metadata_keys=[]).items()}
+
+
+class ChunkedArrayRecorder(_DerivativeThinning, CaseRecorder):
+    """
+    Recorder that stores every recorded output as a chunked, zlib-compressed array of shape
+    (n_cases, *shape) in a directory instead of pickled cases in sqlite (see src.utils.chunked_store).
+    Driver and problem cases and the driver derivatives are recorded, only the outputs of a case are kept.
+    Read the result with src.utils.chunked_store.ChunkedCaseReader, the postprocessing accepts either format.
+    """
+    def __init__(self, path: str, chunk_size: int=16, level: int=6, **kwargs):
+        super().__init__(record_viewer_data=False, **kwargs)
+        self.path = path
+        self.chunk_size = chunk_size
+        self.level = level
+        self._store = None
+        self._names = {}
+        self._kinds = {}
+
+    def startup(self, recording_requester, comm=None):
+        super().startup(recording_requester, comm)
+
+        # Under MPI only the recording rank(s) write, by default rank 0
+        recording = comm is None or comm.size == 1 or self._record_on_proc
+        if recording and self._store is None:
+            self._store = ChunkedArrayStore(self.path, chunk_size=self.chunk_size, level=self.level)
+
+        # Cases are stored under the names the sqlite case reader uses: promoted names, design variables
+        #   and responses under their own name rather than their source. The latter are tagged as well so
+        #   the reader can split them up again
+        if isinstance(recording_requester, Driver):
+            self._names.update(_promoted_names(recording_requester._problem().model))
+            for kind, variables in (('desvar', recording_requester._designvars),
+                                    ('objective', recording_requester._objs),
+                                    ('constraint', recording_requester._cons)):
+                for name, metadata in variables.items():
+                    self._names[metadata['source']] = name
+                    self._kinds[name] = kind
+        elif isinstance(recording_requester, om.Problem):
+            self._names.update(_promoted_names(recording_requester.model))
+
+    def _append(self, source: str, values: dict, metadata: dict) -> None:
+        if self._store is None:
+            return
+
+        case = {'counter': self._counter,
+                'iteration_coordinate': self._iteration_coordinate,
+                'timestamp': metadata.get('timestamp'),
+                'success': int(metadata.get('success', 1))}
+        values = {self._names.get(name, name): value for name, value in values.items()}
+        self._store.writer(source).append(values, case, kinds=self._kinds)
+
+    def record_iteration_driver(self, recording_requester, data, metadata):
+        self._append('driver', data['output'], metadata)
+
+    def record_iteration_problem(self, recording_requester, data, metadata):
+        self._append('problem', data['output'], metadata)
+
+    def record_derivatives_driver(self, recording_requester, data, metadata):
+        self._append('derivatives', data, metadata)
+
+    def record_metadata_system(self, system, run_number=None):
+        pass
+
+    def record_metadata_solver(self, solver, run_number=None):
+        pass
+
+    def record_viewer_data(self, model_viewer_data, key='Driver'):
+        pass
+
+    def shutdown(self):
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+
+@dataclass(slots=True)
+class RecordingSpec:
+    """
+    Derives what the driver recorder has to store: the design variables, objective and constraints
+    are recorded by the driver anyway, on top of that only the outputs needed by the requested plots
+    (see PLOT_VARIABLES) and any extra variables are included.
+
+    Usage:  spec = RecordingSpec(objective, constraints, design_vars, plots=['wing', 'prop'])
+            spec.attach(prob, db_name)  # before setup
+            prob.setup()
+            spec.validate(prob)         # after setup, before run_driver
+    """
+    objective: dict = field(default_factory=dict)
+    constraints: dict = field(default_factory=dict)
+    design_vars: dict = field(default_factory=dict)
+    plots: list[str] = field(default_factory=lambda: ['wing'])
+    extra: list[str] = field(default_factory=list)  # must exist in the model, wildcards allowed
+    derivatives_every: int = 0                      # record the total derivatives every k-th time, 0 for never
+    asynchronous: bool = False                      # write the cases on a background thread (AsyncSqliteRecorder)
+    backend: str = 'sqlite'                         # 'sqlite' or 'chunked' (ChunkedArrayRecorder, db_name is a directory)
+
+    @property
+    def driver_variables(self) -> list[str]:
+        return list(dict.fromkeys([*self.objective, *self.constraints, *self.design_vars]))
+
+    @property
+    def includes(self) -> list[str]:
+        # Deduplicated, in order of appearance, without what the driver records regardless
+        plot_variables = [name for plot in self.plots for name in PLOT_VARIABLES[plot]]
+        recorded = set(self.driver_variables)
+        return [name for name in dict.fromkeys([*plot_variables, *self.extra]) if name not in recorded]
+
+    def attach(self, prob: om.Problem, db_name: str) -> CaseRecorder:
+        if self.backend == 'chunked':
+            recorder_class = ChunkedArrayRecorder
+        elif self.backend == 'sqlite':
+            recorder_class = AsyncSqliteRecorder if self.asynchronous else ThinnedSqliteRecorder
+        else:
+            raise ValueError(f'Unknown recorder backend {self.backend}, use sqlite or chunked')
+
+        recorder = recorder_class(db_name, derivatives_every=max(self.derivatives_every, 1))
+        prob.driver.add_recorder(recorder)
+
+        options = prob.driver.recording_options
+        options['record_desvars'] = True
+        options['record_objectives'] = True
+        options['record_constraints'] = True
+        options['record_derivatives'] = self.derivatives_every > 0
+        options['includes'] = self.includes
+
+        return recorder
+
+    def validate(self, prob: om.Problem) -> list[str]:
+        # Checks the names against the set-up model: unknown extra variables raise,
+        #   plot variables the model does not have are dropped. Returns the final include list.
+        #   Inputs count as well, e.g. the HELIX twist the propeller plots read is an input.
+        names = set()
+        for absolute_name, metadata in prob.model.get_io_metadata(iotypes=('input', 'output'),
+                                                                   metadata_keys=[]).items():
+            names.update((absolute_name, metadata['prom_name']))
+
+        def exists(pattern: str) -> bool:
+            return pattern in names or any(fnmatchcase(name, pattern) for name in names)
+
+        missing = [name for name in [*self.extra, *self.driver_variables] if not exists(name)]
+        if missing:
+            raise ValueError(f'Recorded variables not found in the model: {missing}')
+
+        includes = [name for name in self.includes if exists(name)]
+        prob.driver.recording_options['includes'] = includes
+
+        return includes
@@ -0,0 +1,94 @@
+# --- Built-ins ---
+from dataclasses import fields
+import json
+import os
+
+# --- Internal ---
+from src.base import ParamInfo, WingInfo, PropInfo, WingPropInfo
+
+# --- External ---
+import numpy as np
+
+HEADER_FILE = 'header.json'
+
+
+def _split_fields(obj, prefix: str, arrays: dict) -> dict:
+    # Arrays go into the flat array dictionary, everything else into the (json) header
+    header = {}
+    for dataclass_field in fields(obj):
+        if not dataclass_field.init:
+            continue
+
+        value = getattr(obj, dataclass_field.name)
+        if isinstance(value, (np.ndarray, list, tuple)):
+            arrays[prefix+dataclass_field.name] = np.asarray(value)
+        elif isinstance(value, np.generic):
+            header[dataclass_field.name] = value.item()
+        else:
+            header[dataclass_field.name] = value
+
+    return header
+
+
+def _merge_fields(header: dict, prefix: str, arrays: dict) -> dict:
+    kwargs = dict(header)
+    for key, value in arrays.items():
+        if key.startswith(prefix) and '.' not in key[len(prefix):]:
+            kwargs[key[len(prefix):]] = value
+
+    return kwargs
+
+
+def wingpropinfo_to_arrays(wingpropinfo: WingPropInfo) -> tuple[dict, dict]:
+    # Flattens the configuration into a json-serialisable header and a dictionary of arrays,
+    #   derived (cached) geometry is not included
+    arrays = {}
+    header = {'wingpropinfo': {},
+              'parameters': _split_fields(wingpropinfo.parameters, 'parameters.', arrays),
+              'wing': _split_fields(wingpropinfo.wing, 'wing.', arrays),
+              'propeller': [_split_fields(propeller, f'propeller.{index}.', arrays)
+                            for index, propeller in enumerate(wingpropinfo.propeller)]}
+
+    for dataclass_field in fields(wingpropinfo):
+        if dataclass_field.init and dataclass_field.name not in ('propeller', 'wing', 'parameters'):
+            header['wingpropinfo'][dataclass_field.name] = getattr(wingpropinfo, dataclass_field.name)
+
+    return header, arrays
+
+
+def wingpropinfo_from_arrays(header: dict, arrays: dict) -> WingPropInfo:
+    # The arrays are used as given (not copied), so memory-mapped or shared-memory arrays stay mapped
+    parameters = ParamInfo(**_merge_fields(header['parameters'], 'parameters.', arrays))
+    wing = WingInfo(**_merge_fields(header['wing'], 'wing.', arrays))
+    propeller = [PropInfo(**_merge_fields(propeller_header, f'propeller.{index}.', arrays))
+                 for index, propeller_header in enumerate(header['propeller'])]
+
+    return WingPropInfo(propeller=propeller,
+                        wing=wing,
+                        parameters=parameters,
+                        **header['wingpropinfo'])
+
+
+def save_wingpropinfo(wingpropinfo: WingPropInfo, path: str) -> None:
+    # One .npy file per array so that the arrays can be memory-mapped on load
+    header, arrays = wingpropinfo_to_arrays(wingpropinfo)
+
+    os.makedirs(path, exist_ok=True)
+    for key, value in arrays.items():
+        np.save(os.path.join(path, f'{key}.npy'), value)
+
+    header['arrays'] = list(arrays.keys())
+    with open(os.path.join(path, HEADER_FILE), 'w') as file:
+        json.dump(header, file, indent=4)
+
+
+def load_wingpropinfo(path: str, mmap_mode: str='c') -> WingPropInfo:
+    # mmap_mode='c' maps the arrays copy-on-write: nothing is read until used and
+    #   in-place edits stay local to the process. Use mmap_mode=None to load into memory.
+    with open(os.path.join(path, HEADER_FILE), 'r') as file:
+        header = json.load(file)
+
+    arrays = {key: np.load(os.path.join(path, f'{key}.npy'), mmap_mode=mmap_mode)
+              for key in header.pop('arrays')}
+
+    return wingpropinfo_from_arrays(header, arrays)
@@ -0,0 +1,258 @@
+# --- Built-ins ---
+import os
+
+# --- Internal ---
+
+# --- External ---
+import numpy as np
+import openmdao.api as om
+from openmdao.recorders.recording_iteration_stack import Recording
+from openmdao.solvers.solver import NonlinearSolver
+from openmdao.utils.om_warnings import issue_warning, SolverWarning
+
+
+class AndersonBlockGS(om.NonlinearBlockGS):
+    """
+    Nonlinear block Gauss-Seidel with Anderson acceleration. Every Gauss-Seidel sweep G is treated as a
+    fixed-point map and the next iterate is the combination of the last anderson_depth+1 sweeps that
+    minimises the linearised fixed-point residual f = G(x) - x, instead of Aitken's single relaxation factor.
+
+    Safeguards: the history is restarted when the residual grows by more than restart_factor, and an
+    accelerated step longer than step_factor times the plain Gauss-Seidel step is replaced by that plain step.
+    Divergence (residual above divergence_factor times the initial one) and stagnation (residual reduced
+    by less than stagnation_ratio over stagnation_iters iterations) end the solve at the best iterate.
+    All failures raise an AnalysisError when err_on_non_converge is set and give a SolverWarning otherwise.
+
+    The residual norms of every iteration are kept in residual_norms (last solve) and history (all solves).
+    """
+    SOLVER = 'NL: Anderson'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+        self.residual_norms: list[float] = []
+        self.history: list[list[float]] = []
+        self._reset_anderson()
+
+    def _declare_options(self):
+        super()._declare_options()
+
+        self.options.declare('anderson_depth', types=int, default=5, lower=0,
+                             desc='number of previous iterations used for the acceleration, 0 is plain Gauss-Seidel')
+        self.options.declare('anderson_beta', default=1.0, lower=0.,
+                             desc='mixing factor of the Gauss-Seidel step')
+        self.options.declare('restart_factor', default=2.0,
+                             desc='restart the history when the residual grows by more than this factor')
+        self.options.declare('step_factor', default=10.0,
+                             desc='largest accelerated step relative to the plain Gauss-Seidel step')
+        self.options.declare('divergence_factor', default=1e4,
+                             desc='stop when the residual exceeds this factor times the initial residual')
+        self.options.declare('stagnation_iters', types=int, default=20, lower=1,
+                             desc='number of iterations over which the residual has to decrease')
+        self.options.declare('stagnation_ratio', default=0.9,
+                             desc='stop when the residual is not reduced below this ratio over stagnation_iters')
+
+        self.options.undeclare('use_aitken')
+        self.options.declare('use_aitken', default=False, values=[False],
+                             desc='not available, the acceleration replaces the Aitken relaxation')
+
+    def _setup_solvers(self, system, depth):
+        super()._setup_solvers(system, depth)
+
+        if self.options['use_apply_nonlinear']:
+            raise RuntimeError(f'{self.msginfo}: use_apply_nonlinear is not supported, '
+                               'the residual is the change of the outputs over one sweep')
+
+    def _reset_anderson(self):
+        self._previous = None           # (x, f) of the previous iteration
+        self._delta_x: list[np.array] = []
+        self._delta_f: list[np.array] = []
+        self._best = None               # (norm, outputs) of the iterate with the smallest fixed-point residual
+        self._stopped = False           # set by _failed, ends the solve loop without a second failure report
+
+    def _iter_initialize(self):
+        self._reset_anderson()
+        self.residual_norms = []
+        self.history.append(self.residual_norms) # filled in place by _iter_get_norm
+
+        return super()._iter_initialize()
+
+    def _iter_get_norm(self):
+        norm = super()._iter_get_norm()
+        self.residual_norms.append(norm)
+        return norm
+
+    def _solve(self):
+        # The iteration of NonlinearSolver._solve, which in addition ends once _failed has stopped the solve.
+        #   _failed reports its own failure, the maxiter and stall failures are only reported otherwise.
+        system = self._system()
+        maxiter = self.options['maxiter']
+        atol = self.options['atol']
+        rtol = self.options['rtol']
+        stall_limit = self.options['stall_limit']
+        stall_tol = self.options['stall_tol']
+
+        self._mpi_print_header()
+
+        self._iter_count = 0
+        norm0, norm = self._iter_initialize()
+        self._norm0 = norm0
+        self._mpi_print(self._iter_count, norm, norm / norm0)
+
+        stalled = False
+        stall_count, stall_norm = 0, norm0
+        force_one_iteration = system.under_complex_step
+
+        while (self._iter_count < maxiter and norm > atol and norm / norm0 > rtol and not stalled
+               and not self._stopped) or force_one_iteration:
+            force_one_iteration = False
+
+            with Recording(type(self).__name__, self._iter_count, self) as rec:
+                self._single_iteration()
+                if self._stopped:
+                    # Recorded at the best iterate, to which the outputs were reset
+                    rec.abs, rec.rel = self._best[0], self._best[0] / (norm0 or 1)
+                    break
+
+                self._iter_count += 1
+                self._run_apply()
+                norm = self._iter_get_norm()
+
+                if norm0 == 0:
+                    norm0 = 1
+                rec.abs, rec.rel = norm, norm / norm0
+
+                if stall_limit > 0:
+                    norm_for_stall = rec.rel if self.options['stall_tol_type'] == 'rel' else rec.abs
+                    if np.abs(stall_norm - norm_for_stall) <= stall_tol:
+                        stall_count += 1
+                        stalled = stall_count >= stall_limit
+                    else:
+                        stall_count, stall_norm = 0, norm_for_stall
+
+            self._mpi_print(self._iter_count, norm, norm / norm0)
+
+        if self._stopped:
+            return
+        if np.isinf(norm) or np.isnan(norm):
+            self._inf_nan_failure()
+        elif stalled:
+            self.report_failure(f"Solver '{self.SOLVER}' on system '{system.pathname}' stalled after "
+                                f"{self._iter_count} iterations.")
+        elif norm > atol and norm / norm0 > rtol:
+            self._convergence_failure()
+        elif system.comm.rank == 0 or os.environ.get('USE_PROC_FILES'):
+            prefix = self._solver_info.prefix + self.SOLVER
+            if self.options['iprint'] == 1:
+                print(prefix + f' Converged in {self._iter_count} iterations')
+            elif self.options['iprint'] == 2:
+                print(prefix + ' Converged')
+
+    def _run_apply(self):
+        # The first sweep of the solve is done here, as in NonlinearBlockGS, and starts the history
+        if self._iter_count < 1:
+            self._iter_count += 1
+            self._single_iteration()
+
+    def _single_iteration(self):
+        system = self._system()
+        outputs = system._outputs
+        residuals = system._residuals
+
+        if self._failed():
+            return
+
+        with system._unscaled_context(outputs=[outputs]):
+            x = outputs.asarray(copy=True)
+
+        self._solver_info.append_subsolver()
+        self._gs_iter()
+        self._solver_info.pop()
+
+        with system._unscaled_context(outputs=[outputs], residuals=[residuals]):
+            f = outputs.asarray() - x
+            residuals.set_val(f)
+            outputs.set_val(self._anderson_step(x, f))
+
+    def _anderson_step(self, x: np.array, f: np.array) -> np.array:
+        # Type-II Anderson mixing: x+ = x + beta*f - (dX + beta*dF) gamma, gamma = argmin |f - dF gamma|
+        depth = self.options['anderson_depth']
+        beta = self.options['anderson_beta']
+        f_norm = np.linalg.norm(f)
+
+        if self._best is None or f_norm < self._best[0]:
+            self._best = (f_norm, x+f) # the sweep result of the best iterate
+
+        if self._previous is not None:
+            previous_x, previous_f = self._previous
+            if f_norm > self.options['restart_factor']*np.linalg.norm(previous_f):
+                self._delta_x, self._delta_f = [], []
+            else:
+                self._delta_x.append(x-previous_x)
+                self._delta_f.append(f-previous_f)
+                del self._delta_x[:-depth or len(self._delta_x)]
+                del self._delta_f[:-depth or len(self._delta_f)]
+        self._previous = (x, f)
+
+        step = beta*f
+        if depth == 0 or not self._delta_f:
+            return x + step
+
+        delta_f = np.column_stack(self._delta_f)
+        gamma = np.linalg.lstsq(delta_f, f, rcond=None)[0]
+        accelerated = step - (np.column_stack(self._delta_x) + beta*delta_f) @ gamma
+
+        if not np.all(np.isfinite(accelerated)) or \
+                np.linalg.norm(accelerated) > self.options['step_factor']*np.linalg.norm(step):
+            self._delta_x, self._delta_f = [], []
+            return x + step
+
+        return x + accelerated
+
+    def _failed(self) -> bool:
+        # Ends the solve at the best iterate so far when the residual diverges or stagnates
+        norms = self.residual_norms
+        stagnation_iters = self.options['stagnation_iters']
+        if len(norms) > 1 and norms[-1] > self.options['divergence_factor']*norms[0]:
+            failure = 'diverged'
+        elif len(norms) > stagnation_iters and norms[-1] > self.options['stagnation_ratio']*norms[-1-stagnation_iters]:
+            failure = 'stagnated'
+        else:
+            return False
+
+        system = self._system()
+        with system._unscaled_context(outputs=[system._outputs]):
+            system._outputs.set_val(self._best[1])
+
+        self._stopped = True
+        self.report_failure(f" Solver '{self.SOLVER}' on system '{system.pathname}' {failure}: residual "
+                            f"{norms[-1]:.3e} after {len(norms)-1} iterations, initially {norms[0]:.3e}.")
+        return True
+
+    def report_failure(self, msg):
+        super().report_failure(msg)
+        if not self.options['err_on_non_converge']:
+            issue_warning(msg.strip(), category=SolverWarning)
+
+    def convergence_summary(self) -> str:
+        # One line per solve: number of iterations and the initial and final residual norm
+        lines = [f'{self.SOLVER} on {self._system().pathname or "model"}: {len(self.history)} solves']
+        for index, norms in enumerate(self.history):
+            if norms:
+                lines.append(f'  solve {index}: {len(norms)-1} iterations, residual {norms[0]:.3e} -> {norms[-1]:.3e}')
+        return '\n'.join(lines)
+
+
+def coupling_solver(kind: str='aitken', **options) -> NonlinearSolver:
+    # Nonlinear solver of a coupled group: 'aitken' (block Gauss-Seidel with Aitken relaxation) or 'anderson'
+    if kind == 'aitken':
+        solver = om.NonlinearBlockGS(use_aitken=True)
+    elif kind == 'anderson':
+        solver = AndersonBlockGS()
+    else:
+        raise ValueError(f"Unknown coupling solver {kind}, expected 'aitken' or 'anderson'")
+
+    for option, value in options.items():
+        solver.options[option] = value
+
+    return solver
@@ -1,16 +1,14 @@
 # --- Built-ins ---
-import unittest
+from typing import TYPE_CHECKING
 
 # --- Internal ---
 
 # --- External ---
-import openmdao.api as om
-import niceplots
-import matplotlib.pyplot as plt
-import numpy as np
+if TYPE_CHECKING: # openmdao.api takes over a second to import, only needed for the annotation
+    import openmdao.api as om
 
 def print_results(design_vars: dict, constraints: dict, objective: dict,
-                  prob: om.Problem, kind: str)->None:
+                  prob: 'om.Problem', kind: str)->None:
     print('============================================================')
     print(f'{kind:=^60}')
     print('============================================================')
@@ -0,0 +1,51 @@
+# --- Built-ins ---
+from pathlib import Path
+import sys
+
+# The tests import the package as src.*, as the examples do when run from the repository root
+sys.path.insert(0, str(Path(__file__).parents[1]))
+
+# --- Internal ---
+from src.base import AirfoilInfo, ParamInfo, PropInfo, WingInfo, WingPropInfo
+
+# --- External ---
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def wing_configuration() -> WingPropInfo:
+    # Rectangular wing without propellers, needs neither the propeller nor the slipstream models
+    wing = WingInfo(label='wing', span=1.5, chord=np.full(5, 0.24), twist=np.zeros(5),
+                    thickness=np.full(5, 0.01), empty_weight=5.)
+    parameters = ParamInfo(vinf=40., wing_aoa=2., mach_number=0.1, reynolds_number=600_000, speed_of_sound=340.)
+    return WingPropInfo(spanwise_discretisation_wing=21, spanwise_discretisation_propeller=0,
+                        spanwise_discretisation_propeller_BEM=0, propeller=[], wing=wing, parameters=parameters,
+                        NO_PROPELLER=True, linear_mesh=True)
+
+
+def propeller(label: str, location: float, rotation_direction: int, nr_sections: int) -> PropInfo:
+    # Linearly twisted and tapered blade with a 0.1185 m tip radius, the size of the PROWIM propeller
+    hub_radius, tip_radius = 0.02, 0.1185
+    return PropInfo(label=label, prop_location=location, nr_blades=4, rot_rate=40./(2.*tip_radius)*2.*np.pi,
+                    chord=np.linspace(0.15, 0.08, nr_sections+1)*tip_radius,
+                    twist=np.linspace(45., 20., nr_sections+1),
+                    span=np.full(nr_sections, (tip_radius-hub_radius)/nr_sections),
+                    airfoils=[AirfoilInfo(label=f'Foil_{index}', Cl_alpha=6.2, alpha_L0=-0.04, alpha_0=0.25)
+                              for index in range(nr_sections+1)],
+                    ref_point=np.array([0., hub_radius, 0.]), rotation_direction=rotation_direction, prop_angle=45.)
+
+
+@pytest.fixture
+def wingprop_configuration() -> WingPropInfo:
+    # PROWIM-like wing with two tip-mounted propellers, without the PROWIM.json propeller data
+    nr_sections = 10
+    wing = WingInfo(label='wing', span=0.748*2, chord=np.full(10, 0.24), twist=np.zeros(10),
+                    thickness=np.full(10, 0.01), empty_weight=5.)
+    parameters = ParamInfo(vinf=40., wing_aoa=2., mach_number=0.2, reynolds_number=3_500_000,
+                           speed_of_sound=333.4, air_density=1.2087)
+    return WingPropInfo(spanwise_discretisation_wing=21*3, spanwise_discretisation_propeller=15,
+                        spanwise_discretisation_propeller_BEM=nr_sections,
+                        propeller=[propeller('prop_1', -0.332, 1, nr_sections),
+                                   propeller('prop_2', 0.332, -1, nr_sections)],
+                        wing=wing, parameters=parameters)
@@ -0,0 +1,60 @@
+# --- Built-ins ---
+
+# --- Internal ---
+from src.utils.adaptive_tolerance import AdaptiveTolerance, ToleranceSchedule
+
+# --- External ---
+import numpy as np
+import openmdao.api as om
+from openmdao.test_suite.components.sellar import SellarDis1withDerivatives, SellarDis2withDerivatives
+import pytest
+
+
+def sellar_problem() -> om.Problem:
+    # Sellar with a Gauss-Seidel coupled group, the tolerance of which follows the optimiser
+    prob = om.Problem(reports=False)
+    model = prob.model
+    model.add_subsystem('design', om.IndepVarComp('x', 1.), promotes=['x'])
+    model.add_subsystem('shared', om.IndepVarComp('z', np.array([5., 2.])), promotes=['z'])
+
+    coupled = model.add_subsystem('coupled', om.Group(), promotes=['*'])
+    coupled.add_subsystem('discipline_1', SellarDis1withDerivatives(), promotes=['*'])
+    coupled.add_subsystem('discipline_2', SellarDis2withDerivatives(), promotes=['*'])
+    coupled.nonlinear_solver = om.NonlinearBlockGS(maxiter=200, iprint=-1)
+    coupled.linear_solver = om.ScipyKrylov(iprint=-1)
+
+    model.add_subsystem('objective', om.ExecComp('obj = x**2 + z[1] + y1 + exp(-y2)', z=np.zeros(2)),
+                        promotes=['*'])
+    model.add_subsystem('constraint_1', om.ExecComp('con1 = 3.16 - y1'), promotes=['*'])
+    model.add_subsystem('constraint_2', om.ExecComp('con2 = y2 - 24.0'), promotes=['*'])
+
+    model.add_design_var('z', lower=np.array([-10., 0.]), upper=np.array([10., 10.]))
+    model.add_design_var('x', lower=0., upper=10.)
+    model.add_objective('obj')
+    model.add_constraint('con1', upper=0.)
+    model.add_constraint('con2', upper=0.)
+
+    prob.driver = om.ScipyOptimizeDriver(optimizer='SLSQP', tol=1e-8, disp=False)
+    return prob
+
+
+def test_schedule_history_on_sellar():
+    schedule = ToleranceSchedule()
+    prob = sellar_problem()
+    controller = AdaptiveTolerance(['coupled'], schedule).attach(prob)
+    prob.setup()
+    prob.run_driver()
+
+    history = controller.history
+    atols = [step.atol for step in history]
+
+    # SLSQP evaluates the initial design twice, that evaluation does not tighten the tolerance
+    assert not history[1].moved
+    assert history[1].atol == schedule.loose
+
+    # The tolerance is tightened gradually over the run, never loosened, and reaches the tight one at the optimum
+    assert all(later <= earlier for earlier, later in zip(atols, atols[1:]))
+    assert len(set(atols)) > 3
+    assert atols[len(atols)//4] > schedule.tight
+    assert atols[-1] == pytest.approx(schedule.tight)
+    assert prob.get_val('obj')[0] == pytest.approx(3.18339395, rel=1e-5)
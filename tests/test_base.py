@@ -0,0 +1,19 @@
+# --- Built-ins ---
+
+# --- Internal ---
+
+# --- External ---
+import numpy as np
+
+
+def test_matched_wing_discretisation(wingprop_configuration):
+    # The matched discretisation is derived from the propeller spacing, it is only applied when assigned
+    assert wingprop_configuration.matched_spanwise_discretisation_wing == 63
+    wingprop_configuration.spanwise_discretisation_propeller = 21
+    assert wingprop_configuration.matched_spanwise_discretisation_wing == 93
+    assert wingprop_configuration.spanwise_discretisation_wing == 63
+
+    nodes = wingprop_configuration.spanwise_discretisation_nodes
+    wingprop_configuration.spanwise_discretisation_wing = wingprop_configuration.matched_spanwise_discretisation_wing
+    assert wingprop_configuration.spanwise_discretisation_nodes == nodes+93-63
+    np.testing.assert_allclose(wingprop_configuration.spacing_ratio, 1., atol=0.1)
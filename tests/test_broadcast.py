@@ -0,0 +1,27 @@
+# --- Built-ins ---
+
+# --- Internal ---
+from src.doe.doe import _initialise_worker
+from src.models.wing_model import SurfaceSpec, _SURFACE_CACHE, wing_surface
+from src.utils.broadcast import ConfigurationBroadcast, attach_configuration
+
+# --- External ---
+import numpy as np
+
+
+def test_worker_uses_broadcast_surface(wing_configuration):
+    surface = wing_surface(wing_configuration)
+    with ConfigurationBroadcast(wing_configuration, surface=surface) as broadcast:
+        _SURFACE_CACHE.clear() # as in a freshly started worker
+
+        _initialise_worker(broadcast.descriptor, model=None, responses=[], dimensions=[], surface_spec=SurfaceSpec())
+        wingpropinfo, shared, _ = attach_configuration(broadcast.descriptor)
+        worker_surface = wing_surface(wingpropinfo)
+
+        assert worker_surface.keys() == surface.keys()
+        assert not worker_surface['mesh'].flags.writeable # a view on the shared block, not rebuilt
+        np.testing.assert_array_equal(worker_surface['mesh'], surface['mesh'])
+        np.testing.assert_array_equal(worker_surface['thickness_cp'], surface['thickness_cp'])
+        assert worker_surface['fem_origin'] == surface['fem_origin']
+
+    _SURFACE_CACHE.clear() # the views are invalid once the blocks are released
@@ -0,0 +1,50 @@
+# --- Built-ins ---
+
+# --- Internal ---
+from src.constraints.constraints import ConstraintsKS, BLADE_CHORD_BOUNDS, BLADE_CHORD_REF, BLADE_CURVATURE_REF
+
+# --- External ---
+import numpy as np
+import openmdao.api as om
+from openmdao.utils.assert_utils import assert_check_partials
+import pytest
+
+NR_PROPS = 2
+NR_POINTS = 20
+
+
+def aggregate(values: list[np.array], method: str='ks', **bounds) -> om.Problem:
+    prob = om.Problem(reports=False)
+    for index, value in enumerate(values):
+        prob.model.add_subsystem(f'source_{index}', om.IndepVarComp('x', value))
+    prob.model.add_subsystem('KS', ConstraintsKS(n_inputs=len(values), method=method, rho=50., **bounds))
+    for index in range(len(values)):
+        prob.model.connect(f'source_{index}.x', f'KS.x_{index}')
+    prob.setup(force_alloc_complex=True)
+    prob.run_model()
+    return prob
+
+
+@pytest.mark.parametrize('method', ['ks', 'ie'])
+def test_feasible_concave_chord_curvature(method):
+    # Every raw constraint d2y <= 0 holds, so the aggregate of both rotors has to be feasible as well
+    s = np.linspace(0., 1., NR_POINTS)
+    curvatures = [np.full(NR_POINTS, -0.03), -0.02 - 0.05*s]
+    prob = aggregate(curvatures, method, upper=0., ref=BLADE_CURVATURE_REF)
+    assert prob['KS.aggregate'][0] <= 0.
+
+
+def test_infeasible_chord_curvature():
+    curvatures = [np.full(NR_POINTS, -0.03), np.full(NR_POINTS, -0.03)]
+    curvatures[1][5] = 0.02
+    prob = aggregate(curvatures, upper=0., ref=BLADE_CURVATURE_REF)
+    assert prob['KS.aggregate'][0] >= 0.02/BLADE_CURVATURE_REF
+
+
+def test_chord_span_bounds():
+    chord = np.linspace(0.03, 0.01, NR_POINTS-1)
+    prob = aggregate([chord]*NR_PROPS, lower=BLADE_CHORD_BOUNDS[0], upper=BLADE_CHORD_BOUNDS[1], ref=BLADE_CHORD_REF)
+    assert prob['KS.aggregate'][0] <= 0.
+
+    partials = prob.check_partials(method='cs', out_stream=None)
+    assert_check_partials(partials, atol=1e-8, rtol=1e-8)
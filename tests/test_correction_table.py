@@ -0,0 +1,86 @@
+# --- Built-ins ---
+
+# --- Internal ---
+
+# --- External ---
+import numpy as np
+import openmdao.api as om
+import pytest
+
+pytest.importorskip('rethorst')
+
+from src.models.correction_table import CorrectionTableSpec, RethorstCorrectionTable, LAYOUT_INPUTS, \
+    correction_table, jet_profiles, jet_velocity, validate_correction_table
+
+# Tolerances of the tabulation against the direct RETHORST_correction, the table interpolates linearly
+#   over 0.05 wide ratio intervals and superposes the jets
+MATRIX_TOLERANCE = 1e-2
+VELOCITY_TOLERANCE = 1e-3
+
+
+@pytest.fixture
+def wingpropinfo(wingprop_configuration):
+    # The two propeller configuration of conftest, the correction needs propellers
+    return wingprop_configuration
+
+
+def propeller_layout(wingpropinfo) -> dict[str, np.array]:
+    radii = np.array([np.linspace(0., propeller.prop_radius[-1], wingpropinfo.spanwise_discretisation_propeller+1)
+                      for propeller in wingpropinfo.propeller])
+    return {'propeller_locations': wingpropinfo.prop_locations,
+            'propeller_radii': radii,
+            'wing_mesh': wingpropinfo.vlm_mesh,
+            'wing_mesh_control_points': wingpropinfo.vlm_mesh_control_points}
+
+
+def propeller_velocity(wingpropinfo, ratios: np.array, vinf: float, swirl: float=0.) -> np.array:
+    # Jet velocities of a loaded blade, with the excess peaking at 70% of the radius
+    r = np.linspace(0., 1., wingpropinfo.spanwise_discretisation_propeller)
+    profile = np.exp(-(r-0.7)**2/(0.1+swirl))
+    profiles = np.tile(profile/np.mean(profile), (wingpropinfo.nr_props, 1))
+    return jet_velocity(profiles, np.asarray(ratios), vinf, 1.)
+
+
+def test_table_against_direct_correction(wingpropinfo, tmp_path):
+    vinf = wingpropinfo.parameters.vinf
+    spec = CorrectionTableSpec(cache_dir=str(tmp_path))
+    layout = propeller_layout(wingpropinfo)
+    velocity = propeller_velocity(wingpropinfo, np.full(wingpropinfo.nr_props, 1.3), vinf)
+    table = correction_table(wingpropinfo, layout,
+                             jet_profiles(velocity, vinf, wingpropinfo.nr_props, spec.neutral_ratio), spec)
+
+    # Ratios between the grid points, equal and different per jet
+    samples = [(propeller_velocity(wingpropinfo, np.full(wingpropinfo.nr_props, ratio), vinf), vinf)
+               for ratio in (1.07, 1.33, 1.91)]
+    samples.append((propeller_velocity(wingpropinfo, np.linspace(1.12, 1.68, wingpropinfo.nr_props), vinf), vinf))
+    for result in validate_correction_table(wingpropinfo, table, layout, samples):
+        assert result.matrix_error < MATRIX_TOLERANCE, str(result)
+        assert result.distribution_error < VELOCITY_TOLERANCE, str(result)
+
+
+def test_profile_drift_switches_table(wingpropinfo, tmp_path):
+    vinf = wingpropinfo.parameters.vinf
+    spec = CorrectionTableSpec(cache_dir=str(tmp_path))
+    ratios = np.full(wingpropinfo.nr_props, 1.3)
+
+    prob = om.Problem(reports=False)
+    prob.model.add_subsystem('correction', RethorstCorrectionTable(WingPropInfo=wingpropinfo, spec=spec), promotes=['*'])
+    layout = propeller_layout(wingpropinfo)
+    for name in LAYOUT_INPUTS:
+        prob.model.set_input_defaults(name, layout[name])
+    prob.model.set_input_defaults('propeller_velocity', propeller_velocity(wingpropinfo, ratios, vinf))
+    prob.setup()
+    prob.set_val('vinf', vinf)
+    prob.run_model()
+    table = prob.model.correction.table
+
+    # A small change of the shape keeps the table, a large one switches to the table of the new shape
+    prob.set_val('propeller_velocity', propeller_velocity(wingpropinfo, ratios, vinf, swirl=1e-4))
+    prob.run_model()
+    assert prob.model.correction.table is table
+
+    prob.set_val('propeller_velocity', propeller_velocity(wingpropinfo, ratios, vinf, swirl=0.5))
+    with pytest.warns(UserWarning, match='Radial jet shapes'):
+        prob.run_model()
+    assert prob.model.correction.table is not table
+    assert len(list(tmp_path.iterdir())) == 2
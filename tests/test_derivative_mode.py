@@ -0,0 +1,67 @@
+# --- Built-ins ---
+import os
+
+# --- Internal ---
+from src.utils import derivative_mode
+from src.utils.coloring import coloring_file, enable_total_coloring, store_total_coloring
+from src.utils.derivative_mode import select_derivative_mode
+
+# --- External ---
+import numpy as np
+import openmdao.api as om
+import pytest
+
+NR_DESIGN_VARIABLES = 10
+
+
+def sparse_problem() -> om.Problem:
+    # Ten design variables with a diagonal constraint jacobian, two colours instead of ten solves
+    prob = om.Problem(reports=False)
+    prob.model.add_subsystem('objective', om.ExecComp('y=sum((x-1.)**2)', x=np.zeros(NR_DESIGN_VARIABLES)),
+                             promotes=['*'])
+    prob.model.add_subsystem('constraint', om.ExecComp('z=2.*x', x=np.zeros(NR_DESIGN_VARIABLES),
+                                                       z=np.zeros(NR_DESIGN_VARIABLES), has_diag_partials=True),
+                             promotes=['*'])
+    prob.model.add_design_var('x', lower=-5., upper=5.)
+    prob.model.add_objective('y')
+    prob.model.add_constraint('z', upper=1.)
+    prob.driver = om.ScipyOptimizeDriver(optimizer='SLSQP', tol=1e-8, disp=False)
+    return prob
+
+
+@pytest.fixture
+def coloured_wins(monkeypatch, tmp_path):
+    # Timings are machine dependent, the coloured evaluation is made the fastest one
+    monkeypatch.setattr(derivative_mode, '_time_totals',
+                        lambda prob, coloring_info, repeats: 1. if coloring_info is False else 0.1)
+    monkeypatch.chdir(tmp_path) # openmdao writes its own colouring files to the working directory
+
+
+def test_selected_colouring_is_cached(coloured_wins, tmp_path):
+    # The selection with total colouring: the colouring of the selected 'auto' mode is cached and reported
+    directory = str(tmp_path / 'coloring')
+    prob = sparse_problem()
+    prob.setup()
+    report = select_derivative_mode(prob, coloured=True)
+    assert report.mode == 'auto'
+    assert report.coloring is not None
+
+    enable_total_coloring(prob, directory, report.mode, coloring=report.coloring)
+    prob.run_driver()
+    coloring_report = store_total_coloring(prob, directory, report.mode)
+
+    assert os.path.isfile(coloring_file(prob, directory, report.mode))
+    assert coloring_report.coloured_solves == report.coloring.total_solves() < NR_DESIGN_VARIABLES
+    np.testing.assert_allclose(prob.get_val('x'), 0.5, atol=1e-6)
+
+
+def test_selection_without_colouring(coloured_wins):
+    # 'auto' is no candidate without colouring, the problem is set up again in a counted mode
+    prob = sparse_problem()
+    prob.setup()
+    report = select_derivative_mode(prob)
+    assert report.mode in ('fwd', 'rev')
+    assert report.coloring is None
+
+    prob.run_driver()
+    np.testing.assert_allclose(prob.get_val('x'), 0.5, atol=1e-6)
@@ -0,0 +1,42 @@
+# --- Built-ins ---
+import os
+from pathlib import Path
+import re
+import subprocess
+import sys
+
+# --- Internal ---
+
+# --- External ---
+import pytest
+
+ROOT_DIR = Path(__file__).parents[1]
+
+# Plotting and data dependencies that the modules used by the optimisation scripts must not pull in at import
+HEAVY_MODULES = ['matplotlib', 'niceplots', 'pandas', 'examples.example_classes.PROWIM_classes']
+
+
+def imported_modules(module: str) -> set[str]:
+    # Every module loaded by importing module in a fresh interpreter, from the python -X importtime report
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT_DIR, env={**os.environ, 'PYTHONPATH': str(ROOT_DIR)},
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        error = result.stderr.splitlines()[-1]
+        missing = re.search(r"No module named '([\w.]+)'", error)
+        # A missing heavy module was imported, that is a failure even where it is not installed
+        if missing and not any(missing.group(1).startswith(heavy.split('.')[0]) for heavy in HEAVY_MODULES):
+            pytest.skip(f'{module} needs a dependency that is not installed: {error}')
+        raise RuntimeError(f'Importing {module} failed:\n{result.stderr}')
+
+    return {line.split('|')[-1].strip() for line in result.stderr.splitlines()
+            if line.startswith('import time:') and 'cumulative' not in line}
+
+
+@pytest.mark.parametrize('module', ['src.postprocessing.plots',
+                                    'src.utils.tools',
+                                    'src.integration.wingprop_optimisation'])
+def test_no_heavy_imports(module):
+    loaded = imported_modules(module)
+    assert module in loaded
+    assert [heavy for heavy in HEAVY_MODULES if heavy in loaded] == []
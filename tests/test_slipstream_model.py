@@ -0,0 +1,60 @@
+# --- Built-ins ---
+
+# --- Internal ---
+
+# --- External ---
+import numpy as np
+import openmdao.api as om
+from openmdao.utils.assert_utils import assert_check_partials
+import pytest
+
+for module in ('rethorst', 'tubemodel'):
+    pytest.importorskip(module)
+
+from rethorst.openmdao.om_rethorst_velocityinterpolation import RETHORST_velocityinterpolation
+from src.models.slipstream_model import SparseVelocityInterpolation
+
+OPTIONS = {'propeller_quantity': 2,
+           'propeller_discretisation_BEM': 12,
+           'propeller_discretisation': 20,
+           'propeller_tipradii': [0.1185, 0.1185],
+           'propeller_local_refinement': 2}
+
+
+def interpolation_problem(interpolation, velocities: list[np.array]) -> om.Problem:
+    nr_elements = OPTIONS['propeller_discretisation_BEM']*OPTIONS['propeller_local_refinement']
+    prob = om.Problem(reports=False)
+    inputs = prob.model.add_subsystem('inputs', om.IndepVarComp(), promotes=['*'])
+    inputs.add_output('vinf', val=40., units='m/s')
+    for index, velocity in enumerate(velocities):
+        inputs.add_output(f'propeller_radii_BEM_rotor{index}', units='m',
+                          val=np.linspace(0.025, OPTIONS['propeller_tipradii'][index], nr_elements+1))
+        inputs.add_output(f'propeller_velocity_BEM_rotor{index}', val=velocity, units='m/s')
+    prob.model.add_subsystem('interpolation', interpolation(**OPTIONS), promotes=['*'])
+    prob.setup()
+    prob.run_model()
+    return prob
+
+
+def test_sparse_interpolation_reproduces_rethorst():
+    rng = np.random.default_rng(0)
+    nr_elements = OPTIONS['propeller_discretisation_BEM']*OPTIONS['propeller_local_refinement']
+    velocities = [40. + 15.*rng.random(nr_elements) for _ in range(OPTIONS['propeller_quantity'])]
+
+    rethorst = interpolation_problem(RETHORST_velocityinterpolation, velocities)
+    sparse = interpolation_problem(SparseVelocityInterpolation, velocities)
+    for name in ('propeller_radii', 'propeller_velocity'):
+        np.testing.assert_allclose(sparse.get_val(name), rethorst.get_val(name), rtol=1e-10, atol=1e-10)
+
+    # The weights are reused for other velocities at the same blade radii
+    velocities = [velocity[::-1] for velocity in velocities]
+    for index, velocity in enumerate(velocities):
+        rethorst.set_val(f'propeller_velocity_BEM_rotor{index}', velocity)
+        sparse.set_val(f'propeller_velocity_BEM_rotor{index}', velocity)
+    rethorst.run_model()
+    sparse.run_model()
+    np.testing.assert_allclose(sparse.get_val('propeller_velocity'), rethorst.get_val('propeller_velocity'),
+                               rtol=1e-10, atol=1e-10)
+
+    partials = sparse.check_partials(method='fd', form='central', out_stream=None)
+    assert_check_partials(partials, atol=1e-4, rtol=1e-4)
@@ -0,0 +1,60 @@
+# --- Built-ins ---
+
+# --- Internal ---
+from src.models.wing_model import POINT_INPUTS, SHARED_INPUTS, SurfaceSpec, WingModelTube, wing_surface
+from src.utils.caching import cache_key
+
+# --- External ---
+import numpy as np
+import openmdao.api as om
+import pytest
+
+
+def test_cache_key_contents():
+    assert cache_key(np.zeros(3)) == cache_key(np.zeros(3))
+    assert cache_key(np.zeros(3)) != cache_key(np.zeros(3, dtype=complex))
+    assert cache_key({'a': np.ones(2), 'b': [np.ones(2), np.ones(3)]}) == \
+           cache_key({'b': [np.ones(2), np.ones(3)], 'a': np.ones(2)})
+    assert cache_key({'a': np.ones(2)}) != cache_key({'a': np.ones(2)*2.})
+    assert cache_key({'a': {'nested': [1, 2]}}) != cache_key({'a': {'nested': [1, 3]}})
+
+
+def test_surface_is_shared(wing_configuration):
+    surface = wing_surface(wing_configuration)
+    assert wing_surface(wing_configuration, SurfaceSpec()) is surface
+    np.testing.assert_array_equal(surface['mesh'], wing_configuration.vlm_mesh)
+
+    wing_configuration.wing.thickness = np.full(5, 0.02)
+    assert wing_surface(wing_configuration) is not surface
+
+
+def test_overrides_are_keyed_by_value(wing_configuration):
+    spec = SurfaceSpec(overrides={'t_over_c_cp': np.array([0.12]), 'thickness_cp': np.full(5, 0.005)})
+    surface = wing_surface(wing_configuration, spec)
+    assert surface['t_over_c_cp'][0] == 0.12
+
+    same = SurfaceSpec(overrides={'thickness_cp': np.full(5, 0.005), 't_over_c_cp': np.array([0.12])})
+    assert wing_surface(wing_configuration, same) is surface
+    other = SurfaceSpec(overrides={'t_over_c_cp': np.array([0.10]), 'thickness_cp': np.full(5, 0.005)})
+    assert wing_surface(wing_configuration, other)['t_over_c_cp'][0] == 0.10
+
+
+def test_surface_keys_match_oas(wing_configuration):
+    # Only entries OAS consumes, it derives the span and the wingbox spar location itself
+    tube = wing_surface(wing_configuration)
+    assert 'span' not in tube and tube['fem_origin'] == 0.35
+    assert 'fem_origin' not in wing_surface(wing_configuration, SurfaceSpec(fem_model_type='wingbox'))
+
+
+def test_repeated_setup(wing_configuration):
+    meshes = []
+    for _ in range(2):
+        prob = om.Problem(reports=False)
+        inputs = prob.model.add_subsystem('inputs', om.IndepVarComp(), promotes=['*'])
+        for name in POINT_INPUTS+SHARED_INPUTS:
+            inputs.add_output(name, val=np.ones(3) if name == 'empty_cg' else 1.)
+        prob.model.add_subsystem('wing_model', WingModelTube(WingPropInfo=wing_configuration), promotes_inputs=['*'])
+        prob.setup()
+        prob.final_setup()
+        meshes.append(prob.get_val('wing_model.wing.mesh'))
+    np.testing.assert_array_equal(meshes[0], meshes[1])
@@ -0,0 +1,35 @@
+# --- Built-ins ---
+
+# --- Internal ---
+
+# --- External ---
+import openmdao.api as om
+import pytest
+
+for module in ('helix', 'rethorst', 'tubemodel'):
+    pytest.importorskip(module)
+
+from src.constraints.constraints import KSAggregation
+from src.integration.wingprop_optimisation import MainWingPropOptimisation
+from src.utils.adaptive_tolerance import ToleranceSchedule
+
+
+def test_problem_is_built_on_construction(wingprop_configuration, tmp_path):
+    constraints = {'OPENAEROSTRUCT.AS_point_0.wing_perf.thickness_intersects': {'upper': 0.},
+                   'CONSTRAINTS.thrust_equals_drag': {'equals': 0.}}
+    optimisation = MainWingPropOptimisation(wingpropinfo=wingprop_configuration,
+                                            objective={'OBJECTIVE.power_total': {'scaler': 1e-2}},
+                                            constraints=constraints,
+                                            design_variables={'DESIGNVARIABLES.twist': {'lb': -10, 'ub': 8}},
+                                            result_dir=str(tmp_path),
+                                            database_savefile='wingprop.db',
+                                            optimizer='scipy', algorithm='SLSQP',
+                                            aggregation=KSAggregation(constraints=list(constraints)[:1]),
+                                            derivative_mode='rev',
+                                            adaptive_tolerance=ToleranceSchedule())
+
+    assert isinstance(optimisation.prob.driver, om.ScipyOptimizeDriver)
+    optimisation.prob.setup()
+    optimisation.recording.validate(optimisation.prob)
+    assert 'KS_OPENAEROSTRUCT_AS_point_0_wing_perf_thickness_intersects.aggregate' in \
+        optimisation.prob.model.get_constraints()